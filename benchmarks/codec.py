@@ -0,0 +1,76 @@
+"""Round-trip cost: per-row Lead/Campaign conversion + json vs bulk codec + orjson.
+
+    python -m benchmarks.codec [--rows 100000]
+"""
+import argparse
+import gc
+import json
+import time
+from datetime import datetime, timedelta
+
+from core import codec
+from core.models import Campaign, Lead, LeadStatus, Platform
+
+from benchmarks.lead_batch import make_leads
+
+
+def timed(name, fn):
+    gc.collect()
+    start = time.perf_counter()
+    result = fn()
+    print(f"[speed] {name}: {(time.perf_counter() - start) * 1000:.1f} ms")
+    return result
+
+
+def campaign_rows(n):
+    start = datetime(2026, 1, 1)
+    return [
+        {
+            'id': str(i), 'name': f'Campaign {i}', 'description': '', 'keywords': 'crm,sales automation,pipeline',
+            'target_platforms': 'twitter,linkedin,email', 'target_regions': 'US,UK', 'usp': 'Faster follow-ups',
+            'product_link': 'https://example.com', 'status': 'active',
+            'created_at': (start + timedelta(minutes=i)).isoformat()
+        }
+        for i in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+    print(f"[info] JSON backend: {'orjson' if codec.orjson else 'json'}")
+
+    leads = make_leads(Lead, args.rows)
+    for lead in leads:
+        lead.contact_info = {"type": "email", "value": f"user{lead.id}@example.com"}
+
+    rows = timed("Lead.to_dict per row", lambda: [lead.to_dict() for lead in leads])
+    bulk_rows = timed("codec.to_rows", lambda: codec.to_rows(leads))
+    for row in rows:
+        row['last_contacted'] = None  # to_dict leaves datetimes unencoded here
+    assert rows == bulk_rows
+
+    text = timed("json.dumps", lambda: json.dumps(bulk_rows))
+    timed("codec.dumps", lambda: codec.dumps(bulk_rows))
+    parsed = timed("json.loads", lambda: json.loads(text))
+    timed("codec.loads", lambda: codec.loads(text))
+
+    timed("Lead(**) per row", lambda: [Lead(**{**row, 'platform': Platform(row['platform']),
+                                              'status': LeadStatus(row['status']),
+                                              'created_at': datetime.fromisoformat(row['created_at'])})
+                                       for row in parsed])
+    back = timed("codec.from_rows(Lead)", lambda: codec.from_rows(Lead, parsed))
+    print(f"[parity] lead round trip identical: {back == leads}")
+
+    crows = campaign_rows(args.rows)
+    timed("Campaign.from_db_row-style per row (split + fromisoformat)", lambda: [
+        (row['keywords'].split(','), [Platform(p) for p in row['target_platforms'].split(',') if p],
+         datetime.fromisoformat(row['created_at'])) for row in crows])
+    campaigns = timed("codec.from_rows(Campaign)", lambda: codec.from_rows(Campaign, crows))
+    again = codec.from_rows(Campaign, codec.to_rows(campaigns))
+    print(f"[parity] campaign round trip identical: {again == campaigns}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Parity check and CPU latency/throughput benchmark: PyTorch fp32 vs quantized ONNX.
+
+    python -m benchmarks.inference_backends [--batch-size 16] [--rounds 5]
+
+Exits non-zero when the ONNX backend disagrees with PyTorch beyond the tolerances.
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from core.analyzer import INTENT_LABELS
+from core.inference_backends import SENTIMENT_MODEL, ZERO_SHOT_MODEL, build_pipeline
+
+SAMPLES = [
+    "We've outgrown spreadsheets and need a CRM that doesn't cost a fortune. Any recommendations?",
+    "Anyone have a CRM they actually like? Budget approved, want to switch this quarter.",
+    "We are evaluating CRM platforms for our growing sales team. Open to demos.",
+    "Our current provider keeps raising prices. Need something with good automation.",
+    "Just shipped a new release of our open source library, thanks to all contributors!",
+    "Honestly the support from this vendor has been terrible for months.",
+    "Looking for a freelance designer to help with our landing page next week.",
+    "Great conference today, learned a lot about marketing analytics.",
+    "Is there a tool that can automatically schedule social media posts across platforms?",
+    "I hate how slow our deployment pipeline has become since the migration.",
+    "Comparing HubSpot and Pipedrive for a 10-person startup, thoughts?",
+    "Sharing my experience migrating 2M records between databases without downtime.",
+]
+
+# أقصى فرق مسموح في الاحتمالات، وأدنى نسبة اتفاق على التسمية
+SCORE_TOLERANCE = 0.08
+MIN_AGREEMENT = 0.9
+
+
+def run_sentiment(pipe, texts, batch_size):
+    return pipe(texts, batch_size=batch_size)
+
+
+def run_zero_shot(pipe, texts, batch_size):
+    out = pipe(texts, INTENT_LABELS, multi_label=True, batch_size=batch_size)
+    return [out] if isinstance(out, dict) else out
+
+
+def compare(name, reference, candidate, label_of, score_of):
+    agree = sum(label_of(r) == label_of(c) for r, c in zip(reference, candidate)) / len(reference)
+    max_diff = max(abs(score_of(r) - score_of(c)) for r, c in zip(reference, candidate))
+    ok = agree >= MIN_AGREEMENT and max_diff <= SCORE_TOLERANCE
+    print(f"[parity] {name}: label agreement {agree:.0%}, max score diff {max_diff:.4f} -> {'OK' if ok else 'FAIL'}")
+    return ok
+
+
+def benchmark(name, fn, texts, batch_size, rounds):
+    fn(texts[:batch_size], batch_size)  # warm-up
+    single, batched = [], []
+    for _ in range(rounds):
+        for text in texts:
+            start = time.perf_counter()
+            fn([text], 1)
+            single.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        fn(texts, batch_size)
+        batched.append(time.perf_counter() - start)
+
+    single_ms = sorted(s * 1000 for s in single)
+    p50 = statistics.median(single_ms)
+    p95 = single_ms[int(len(single_ms) * 0.95) - 1]
+    throughput = len(texts) / statistics.median(batched)
+    print(f"[bench] {name}: p50 {p50:.1f} ms, p95 {p95:.1f} ms, batch={batch_size} {throughput:.1f} docs/s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    texts = SAMPLES * max(1, args.batch_size // len(SAMPLES))
+    passed = True
+
+    for task, model_id, run, label_of, score_of in [
+        ("sentiment-analysis", SENTIMENT_MODEL, run_sentiment,
+         lambda r: r['label'], lambda r: r['score'] if r['label'] == 'POSITIVE' else 1 - r['score']),
+        ("zero-shot-classification", ZERO_SHOT_MODEL, run_zero_shot,
+         lambda r: r['labels'][0], lambda r: dict(zip(r['labels'], r['scores']))[INTENT_LABELS[0]]),
+    ]:
+        pipes = {backend: build_pipeline(task, model_id, backend) for backend in ("torch", "onnx")}
+        reference = run(pipes["torch"], SAMPLES, args.batch_size)
+        candidate = run(pipes["onnx"], SAMPLES, args.batch_size)
+        passed &= compare(task, reference, candidate, label_of, score_of)
+
+        for backend, pipe in pipes.items():
+            benchmark(f"{task} [{backend}]", lambda t, b, p=pipe: run(p, t, b), texts, args.batch_size, args.rounds)
+
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Documents/second: BART-MNLI zero-shot vs embedding-prototype intent classification.
+
+    python -m benchmarks.intent_classifiers [--docs 256] [--batch-size 16]
+"""
+import argparse
+import time
+
+from benchmarks.inference_backends import SAMPLES
+from core.analyzer import INTENT_LABELS
+from core.inference_backends import ZERO_SHOT_MODEL, build_pipeline
+from core.intent_prototypes import PrototypeIntentClassifier
+
+
+def timed(name, fn, texts):
+    fn(texts[:4])  # warm-up
+    start = time.perf_counter()
+    results = fn(texts)
+    elapsed = time.perf_counter() - start
+    print(f"[bench] {name}: {len(texts) / elapsed:.1f} docs/s ({elapsed:.2f}s for {len(texts)} docs)")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=16)
+    args = parser.parse_args()
+
+    texts = (SAMPLES * (args.docs // len(SAMPLES) + 1))[:args.docs]
+
+    zero_shot = build_pipeline("zero-shot-classification", ZERO_SHOT_MODEL)
+    prototype = PrototypeIntentClassifier()
+
+    reference = timed("zero-shot (BART-MNLI)",
+                      lambda t: zero_shot(t, INTENT_LABELS, multi_label=True, batch_size=args.batch_size), texts)
+    candidate = timed("prototype (embeddings)",
+                      lambda t: prototype(t, INTENT_LABELS, batch_size=args.batch_size), texts)
+
+    agree = sum(r['labels'][0] == c['labels'][0] for r, c in zip(reference, candidate)) / len(texts)
+    print(f"[agreement] top label matches zero-shot on {agree:.0%} of documents")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Memory and speed: list of Lead objects vs columnar LeadBatch.
+
+    python -m benchmarks.lead_batch [--leads 1000000] [--k 100]
+"""
+import argparse
+import heapq
+import random
+import time
+import tracemalloc
+from dataclasses import fields, make_dataclass
+from datetime import datetime, timedelta
+
+from core.models import Lead, LeadBatch, LeadStatus, Platform
+
+# نفس حقول Lead بدون slots: الأساس قبل التحويل
+DictLead = make_dataclass("DictLead", [(f.name, f.type, f) for f in fields(Lead)])
+
+
+def make_leads(cls, n, seed=0):
+    rng = random.Random(seed)
+    platforms, statuses = list(Platform), list(LeadStatus)
+    start = datetime(2026, 1, 1)
+    return [
+        cls(
+            id=str(i),
+            campaign_id=f"campaign-{i % 50}",
+            url=f"https://example.com/post/{i}",
+            platform=platforms[i % len(platforms)],
+            intent_score=rng.uniform(0, 100),
+            status=statuses[i % len(statuses)],
+            created_at=start + timedelta(seconds=i)
+        )
+        for i in range(n)
+    ]
+
+
+def measure(name, build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    value = build()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"[memory] {name}: {current / 2**20:.1f} MiB (built in {elapsed:.2f}s)")
+    return value
+
+
+def timed(name, fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"[speed] {name}: {best * 1000:.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leads", type=int, default=1_000_000)
+    parser.add_argument("--k", type=int, default=100)
+    args = parser.parse_args()
+
+    measure("Lead without slots", lambda: make_leads(DictLead, args.leads))
+    leads = measure("Lead with slots", lambda: make_leads(Lead, args.leads))
+    batch = LeadBatch.from_leads(leads)
+    columnar = measure("LeadBatch columns", lambda: LeadBatch.from_rows([
+        {"id": l.id, "campaign_id": l.campaign_id, "url": l.url, "platform": l.platform.value,
+         "intent_score": l.intent_score, "status": l.status.value, "created_at": l.created_at.isoformat()}
+        for l in leads
+    ]))
+    print(f"[memory] LeadBatch numeric columns: {sum(c.nbytes for c in columnar.columns.values()) / 2**20:.1f} MiB")
+
+    wanted = {LeadStatus.NEW, LeadStatus.CONTACTED}
+    py_top = timed("python filter + sort + top-k", lambda: heapq.nlargest(
+        args.k, (l for l in leads if l.status in wanted and l.intent_score >= 50), key=lambda l: l.intent_score))
+    np_top = timed("LeadBatch filter + top-k", lambda: batch.top_k(
+        args.k, status=wanted, min_intent=50))
+    timed("python full sort", lambda: sorted(leads, key=lambda l: l.intent_score, reverse=True), repeat=1)
+    timed("LeadBatch sort order (indices)", lambda: batch.argsort("intent_score"), repeat=1)
+    timed("LeadBatch full sort (all columns reordered)", lambda: batch.sort_by("intent_score"), repeat=1)
+    timed("python status counts", lambda: {s: sum(1 for l in leads if l.status is s) for s in LeadStatus}, repeat=1)
+    timed("LeadBatch status counts", lambda: batch.counts("status"))
+
+    same = [l.id for l in py_top] == [l.id for l in np_top.to_leads()]
+    print(f"[parity] top-{args.k} identical: {same}")
+
+
+if __name__ == "__main__":
+    main()
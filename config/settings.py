@@ -1,11 +1,97 @@
 import os
+from typing import Dict, Tuple
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     GROQ_API_KEY: str = os.getenv("GROQ_API_KEY", "")
+    OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
     SUPABASE_KEY: str = os.getenv("SUPABASE_KEY", "")
+    GOOGLE_API_KEY: str = os.getenv("GOOGLE_API_KEY", "")
+    GOOGLE_CX: str = os.getenv("GOOGLE_CX", "")
     MAX_RETRIES: int = 3
     MIN_INTENT_SCORE: int = 90
+    REQUEST_TIMEOUT: int = 30
+
+    # Batch analysis
+    ANALYSIS_MODEL: str = "gpt-4o-mini"
+    LOCAL_BATCH_SIZE: int = 16
+    LOCAL_MAX_TOKENS: int = 480  # sentiment/zero-shot input budget, below the 512-token encoder limit
+    GPT_CONTENT_TOKENS: int = 600
+    PROMPT_CONTENT_TOKENS: int = 400  # lead content budget after relevance compression
+
+    # Local model inference: "torch" (fp32 PyTorch) or "onnx" (int8-quantized ONNX Runtime, needs optimum[onnxruntime])
+    INFERENCE_BACKEND: str = "torch"
+    ONNX_MODEL_DIR: str = "models/onnx"
+    ONNX_QUANTIZATION: str = "avx512_vnni"  # or avx2 / arm64, see optimum AutoQuantizationConfig
+
+    # Shared inference server (python -m core.inference_server); clients fall back to local models
+    INFERENCE_SOCKET: str = "/tmp/nexus_inference.sock"
+    INFERENCE_BATCH_WINDOW_MS: int = 10
+    INFERENCE_MAX_BATCH: int = 32
+    INFERENCE_WAIT_SECONDS: float = 0.0  # how long clients wait for the server to load; set per program in supervisord.conf
+
+    # Local intent classifier: "zero_shot" (BART-MNLI, one NLI pass per label) or "prototype" (embeddings)
+    INTENT_CLASSIFIER: str = "zero_shot"
+    EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+
+    # Search providers: empty = per-platform defaults, "fixture" = offline recorded results
+    SEARCH_PROVIDER: str = ""
+    SEARCH_FIXTURES_PATH: str = "fixtures/search"
+    SEARCH_FIXTURE_SIMULATE_LATENCY: bool = False
+
+    # LLM gateway: concurrent in-flight calls and per-model (requests/min, tokens/min) limits
+    LLM_CONCURRENCY: int = 8
+    LLM_COMPLETION_TOKENS_ESTIMATE: int = 300
+    LLM_DEFAULT_RPM: int = 60
+    LLM_DEFAULT_TPM: int = 60000
+    LLM_RATE_LIMITS: Dict[str, Tuple[int, int]] = {
+        "llama3-70b-8192": (30, 6000),
+        "llama3-8b-8192": (30, 30000),
+        "gpt-4o-mini": (500, 200000),
+    }
+
+    # Route each LLM request to the fastest healthy backend; hedge once the primary misses its SLO
+    LLM_ROUTING: bool = True
+    LLM_MAX_HEDGES: int = 1
+
+    # Local semantic index of analysed leads (exact NumPy search, HNSW above the threshold)
+    VECTOR_INDEX_PATH: str = "data/vector_index"
+    VECTOR_HNSW_THRESHOLD: int = 20000
+    VECTOR_REUSE_SIMILARITY: float = 0.95  # cosine similarity above which a past verdict is reused
+
+    # Outreach message cache: reuse a template for near-paraphrase snippets, at most N recipients each
+    MESSAGE_CACHE_SIMILARITY: float = 0.9
+    MESSAGE_CACHE_MAX_REUSE: int = 8
+
+    # Local write journal (SQLite WAL) replicated to Supabase in the background
+    JOURNAL_PATH: str = "data/journal.db"
+    JOURNAL_BATCH_SIZE: int = 500
+    JOURNAL_FLUSH_INTERVAL: float = 1.0
+    JOURNAL_MAX_BACKOFF: float = 300.0
+    JOURNAL_MAX_ATTEMPTS: int = 5  # rejections of one write before it moves to the dead_letter table
+
+    # Seen-URL index: "set" (exact 64-bit fingerprints) or "bloom" (fixed size, SEEN_INDEX_FP_RATE false positives)
+    SEEN_INDEX_MODE: str = "set"
+    SEEN_INDEX_FP_RATE: float = 0.001
+    SEEN_INDEX_CAPACITY: int = 1000000
+    SEEN_INDEX_PAGE_SIZE: int = 1000
+
+    # Campaign config cache: full load once, then poll only rows changed since the updated_at watermark
+    CAMPAIGN_POLL_INTERVAL: float = 30.0
+    CAMPAIGN_RECONCILE_INTERVAL: float = 300.0  # id-only read that drops deleted campaigns
+
+    # Lead export / paged reads: rows per keyset page
+    EXPORT_PAGE_SIZE: int = 1000
+
+    # Report charts: shared plotly.js source (URL/path; empty = CDN for the installed version) and fragment cache size
+    PLOTLY_JS_SRC: str = ""
+    CHART_CACHE_SIZE: int = 256
+
+    # Orchestrator: leads analysed per wave at minimum (waves stop once max_leads are confirmed)
+    ANALYSIS_WAVE_MIN: int = 4
+
+    # Stream neural verdicts and stop reading as soon as is_confirmed is false
+    NEURAL_STREAMING: bool = True
 
 settings = Settings()
@@ -1,32 +1,96 @@
+import asyncio
+import json
 import logging
-from typing import Dict, List, Tuple, Any
-import openai
-from transformers import pipeline
+from typing import Dict, List, Tuple, Any, Union
 import torch
 import re
 from datetime import datetime
 
 from config.settings import settings
 from core.models import Lead
+from core.inference_backends import SENTIMENT_MODEL, ZERO_SHOT_MODEL
+from core.inference_server import load_pipeline
+from core.llm_gateway import get_gateway
+from core.llm_router import get_router
+from core.intent_prototypes import PrototypeIntentClassifier
+from core.term_matcher import TermMatcher
+from core.text_budget import get_token_counter, run_bucketed, truncate_to_tokens
 
 logger = logging.getLogger(__name__)
 
+# قواميس السياق (يمكن تمريرها مخصصة إلى IntentAnalyzer)
+INDUSTRY_TERMS = {
+    'tech': ['software', 'code', 'programming', 'developer', 'startup', 'tech', 'app', 'api'],
+    'finance': ['finance', 'banking', 'investment', 'stock', 'crypto', 'blockchain'],
+    'marketing': ['marketing', 'seo', 'social media', 'brand', 'advertising'],
+    'health': ['health', 'medical', 'fitness', 'wellness', 'doctor'],
+    'education': ['education', 'learning', 'course', 'university', 'student']
+}
+
+INTENT_LABELS = [
+    "actively seeking to purchase",
+    "researching options",
+    "has problem needing solution",
+    "sharing experience",
+    "casual browsing",
+    "complaint or issue",
+    "recommendation request"
+]
+
+# بترتيب الأولوية
+PROFESSIONAL_LEVEL_TERMS = {
+    'executive': ['ceo', 'cto', 'cfo', 'founder', 'director', 'vp', 'executive'],
+    'manager': ['manager', 'lead', 'head of', 'senior', 'principal'],
+    'junior': ['junior', 'entry', 'student', 'intern', 'associate']
+}
+
 class IntentAnalyzer:
     """محلل ذكي للنوايا باستخدام الذكاء الاصطناعي"""
     
-    def __init__(self):
-        self.openai_client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+    def __init__(self,
+                 industry_terms: Dict[str, List[str]] = None,
+                 professional_level_terms: Dict[str, List[str]] = None,
+                 word_boundary: bool = False):
+        # مطابق واحد لكل قواميس السياق: مرور واحد على النص لكل الفئات
+        self.industry_terms = industry_terms or INDUSTRY_TERMS
+        self.professional_level_terms = professional_level_terms or PROFESSIONAL_LEVEL_TERMS
+        self.context_matcher = TermMatcher(
+            {
+                **{('industry', name): terms for name, terms in self.industry_terms.items()},
+                **{('level', name): terms for name, terms in self.professional_level_terms.items()}
+            },
+            word_boundary=word_boundary
+        )
         
-        # تحميل نماذج Transformers محلية للتحليل الأساسي
+        # نماذج Transformers: عبر خادم الاستدلال المشترك إن وجد، وإلا محلياً (torch أو onnx)
         try:
-            self.sentiment_analyzer = pipeline("sentiment-analysis", 
-                                             model="distilbert-base-uncased-finetuned-sst-2-english")
-            self.zero_shot_classifier = pipeline("zero-shot-classification",
-                                               model="facebook/bart-large-mnli")
+            self.sentiment_analyzer = load_pipeline("sentiment-analysis", SENTIMENT_MODEL)
+            if settings.INTENT_CLASSIFIER == "prototype":
+                # تضمين واحد لكل مستند مقابل نماذج أولية محسوبة مسبقاً، بنفس مخرجات zero-shot
+                self.zero_shot_classifier = PrototypeIntentClassifier()
+            else:
+                self.zero_shot_classifier = load_pipeline("zero-shot-classification", ZERO_SHOT_MODEL)
         except Exception as e:
             logger.warning(f"Could not load local models: {e}")
             self.sentiment_analyzer = None
             self.zero_shot_classifier = None
+        
+        # عدادات الرموز: الاقتطاع بحدود رموز النموذج وليس بعدد الأحرف
+        self.gpt_tokens = get_token_counter()
+        self.sentiment_tokens = get_token_counter(self._load_tokenizer(self.sentiment_analyzer, SENTIMENT_MODEL))
+        self.zero_shot_tokens = get_token_counter(self._load_tokenizer(self.zero_shot_classifier, ZERO_SHOT_MODEL))
+    
+    def _load_tokenizer(self, pipe, model_id: str):
+        """tokenizer النموذج من الـ pipeline، أو تحميله وحده عند استخدام خادم الاستدلال"""
+        tokenizer = getattr(pipe, 'tokenizer', None)
+        if tokenizer is not None:
+            return tokenizer
+        try:
+            from transformers import AutoTokenizer
+            return AutoTokenizer.from_pretrained(model_id)
+        except Exception as e:
+            logger.warning(f"Could not load tokenizer for {model_id}: {e}")
+            return None
     
     def analyze_content(self, content: str, source_url: str = "") -> Dict[str, Any]:
         """تحليل متقدم للمحتوى باستخدام GPT-4"""
@@ -59,10 +123,95 @@ class IntentAnalyzer:
             logger.error(f"Error analyzing content: {e}")
             return self._get_fallback_analysis(content)
     
+    def analyze_contents(self, items: List[Union[str, Tuple[str, str]]]) -> List[Dict[str, Any]]:
+        """تحليل دفعة كاملة: نصوص أو أزواج (المحتوى، الرابط)، والنتائج بنفس ترتيب المدخلات"""
+        pairs = [(item, "") if isinstance(item, str) else (item[0], item[1]) for item in items]
+        contents = [content for content, _ in pairs]
+        
+        # 1. طلبات GPT بشكل متزامن
+        intents = self._analyze_intent_gpt_batch(contents)
+        
+        # 2. التحليل المحلي على دفعات
+        sentiments = self._analyze_sentiment_batch(contents)
+        
+        # 3. التحليلات النصية والاستدلالية في حلقة واحدة
+        results = []
+        for (content, source_url), intent_analysis, sentiment in zip(pairs, intents, sentiments):
+            try:
+                context = self._analyze_context(content, source_url)
+                results.append({
+                    'intent_analysis': intent_analysis,
+                    'sentiment': sentiment,
+                    'keywords': self._extract_keywords(content),
+                    'context': context,
+                    'overall_score': self._calculate_overall_score(intent_analysis, sentiment, context),
+                    'analysis_timestamp': datetime.now().isoformat()
+                })
+            except Exception as e:
+                logger.error(f"Error analyzing content: {e}")
+                results.append(self._get_fallback_analysis(content))
+        
+        return results
+    
+    def _analyze_intent_gpt_batch(self, contents: List[str]) -> List[Dict[str, Any]]:
+        """إرسال طلبات GPT بالتوازي مع تحويل الفاشلة إلى النماذج المحلية دفعة واحدة"""
+        intents: List[Any] = [None] * len(contents)
+        
+        # كل الطلبات تدخل طابور البوابة معاً، والبوابة تشغلها بالتوازي ضمن حدود النموذج
+        futures = []
+        for content in contents:
+            try:
+                futures.append(self._submit_intent(content))
+            except Exception as e:
+                logger.error(f"Error in GPT intent analysis: {e}")
+                futures.append(None)
+        
+        for i, future in enumerate(futures):
+            if future is None:
+                continue
+            try:
+                intents[i] = future.result()
+            except Exception as e:
+                logger.error(f"Error in GPT intent analysis: {e}")
+        
+        failed = [i for i, intent in enumerate(intents) if intent is None]
+        if failed:
+            local = self._analyze_intent_local_batch([contents[i] for i in failed])
+            for i, intent in zip(failed, local):
+                intents[i] = intent
+        
+        return intents
+    
     def _analyze_intent_gpt(self, content: str) -> Dict[str, Any]:
         """تحليل النية باستخدام GPT-4"""
         try:
-            prompt = f"""
+            return self._request_intent_gpt(content)
+        except Exception as e:
+            logger.error(f"Error in GPT intent analysis: {e}")
+            return self._analyze_intent_local(content)
+    
+    def _request_intent_gpt(self, content: str) -> Dict[str, Any]:
+        """طلب تحليل نية واحد (يرفع الاستثناء للمستدعي)"""
+        return self._submit_intent(content).result()
+    
+    def _submit_intent(self, content: str):
+        """إرسال طلب تحليل النية (يعيد Future بالنتيجة المحللة)"""
+        messages = self._intent_messages(content)
+        if not settings.LLM_ROUTING:
+            return get_gateway().run(self._request_intent_llm("openai", settings.ANALYSIS_MODEL, messages))
+        
+        # الموجّه يختار أسرع خلفية سليمة ويرسل طلباً احتياطياً عند تجاوز الـ SLO
+        handlers = {
+            name: lambda backend: self._request_intent_llm(backend.provider, backend.model, messages)
+            for name in ("openai", "groq-8b")
+        }
+        if self.zero_shot_classifier:
+            handlers["local"] = lambda backend: asyncio.to_thread(self._analyze_intent_local, content)
+        return get_router().submit(handlers)
+    
+    def _intent_messages(self, content: str) -> List[Dict[str, str]]:
+        content = truncate_to_tokens(content, settings.GPT_CONTENT_TOKENS, self.gpt_tokens)
+        prompt = f"""
             Analyze the following content for business/purchasing intent. Provide a detailed analysis including:
             
             1. Primary intent category (e.g., seeking solution, comparison, complaint, inquiry, recommendation)
@@ -71,27 +220,26 @@ class IntentAnalyzer:
             4. Decision maker likelihood
             5. Specific needs mentioned
             
-            Content: {content[:2000]}
+            Content: {content}
             
             Respond in JSON format with these keys: category, score_0_to_100, urgency, has_budget, is_decision_maker, needs_list, confidence
             """
-            
-            response = self.openai_client.chat.completions.create(
-                model=settings.ANALYSIS_MODEL,
-                messages=[
-                    {"role": "system", "content": "You are a business intent analysis expert."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                response_format={"type": "json_object"}
-            )
-            
-            import json
-            return json.loads(response.choices[0].message.content)
-            
-        except Exception as e:
-            logger.error(f"Error in GPT intent analysis: {e}")
-            return self._analyze_intent_local(content)
+        
+        return [
+            {"role": "system", "content": "You are a business intent analysis expert."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    async def _request_intent_llm(self, provider: str, model: str, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        """طلب تحليل النية من نموذج لغة عبر البوابة وقراءة JSON من الرد"""
+        response = await get_gateway().chat(
+            provider,
+            model,
+            messages,
+            temperature=0.3,
+            response_format={"type": "json_object"}
+        )
+        return json.loads(response.choices[0].message.content)
     
     def _analyze_intent_local(self, content: str) -> Dict[str, Any]:
         """تحليل النية باستخدام النماذج المحلية"""
@@ -99,52 +247,69 @@ class IntentAnalyzer:
             return self._get_fallback_analysis(content)
         
         try:
-            candidate_labels = [
-                "actively seeking to purchase",
-                "researching options",
-                "has problem needing solution",
-                "sharing experience",
-                "casual browsing",
-                "complaint or issue",
-                "recommendation request"
-            ]
-            
-            result = self.zero_shot_classifier(content, candidate_labels, multi_label=True)
-            
-            # حساب النتيجة
-            top_label = result['labels'][0]
-            top_score = result['scores'][0] * 100
-            
-            # تعيين فئات بناءً على التسمية
-            if top_label in ["actively seeking to purchase", "has problem needing solution"]:
-                category = "high_intent"
-            elif top_label in ["researching options", "recommendation request"]:
-                category = "medium_intent"
-            else:
-                category = "low_intent"
-            
-            return {
-                'category': category,
-                'score_0_to_100': round(top_score, 2),
-                'urgency': 5,
-                'has_budget': False,
-                'is_decision_maker': True,
-                'needs_list': [],
-                'confidence': 0.7
-            }
+            truncated = truncate_to_tokens(content, settings.LOCAL_MAX_TOKENS, self.zero_shot_tokens)
+            result = self.zero_shot_classifier(truncated, INTENT_LABELS, multi_label=True)
+            return self._intent_from_zero_shot(result)
             
         except Exception as e:
             logger.error(f"Error in local intent analysis: {e}")
             return self._get_fallback_analysis(content)
     
+    def _analyze_intent_local_batch(self, contents: List[str]) -> List[Dict[str, Any]]:
+        """تحليل النية محلياً لدفعة كاملة بتمريرة واحدة على النموذج"""
+        eligible = [i for i, content in enumerate(contents) if len(content) >= 10]
+        if not self.zero_shot_classifier or not eligible:
+            return [self._analyze_intent_local(content) for content in contents]
+        
+        try:
+            texts = [truncate_to_tokens(contents[i], settings.LOCAL_MAX_TOKENS, self.zero_shot_tokens)
+                     for i in eligible]
+            # دفعات متقاربة الطول: الحشو حتى أطول نص في الدفعة فقط
+            batch = run_bucketed(
+                lambda chunk, size: self.zero_shot_classifier(chunk, INTENT_LABELS, multi_label=True, batch_size=size),
+                texts, self.zero_shot_tokens, settings.LOCAL_BATCH_SIZE
+            )
+        except Exception as e:
+            logger.error(f"Error in batched local intent analysis: {e}")
+            return [self._analyze_intent_local(content) for content in contents]
+        
+        intents = [self._get_fallback_analysis(content) for content in contents]
+        for i, result in zip(eligible, batch):
+            intents[i] = self._intent_from_zero_shot(result)
+        return intents
+    
+    def _intent_from_zero_shot(self, result: Dict) -> Dict[str, Any]:
+        """تحويل مخرجات zero-shot إلى صيغة تحليل النية"""
+        # حساب النتيجة
+        top_label = result['labels'][0]
+        top_score = result['scores'][0] * 100
+        
+        # تعيين فئات بناءً على التسمية
+        if top_label in ["actively seeking to purchase", "has problem needing solution"]:
+            category = "high_intent"
+        elif top_label in ["researching options", "recommendation request"]:
+            category = "medium_intent"
+        else:
+            category = "low_intent"
+        
+        return {
+            'category': category,
+            'score_0_to_100': round(top_score, 2),
+            'urgency': 5,
+            'has_budget': False,
+            'is_decision_maker': True,
+            'needs_list': [],
+            'confidence': 0.7
+        }
+    
     def _analyze_sentiment(self, content: str) -> Dict[str, Any]:
         """تحليل المشاعر"""
         if not self.sentiment_analyzer or len(content) < 10:
             return {'sentiment': 'neutral', 'score': 0.5}
         
         try:
-            # استخدام أول 512 حرف للتحليل
-            truncated = content[:512]
+            # اقتطاع بحد رموز النموذج مع الإبقاء على أهم الجمل
+            truncated = truncate_to_tokens(content, settings.LOCAL_MAX_TOKENS, self.sentiment_tokens)
             result = self.sentiment_analyzer(truncated)[0]
             
             return {
@@ -156,6 +321,30 @@ class IntentAnalyzer:
             logger.error(f"Error in sentiment analysis: {e}")
             return {'sentiment': 'neutral', 'score': 0.5}
     
+    def _analyze_sentiment_batch(self, contents: List[str]) -> List[Dict[str, Any]]:
+        """تحليل المشاعر لدفعة كاملة"""
+        neutral = {'sentiment': 'neutral', 'score': 0.5}
+        eligible = [i for i, content in enumerate(contents) if len(content) >= 10]
+        sentiments = [dict(neutral) for _ in contents]
+        if not self.sentiment_analyzer or not eligible:
+            return sentiments
+        
+        try:
+            texts = [truncate_to_tokens(contents[i], settings.LOCAL_MAX_TOKENS, self.sentiment_tokens)
+                     for i in eligible]
+            batch = run_bucketed(lambda chunk, size: self.sentiment_analyzer(chunk, batch_size=size),
+                                 texts, self.sentiment_tokens, settings.LOCAL_BATCH_SIZE)
+        except Exception as e:
+            logger.error(f"Error in batched sentiment analysis: {e}")
+            return [self._analyze_sentiment(content) for content in contents]
+        
+        for i, result in zip(eligible, batch):
+            sentiments[i] = {
+                'sentiment': result['label'].lower(),
+                'score': round(result['score'], 3)
+            }
+        return sentiments
+    
     def _extract_keywords(self, content: str) -> List[str]:
         """استخراج الكلمات المفتاحية"""
         try:
@@ -189,13 +378,14 @@ class IntentAnalyzer:
     
     def _analyze_context(self, content: str, source_url: str) -> Dict[str, Any]:
         """تحليل السياق"""
+        hits = self.context_matcher.scan(content)
         context = {
             'source_type': self._detect_source_type(source_url),
             'content_length': len(content),
             'has_questions': '?' in content,
             'has_contact_info': self._has_contact_info(content),
-            'likely_industry': self._detect_industry(content),
-            'professional_level': self._detect_professional_level(content)
+            'likely_industry': self._detect_industry(content, hits),
+            'professional_level': self._detect_professional_level(content, hits)
         }
         return context
     
@@ -233,21 +423,13 @@ class IntentAnalyzer:
         
         return False
     
-    def _detect_industry(self, content: str) -> str:
+    def _detect_industry(self, content: str, hits: Dict = None) -> str:
         """اكتشاف الصناعة من المحتوى"""
-        industries = {
-            'tech': ['software', 'code', 'programming', 'developer', 'startup', 'tech', 'app', 'api'],
-            'finance': ['finance', 'banking', 'investment', 'stock', 'crypto', 'blockchain'],
-            'marketing': ['marketing', 'seo', 'social media', 'brand', 'advertising'],
-            'health': ['health', 'medical', 'fitness', 'wellness', 'doctor'],
-            'education': ['education', 'learning', 'course', 'university', 'student']
-        }
-        
-        content_lower = content.lower()
+        hits = self.context_matcher.scan(content) if hits is None else hits
         scores = {}
         
-        for industry, keywords in industries.items():
-            score = sum(1 for keyword in keywords if keyword in content_lower)
+        for industry in self.industry_terms:
+            score = len(hits.get(('industry', industry), []))
             if score > 0:
                 scores[industry] = score
         
@@ -256,20 +438,13 @@ class IntentAnalyzer:
         
         return 'general'
     
-    def _detect_professional_level(self, content: str) -> str:
+    def _detect_professional_level(self, content: str, hits: Dict = None) -> str:
         """اكتشاف المستوى المهني"""
-        content_lower = content.lower()
-        
-        executive_terms = ['ceo', 'cto', 'cfo', 'founder', 'director', 'vp', 'executive']
-        manager_terms = ['manager', 'lead', 'head of', 'senior', 'principal']
-        junior_terms = ['junior', 'entry', 'student', 'intern', 'associate']
-        
-        if any(term in content_lower for term in executive_terms):
-            return 'executive'
-        elif any(term in content_lower for term in manager_terms):
-            return 'manager'
-        elif any(term in content_lower for term in junior_terms):
-            return 'junior'
+        hits = self.context_matcher.scan(content) if hits is None else hits
+        
+        for level in self.professional_level_terms:
+            if ('level', level) in hits:
+                return level
         
         return 'unknown'
     
@@ -0,0 +1,203 @@
+import logging
+import threading
+import time
+from dataclasses import fields, is_dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# أحداث الخطافات
+ADDED = "added"
+CHANGED = "changed"
+PAUSED = "paused"  # خرجت من الحالة النشطة (إيقاف، إكمال، أرشفة)
+REMOVED = "removed"  # حُذفت من الجدول (لا يظهر الحذف في استعلام التغييرات)
+
+ACTIVE = "active"
+WATERMARK_COLUMN = "updated_at"
+
+# الأعمدة التي تحتاجها حلقة البحث والتحليل والتقارير (بدل select *)
+CAMPAIGN_COLUMNS = (
+    "id", "name", "keywords", "target_region", "usp", "product_link",
+    "max_leads", "min_intent_score", "target_platforms", "status", WATERMARK_COLUMN,
+)
+
+Row = Dict[str, Any]
+Builder = Callable[[List[Row]], List[Any]]
+Hook = Callable[[Hashable, Row], None]
+
+
+def _refresh(target: Any, fresh: Any):
+    """نسخ حقول الكائن الجديد إلى القديم ليبقى المرجع نفسه لدى من يحتفظ به"""
+    if is_dataclass(target):
+        for f in fields(target):
+            setattr(target, f.name, getattr(fresh, f.name))
+    else:
+        target.__dict__.update(fresh.__dict__)
+
+
+class CampaignCache:
+    """نسخة محلية من الحملات النشطة
+
+    تحميل كامل مرة واحدة، ثم استعلام عن الصفوف التي تغير updated_at فيها بعد آخر علامة فقط.
+    الصفوف والكائنات المبنية منها ثابتة المرجع وتُحدّث في مكانها.
+    """
+
+    def __init__(self, client: Any, columns: Sequence[str] = CAMPAIGN_COLUMNS,
+                 table: str = "campaigns", poll_interval: float = None, reconcile_interval: float = None):
+        self.client = client
+        self.table = table
+        self.columns = tuple(columns) if WATERMARK_COLUMN in columns else (*columns, WATERMARK_COLUMN)
+        self.poll_interval = settings.CAMPAIGN_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.reconcile_interval = (settings.CAMPAIGN_RECONCILE_INTERVAL
+                                   if reconcile_interval is None else reconcile_interval)
+        self.watermark: Optional[str] = None
+        self._rows: Dict[Hashable, Row] = {}
+        self._versions: Dict[Hashable, int] = {}
+        self._objects: Dict[Builder, Dict[Hashable, Tuple[int, Any]]] = {}
+        self._hooks: Dict[str, List[Hook]] = {ADDED: [], CHANGED: [], PAUSED: [], REMOVED: []}
+        self._loaded = False
+        self._polled_at = 0.0
+        self._reconciled_at = 0.0
+        self._lock = threading.RLock()
+
+    def on(self, event: str, hook: Hook):
+        """تسجيل خطاف (campaign_id, row) لحدث ADDED أو CHANGED أو PAUSED أو REMOVED"""
+        self._hooks[event].append(hook)
+
+    # ---- القراءة ----
+
+    def active(self) -> List[Row]:
+        """صفوف الحملات النشطة (بعد استعلام التغييرات إن حان موعده)"""
+        with self._lock:
+            self._maybe_refresh()
+            return list(self._rows.values())
+
+    def objects(self, build: Builder) -> List[Any]:
+        """كائنات الحملات النشطة عبر دالة بناء جماعية؛ لا يُعاد بناء إلا ما تغير صفه"""
+        with self._lock:
+            self._maybe_refresh()
+            cache = self._objects.setdefault(build, {})
+            for campaign_id in [cid for cid in cache if cid not in self._rows]:
+                del cache[campaign_id]
+
+            stale = [cid for cid in self._rows
+                     if cache.get(cid, (None,))[0] != self._versions[cid]]
+            for campaign_id, fresh in zip(stale, build([self._rows[cid] for cid in stale]) if stale else []):
+                version = self._versions[campaign_id]
+                if campaign_id in cache:
+                    _refresh(cache[campaign_id][1], fresh)
+                    cache[campaign_id] = (version, cache[campaign_id][1])
+                else:
+                    cache[campaign_id] = (version, fresh)
+            return [cache[cid][1] for cid in self._rows]
+
+    def get(self, campaign_id: Hashable) -> Optional[Row]:
+        with self._lock:
+            self._maybe_refresh()
+            return self._rows.get(campaign_id)
+
+    # ---- المزامنة ----
+
+    def _maybe_refresh(self):
+        if not self._loaded or time.monotonic() - self._polled_at >= self.poll_interval:
+            try:
+                self.refresh()
+            except Exception as e:
+                # نبقى على آخر نسخة معروفة إلى الاستعلام التالي
+                logger.warning(f"Campaign poll failed, serving cached campaigns: {e}")
+                self._polled_at = time.monotonic()
+
+    def refresh(self) -> int:
+        """مزامنة فورية؛ تعيد عدد الصفوف التي وصلت من القاعدة"""
+        with self._lock:
+            select = ",".join(self.columns)
+            if self.watermark is None:
+                # تحميل كامل (أول مرة، أو جدول بلا updated_at بعد)
+                rows = (self.client.table(self.table).select(select)
+                        .eq("status", ACTIVE).execute().data or [])
+                self._apply(rows, full=True)
+                self._reconciled_at = time.monotonic()
+            else:
+                # gte: صفوف بنفس الطابع الزمني قد تُثبّت بعد آخر استعلام؛ غير المتغير منها يُتجاهل
+                rows = (self.client.table(self.table).select(select)
+                        .gte(WATERMARK_COLUMN, self.watermark).order(WATERMARK_COLUMN)
+                        .execute().data or [])
+                self._apply(rows, full=False)
+                if time.monotonic() - self._reconciled_at >= self.reconcile_interval:
+                    self._reconcile()
+            self._loaded = True
+            self._polled_at = time.monotonic()
+            return len(rows)
+
+    def _reconcile(self):
+        """مطابقة المعرفات المخزنة مع الحملات النشطة فعلاً (عمود id فقط) لاكتشاف المحذوفة"""
+        active = {row["id"] for row in (self.client.table(self.table).select("id")
+                                        .eq("status", ACTIVE).execute().data or [])}
+        gone = [cid for cid in self._rows if cid not in active]
+        self._reconciled_at = time.monotonic()
+        if not gone:
+            return
+        logger.info(f"Campaign cache: {len(gone)} campaigns no longer exist, dropping them")
+        self._fire([(REMOVED, cid, self._drop(cid)) for cid in gone])
+
+    def _apply(self, rows: List[Row], full: bool):
+        events: List[Tuple[str, Hashable, Row]] = []
+        received = set()
+        for row in rows:
+            campaign_id = row["id"]
+            received.add(campaign_id)
+            stamp = row.get(WATERMARK_COLUMN)
+            if stamp and (self.watermark is None or stamp > self.watermark):
+                self.watermark = stamp
+
+            current = self._rows.get(campaign_id)
+            if row.get("status") != ACTIVE:
+                if current is not None:
+                    events.append((PAUSED, campaign_id, self._drop(campaign_id)))
+            elif current is None:
+                self._rows[campaign_id] = dict(row)
+                self._versions[campaign_id] = 0
+                events.append((ADDED, campaign_id, self._rows[campaign_id]))
+            elif current != row:
+                current.clear()
+                current.update(row)
+                self._versions[campaign_id] += 1
+                events.append((CHANGED, campaign_id, current))
+
+        if full:
+            # في التحميل الكامل: ما لم يعد ضمن النشطة خرج منها
+            for campaign_id in [cid for cid in self._rows if cid not in received]:
+                events.append((PAUSED, campaign_id, self._drop(campaign_id)))
+
+        if events:
+            logger.info(f"Campaign cache: {len(events)} changes, {len(self._rows)} active")
+        self._fire(events)
+
+    def _fire(self, events: List[Tuple[str, Hashable, Row]]):
+        for event, campaign_id, row in events:
+            for hook in self._hooks[event]:
+                try:
+                    hook(campaign_id, row)
+                except Exception as e:
+                    logger.error(f"Campaign hook {event} failed for {campaign_id}: {e}")
+
+    def _drop(self, campaign_id: Hashable) -> Row:
+        self._versions.pop(campaign_id, None)
+        for cache in self._objects.values():
+            cache.pop(campaign_id, None)
+        return self._rows.pop(campaign_id)
+
+
+_caches: Dict[Tuple[str, ...], CampaignCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_campaign_cache(client: Any, columns: Sequence[str] = CAMPAIGN_COLUMNS) -> CampaignCache:
+    """ذاكرة الحملات المشتركة للعملية لكل مجموعة أعمدة"""
+    key = tuple(columns)
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = CampaignCache(client, columns)
+        return _caches[key]
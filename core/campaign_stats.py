@@ -0,0 +1,202 @@
+import logging
+from typing import Any, Dict, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# حالات العميل التي تُحسب في كل عداد (main يكتب sent/failed، والمنسق confirmed)
+CONTACTED_STATUSES = ("contacted", "sent", "responded", "converted")
+RESPONDED_STATUSES = ("responded", "converted")
+CONVERTED_STATUSES = ("converted",)
+
+# مدرج نقاط النية: 10 فئات بعرض 10 (الفئة الأخيرة تشمل 100)
+SCORE_BUCKETS = tuple(f"{b * 10}-{b * 10 + 9}" if b < 9 else "90-100" for b in range(10))
+
+STATS_COLUMNS = (
+    "campaign_id", "total_leads", "contacted_leads", "responded_leads", "converted_leads",
+    "intent_sum", "score_hist", "platform_counts", "platform_converted", "updated_at",
+)
+
+
+def _sql_list(values) -> str:
+    return ", ".join(f"'{v}'" for v in values)
+
+
+_BUCKET = "LEAST(GREATEST(FLOOR(COALESCE({score}, 0) / 10), 0), 9)::int"
+
+# ملخص لكل حملة يُحدّث داخل قاعدة البيانات مع كل كتابة في leads، فلا تمسح القراءات جدول العملاء
+STATS_SCHEMA = f"""
+ALTER TABLE leads ADD COLUMN IF NOT EXISTS platform TEXT DEFAULT 'generic';
+
+CREATE TABLE IF NOT EXISTS campaign_stats (
+    campaign_id UUID PRIMARY KEY REFERENCES campaigns(id) ON DELETE CASCADE,
+    total_leads BIGINT NOT NULL DEFAULT 0,
+    contacted_leads BIGINT NOT NULL DEFAULT 0,
+    responded_leads BIGINT NOT NULL DEFAULT 0,
+    converted_leads BIGINT NOT NULL DEFAULT 0,
+    intent_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    score_hist BIGINT[] NOT NULL DEFAULT ARRAY[0,0,0,0,0,0,0,0,0,0]::BIGINT[],
+    platform_counts JSONB NOT NULL DEFAULT '{{}}'::JSONB,
+    platform_converted JSONB NOT NULL DEFAULT '{{}}'::JSONB,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- إضافة (delta = 1) أو طرح (delta = -1) عميل واحد من ملخص حملته
+CREATE OR REPLACE FUNCTION campaign_stats_apply(cid UUID, platform TEXT, status TEXT, score DOUBLE PRECISION, delta INT)
+RETURNS VOID AS $$
+DECLARE
+    bucket INT := {_BUCKET.format(score="score")} + 1;
+    p TEXT := COALESCE(platform, 'generic');
+BEGIN
+    IF cid IS NULL THEN
+        RETURN;
+    END IF;
+    INSERT INTO campaign_stats (campaign_id) VALUES (cid) ON CONFLICT (campaign_id) DO NOTHING;
+    UPDATE campaign_stats SET
+        total_leads = total_leads + delta,
+        contacted_leads = contacted_leads + CASE WHEN status IN ({_sql_list(CONTACTED_STATUSES)}) THEN delta ELSE 0 END,
+        responded_leads = responded_leads + CASE WHEN status IN ({_sql_list(RESPONDED_STATUSES)}) THEN delta ELSE 0 END,
+        converted_leads = converted_leads + CASE WHEN status IN ({_sql_list(CONVERTED_STATUSES)}) THEN delta ELSE 0 END,
+        intent_sum = intent_sum + delta * COALESCE(score, 0),
+        score_hist[bucket] = score_hist[bucket] + delta,
+        platform_counts = jsonb_set(platform_counts, ARRAY[p],
+            to_jsonb(COALESCE((platform_counts ->> p)::BIGINT, 0) + delta)),
+        platform_converted = CASE WHEN status IN ({_sql_list(CONVERTED_STATUSES)})
+            THEN jsonb_set(platform_converted, ARRAY[p],
+                to_jsonb(COALESCE((platform_converted ->> p)::BIGINT, 0) + delta))
+            ELSE platform_converted END,
+        updated_at = NOW()
+    WHERE campaign_id = cid;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION campaign_stats_on_lead() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+        AND NEW.campaign_id IS NOT DISTINCT FROM OLD.campaign_id
+        AND NEW.platform IS NOT DISTINCT FROM OLD.platform
+        AND NEW.status IS NOT DISTINCT FROM OLD.status
+        AND NEW.intent_score IS NOT DISTINCT FROM OLD.intent_score THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM campaign_stats_apply(OLD.campaign_id, OLD.platform, OLD.status, OLD.intent_score, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM campaign_stats_apply(NEW.campaign_id, NEW.platform, NEW.status, NEW.intent_score, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS leads_campaign_stats ON leads;
+CREATE TRIGGER leads_campaign_stats AFTER INSERT OR UPDATE OR DELETE ON leads
+    FOR EACH ROW EXECUTE FUNCTION campaign_stats_on_lead();
+
+-- إعادة بناء كاملة من leads (لحملة واحدة أو للجميع)؛ القفل يمنع تداخل كتابات أثناء البناء
+CREATE OR REPLACE FUNCTION rebuild_campaign_stats(cid UUID DEFAULT NULL) RETURNS BIGINT AS $$
+DECLARE
+    rebuilt BIGINT;
+BEGIN
+    LOCK TABLE leads IN SHARE MODE;
+    DELETE FROM campaign_stats WHERE cid IS NULL OR campaign_id = cid;
+    INSERT INTO campaign_stats (campaign_id, total_leads, contacted_leads, responded_leads, converted_leads,
+                                intent_sum, score_hist, platform_counts, platform_converted)
+    SELECT l.campaign_id,
+           COUNT(*),
+           COUNT(*) FILTER (WHERE l.status IN ({_sql_list(CONTACTED_STATUSES)})),
+           COUNT(*) FILTER (WHERE l.status IN ({_sql_list(RESPONDED_STATUSES)})),
+           COUNT(*) FILTER (WHERE l.status IN ({_sql_list(CONVERTED_STATUSES)})),
+           COALESCE(SUM(l.intent_score), 0),
+           (SELECT array_agg(COALESCE(h.n, 0) ORDER BY b.bucket)::BIGINT[]
+            FROM generate_series(0, 9) AS b(bucket) LEFT JOIN (
+                SELECT {_BUCKET.format(score="intent_score")} AS bucket, COUNT(*) AS n FROM leads
+                WHERE campaign_id = l.campaign_id GROUP BY 1) h ON h.bucket = b.bucket),
+           (SELECT COALESCE(jsonb_object_agg(p.platform, p.n), '{{}}'::JSONB) FROM (
+                SELECT COALESCE(platform, 'generic') AS platform, COUNT(*) AS n FROM leads
+                WHERE campaign_id = l.campaign_id GROUP BY 1) p),
+           (SELECT COALESCE(jsonb_object_agg(p.platform, p.n), '{{}}'::JSONB) FROM (
+                SELECT COALESCE(platform, 'generic') AS platform, COUNT(*) AS n FROM leads
+                WHERE campaign_id = l.campaign_id AND status IN ({_sql_list(CONVERTED_STATUSES)}) GROUP BY 1) p)
+    FROM leads l
+    WHERE l.campaign_id IS NOT NULL AND (cid IS NULL OR l.campaign_id = cid)
+    GROUP BY l.campaign_id;
+    GET DIAGNOSTICS rebuilt = ROW_COUNT;
+    RETURN rebuilt;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ملء أولي عند إنشاء الملخص على قاعدة فيها عملاء سابقون (وإلا تُطرح تحديثاتهم من عدادات لم تحسبهم)
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM campaign_stats) AND EXISTS (SELECT 1 FROM leads) THEN
+        PERFORM rebuild_campaign_stats();
+    END IF;
+END;
+$$;
+"""
+
+
+def _rate(part: float, whole: float) -> float:
+    return part / whole * 100 if whole else 0.0
+
+
+def stats_from_row(row: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """صف campaign_stats -> قاموس الإحصائيات بالصيغة التي يستخدمها ReportGenerator"""
+    row = row or {}
+    total = row.get("total_leads") or 0
+    contacted = row.get("contacted_leads") or 0
+    responded = row.get("responded_leads") or 0
+    converted = row.get("converted_leads") or 0
+    hist = row.get("score_hist") or [0] * len(SCORE_BUCKETS)
+    platforms = {p: n for p, n in (row.get("platform_counts") or {}).items() if n}
+    platform_converted = {p: n for p, n in (row.get("platform_converted") or {}).items() if n}
+
+    top_platform = None
+    if platform_converted:
+        top_platform = max(platform_converted, key=platform_converted.get)
+    elif platforms:
+        top_platform = max(platforms, key=platforms.get)
+
+    return {
+        "total_leads": total,
+        "contacted_leads": contacted,
+        "responded_leads": responded,
+        "converted_leads": converted,
+        "response_rate": _rate(responded, contacted),
+        "conversion_rate": _rate(converted, total),
+        "avg_intent_score": (row.get("intent_sum") or 0.0) / total if total else 0.0,
+        "platform_distribution": platforms,
+        "platform_converted": platform_converted,
+        "score_distribution": {label: n for label, n in zip(SCORE_BUCKETS, hist) if n},
+        "top_performing_platform": top_platform,
+        "updated_at": row.get("updated_at"),
+    }
+
+
+def fetch_campaign_stats(client: Any, campaign_id: Any) -> Dict[str, Any]:
+    """إحصائيات حملة من الملخص فقط (صف واحد مهما كان عدد العملاء)"""
+    rows = (client.table("campaign_stats").select(",".join(STATS_COLUMNS))
+            .eq("campaign_id", campaign_id).limit(1).execute().data or [])
+    return stats_from_row(rows[0] if rows else None)
+
+
+def fetch_campaigns_stats(client: Any, campaign_ids: Sequence[Any], chunk: int = 200) -> Dict[Any, Dict[str, Any]]:
+    """إحصائيات عدة حملات باستعلام واحد (in_) لكل دفعة من المعرفات، بدل استعلام لكل حملة"""
+    ids = list(dict.fromkeys(campaign_ids))
+    rows: Dict[Any, Dict[str, Any]] = {}
+    # تقسيم القائمة يبقي طول رابط الطلب محدوداً
+    for start in range(0, len(ids), chunk):
+        result = (client.table("campaign_stats").select(",".join(STATS_COLUMNS))
+                  .in_("campaign_id", ids[start:start + chunk]).execute())
+        for row in result.data or []:
+            rows[row["campaign_id"]] = row
+    # الحملات بلا صف في الملخص (بلا عملاء بعد) تأخذ إحصائيات صفرية
+    return {campaign_id: stats_from_row(rows.get(campaign_id)) for campaign_id in ids}
+
+
+def rebuild_campaign_stats(client: Any, campaign_id: Any = None) -> int:
+    """إعادة حساب الملخص من جدول leads (بعد ترحيل أو لإصلاح انحراف)؛ يعيد عدد الحملات"""
+    result = client.rpc("rebuild_campaign_stats", {"cid": campaign_id}).execute()
+    rebuilt = result.data or 0
+    logger.info(f"Rebuilt campaign stats for {rebuilt} campaigns")
+    return rebuilt
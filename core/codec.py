@@ -0,0 +1,217 @@
+import gc
+import json
+import sys
+from contextlib import contextmanager
+from datetime import date, datetime
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Type, TypeVar
+
+from core.models import Campaign, CampaignStatus, Lead, LeadStatus, Platform
+
+try:
+    import orjson
+except ImportError:  # المكتبة اختيارية: json القياسية بنفس النتائج
+    orjson = None
+
+T = TypeVar('T')
+
+# ---- JSON ----
+
+@contextmanager
+def _bulk():
+    """إيقاف جامع القمامة الدوري أثناء بناء آلاف الكائنات (لا دورات مرجعية هنا)"""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if hasattr(value, 'tolist'):  # قيم NumPy
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> str:
+    """ترميز JSON (orjson إن وجدت)؛ يدعم datetime والتعدادات وقيم NumPy"""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    return json.dumps(value, default=_default, ensure_ascii=False)
+
+
+def loads(data: Any) -> Any:
+    with _bulk():
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
+
+
+# ---- التحويل الجماعي ----
+
+_PLATFORMS = {p.value: p for p in Platform}
+_LEAD_STATUSES = {s.value: s for s in LeadStatus}
+_CAMPAIGN_STATUSES = {s.value: s for s in CampaignStatus}
+
+@lru_cache(maxsize=4096)
+def _split_csv(value: str) -> Tuple[str, ...]:
+    # القيم نفسها تتكرر بين الحملات (المنصات، المناطق): التقسيم مرة واحدة لكل نص
+    return tuple(sys.intern(part) for part in value.split(',') if part)
+
+
+def _parse_datetime(value: Any) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def leads_to_rows(leads: Sequence[Lead]) -> List[Dict[str, Any]]:
+    """Lead -> صفوف بصيغة Lead.to_dict (مع last_contacted كنص ISO)"""
+    with _bulk():
+        return [
+            {
+                'id': lead.id,
+                'campaign_id': lead.campaign_id,
+                'url': lead.url,
+                'platform': lead.platform.value,
+                'name': lead.name,
+                'email': lead.email,
+                'phone': lead.phone,
+                'company': lead.company,
+                'job_title': lead.job_title,
+                'location': lead.location,
+                'intent_score': lead.intent_score,
+                'sentiment_score': lead.sentiment_score,
+                'relevance_score': lead.relevance_score,
+                'content_summary': lead.content_summary,
+                'engagement_metrics': lead.engagement_metrics,
+                'contact_info': lead.contact_info,
+                'status': lead.status.value,
+                'message_sent': lead.message_sent,
+                'response_received': lead.response_received,
+                'last_contacted': _iso(lead.last_contacted),
+                'created_at': lead.created_at.isoformat()
+            }
+            for lead in leads
+        ]
+
+
+def leads_from_rows(rows: Iterable[Dict[str, Any]]) -> List[Lead]:
+    """صفوف جدول leads (أو مخرجات leads_to_rows) -> Lead"""
+    now = datetime.now()
+    platforms, statuses = _PLATFORMS, _LEAD_STATUSES
+    intern = sys.intern
+    leads = []
+    with _bulk():
+        for row in rows:
+            get = row.get
+            campaign_id = get('campaign_id') or ''
+            leads.append(Lead(
+                id=get('id'),
+                campaign_id=intern(campaign_id) if isinstance(campaign_id, str) else campaign_id,
+                url=get('url') or '',
+                platform=platforms.get(get('platform'), Platform.GENERIC),
+                name=get('name') or '',
+                email=get('email') or '',
+                phone=get('phone') or '',
+                company=get('company') or '',
+                job_title=get('job_title') or '',
+                location=get('location') or '',
+                intent_score=float(get('intent_score') or 0.0),
+                sentiment_score=float(get('sentiment_score') or 0.0),
+                relevance_score=float(get('relevance_score') or 0.0),
+                content_summary=get('content_summary') or '',
+                engagement_metrics=get('engagement_metrics') or {},
+                contact_info=get('contact_info') or {},
+                status=statuses.get(get('status'), LeadStatus.NEW),
+                message_sent=bool(get('message_sent')),
+                response_received=bool(get('response_received')),
+                last_contacted=_parse_datetime(get('last_contacted')),
+                created_at=_parse_datetime(get('created_at')) or now
+            ))
+    return leads
+
+
+def campaigns_from_rows(rows: Iterable[Dict[str, Any]]) -> List[Campaign]:
+    """صفوف جدول campaigns -> Campaign (القوائم من نصوص مفصولة بفواصل، بلا عناصر فارغة)"""
+    now = datetime.now()
+    campaigns = []
+    with _bulk():
+        for row in rows:
+            get = row.get
+            campaigns.append(Campaign(
+                id=get('id'),
+                name=get('name', ''),
+                description=get('description', ''),
+                keywords=list(_split_csv(get('keywords') or '')),
+                target_platforms=[_PLATFORMS[p] for p in _split_csv(get('target_platforms') or '')],
+                target_regions=list(_split_csv(get('target_regions') or '')),
+                target_industries=list(_split_csv(get('target_industries') or '')),
+                target_job_titles=list(_split_csv(get('target_job_titles') or '')),
+                usp=get('usp', ''),
+                product_link=get('product_link', ''),
+                messaging_tone=get('messaging_tone', 'professional'),
+                max_leads=get('max_leads', 100),
+                min_intent_score=get('min_intent_score', 70.0),
+                min_relevance_score=get('min_relevance_score', 60.0),
+                status=_CAMPAIGN_STATUSES[get('status', 'draft')],
+                created_at=_parse_datetime(get('created_at')) or now,
+                started_at=_parse_datetime(get('started_at')),
+                completed_at=_parse_datetime(get('completed_at'))
+            ))
+    return campaigns
+
+
+def campaigns_to_rows(campaigns: Sequence[Campaign]) -> List[Dict[str, Any]]:
+    """Campaign -> صفوف بصيغة جدول campaigns (القوائم كنصوص مفصولة بفواصل)"""
+    rows = []
+    with _bulk():
+        for c in campaigns:
+            rows.append({
+                'id': c.id,
+                'name': c.name,
+                'description': c.description,
+                'keywords': ','.join(c.keywords),
+                'target_platforms': ','.join(p.value for p in c.target_platforms),
+                'target_regions': ','.join(c.target_regions),
+                'target_industries': ','.join(c.target_industries),
+                'target_job_titles': ','.join(c.target_job_titles),
+                'usp': c.usp,
+                'product_link': c.product_link,
+                'messaging_tone': c.messaging_tone,
+                'max_leads': c.max_leads,
+                'min_intent_score': c.min_intent_score,
+                'min_relevance_score': c.min_relevance_score,
+                'status': c.status.value,
+                'created_at': c.created_at.isoformat(),
+                'started_at': _iso(c.started_at),
+                'completed_at': _iso(c.completed_at)
+            })
+    return rows
+
+
+_FROM_ROWS = {Lead: leads_from_rows, Campaign: campaigns_from_rows}
+_TO_ROWS = {Lead: leads_to_rows, Campaign: campaigns_to_rows}
+
+
+def from_rows(cls: Type[T], rows: Iterable[Dict[str, Any]]) -> List[T]:
+    """تحويل نتيجة استعلام كاملة إلى كائنات النموذج"""
+    return _FROM_ROWS[cls](rows)
+
+
+def to_rows(items: Sequence[Any]) -> List[Dict[str, Any]]:
+    """تحويل قائمة كائنات من نفس النموذج إلى صفوف"""
+    if not items:
+        return []
+    return _TO_ROWS[type(items[0])](items)
@@ -1,19 +1,91 @@
-from duckduckgo_search import DDGS
 from loguru import logger
+import asyncio
 import time
 import random
+from itertools import product
+from typing import Dict, Iterable, List, Tuple
 from tenacity import retry, stop_after_attempt, wait_exponential
 
+from core.search_providers import resolve_provider
+
+# (campaign_id, keywords, region)
+ScanJob = Tuple[str, str, str]
+
+
 class CyberHunter:
-    def __init__(self):
-        self.ddgs = DDGS()
+    def __init__(self, concurrency: int = 4, queries_per_second: float = 1.0):
+        self.provider = resolve_provider(default="duckduckgo")
+        self.concurrency = concurrency
+        self.min_interval = 1.0 / queries_per_second if queries_per_second > 0 else 0.0
+        self._last_query_at = 0.0
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
-    def scan(self, keywords: str, region: str):
+    @staticmethod
+    def build_query(keywords: str, region: str) -> str:
         query = f'"{keywords}" site:reddit.com OR site:twitter.com OR site:linkedin.com'
         if region:
             query += f' location:"{region}"'
-        
+        return query
+
+    def scan(self, keywords: str, region: str):
+        query = self.build_query(keywords, region)
+        return asyncio.run(self._fetch(query))
+
+    @staticmethod
+    def build_jobs(missions: List[Dict]) -> List[ScanJob]:
+        """Expand every mission into its keyword x region scan jobs."""
+        jobs = []
+        for mission in missions:
+            keywords = [k.strip() for k in (mission.get('keywords') or '').split(',') if k.strip()]
+            regions = [r.strip() for r in (mission.get('target_region') or '').split(',') if r.strip()]
+            for keyword, region in product(keywords, regions or ['']):
+                jobs.append((mission['id'], keyword, region))
+        return jobs
+
+    async def scan_batch(self, jobs: Iterable[ScanJob]) -> Dict[str, List[Dict]]:
+        """Run many scans concurrently; identical queries hit the network once."""
+        by_query: Dict[str, List[str]] = {}
+        for campaign_id, keywords, region in jobs:
+            query = self.build_query(keywords.strip(), region.strip())
+            owners = by_query.setdefault(query, [])
+            if campaign_id not in owners:
+                owners.append(campaign_id)
+
+        logger.info(f"Batch scan: {len(by_query)} unique queries")
+        semaphore = asyncio.Semaphore(self.concurrency)
+        pacing = asyncio.Lock()
+        queries = list(by_query)
+        outcomes = await asyncio.gather(
+            *(self._scan_async(q, semaphore, pacing) for q in queries),
+            return_exceptions=True
+        )
+
+        tagged: Dict[str, List[Dict]] = {}
+        for query, outcome in zip(queries, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"Scan failed for {query}: {outcome}")
+                outcome = []
+            for campaign_id in by_query[query]:
+                bucket = tagged.setdefault(campaign_id, [])
+                seen = {r.get('href') for r in bucket}
+                for result in outcome:
+                    if result.get('href') not in seen:
+                        bucket.append({**result, 'campaign_id': campaign_id})
+                        seen.add(result.get('href'))
+        return tagged
+
+    async def _scan_async(self, query: str, semaphore: asyncio.Semaphore, pacing: asyncio.Lock) -> List[Dict]:
+        async with semaphore:
+            # Space query starts so the whole batch stays under the rate limit
+            async with pacing:
+                wait = self._last_query_at + self.min_interval - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._last_query_at = time.monotonic()
+            return await self._fetch(query)
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
+    async def _fetch(self, query: str) -> List[Dict]:
         logger.info(f"Scanning: {query}")
-        results = self.ddgs.text(query, max_results=10)
-        return results or []
+        results = await self.provider.search(query, 10)
+        # Keep the DDGS result shape (title/href/body) the orchestrator expects
+        return [{'title': r['title'], 'href': r['url'], 'body': r['snippet']} for r in results]
@@ -1,27 +1,147 @@
+import heapq
 import os
 from supabase import create_client, Client
 from loguru import logger
 from datetime import datetime
 
+from core.campaign_cache import get_campaign_cache
+from core.campaign_stats import fetch_campaign_stats, fetch_campaigns_stats, rebuild_campaign_stats
+from core.codec import campaigns_from_rows, leads_from_rows
+from core.journal import get_journal, journal_write
+from core.lead_trends import fetch_trends, rebuild_lead_trends
+from core.lead_export import LEAD_EXPORT_COLUMNS, export_leads, iter_lead_pages
+from core.seen_index import get_seen_index
+
+# Columns the dashboard shows for top leads (the rest of the row is never fetched)
+TOP_LEAD_COLUMNS = ("id", "campaign_id", "url", "platform", "intent_score", "status", "contact_info", "created_at")
+
 class DatabaseService:
     def __init__(self):
         self.supabase: Client = create_client(
             os.getenv("SUPABASE_URL"), 
             os.getenv("SUPABASE_KEY")
         )
+        # Writes land in the local journal; a background thread replicates them in bulk
+        get_journal(client_factory=lambda: self.supabase)
+        self.seen = get_seen_index(self.supabase)
+        # Active campaigns are loaded once, then only rows changed since the last poll are fetched
+        self.campaigns = get_campaign_cache(self.supabase)
 
     def fetch_active_campaigns(self):
         try:
-            return self.supabase.table('campaigns').select("*").eq('status', 'active').execute().data
+            return self.campaigns.active()
+        except Exception as e:
+            logger.error(f"DB Fetch Error: {e}")
+            return []
+
+    def get_active_campaigns(self):
+        """Active campaigns as stable Campaign objects (rebuilt only when their row changes)."""
+        try:
+            return self.campaigns.objects(campaigns_from_rows)
         except Exception as e:
             logger.error(f"DB Fetch Error: {e}")
             return []
 
     def log_lead(self, payload: dict):
         try:
-            self.supabase.table('leads').upsert(payload, on_conflict='url').execute()
+            journal_write('leads', 'upsert', payload, key_column='url')
+            self.seen.add(payload['url'])
         except Exception as e:
             logger.error(f"DB Insert Error: {e}")
             
     def update_campaign_status(self, campaign_id: int, status: str):
-        self.supabase.table('campaigns').update({'status': status}).eq('id', campaign_id).execute()
+        journal_write('campaigns', 'update', {'id': campaign_id, 'status': status}, key_column='id')
+
+    def get_campaign_stats(self, campaign_id) -> dict:
+        """Counters from the campaign_stats rollup (one row, independent of the lead count)."""
+        try:
+            return fetch_campaign_stats(self.supabase, campaign_id)
+        except Exception as e:
+            logger.error(f"DB Stats Error: {e}")
+            return {}
+
+    def get_campaigns_stats(self, campaign_ids) -> dict:
+        """Stats for many campaigns from one grouped read of the rollup: {campaign_id: stats}."""
+        try:
+            return fetch_campaigns_stats(self.supabase, campaign_ids)
+        except Exception as e:
+            logger.error(f"DB Stats Error: {e}")
+            return {}
+
+    def rebuild_campaign_stats(self, campaign_id=None) -> int:
+        """Recompute the rollup from the leads table (all campaigns when campaign_id is None)."""
+        return rebuild_campaign_stats(self.supabase, campaign_id)
+
+    def get_lead_trends(self, periods: int, granularity: str = 'day', campaign_id=None, platform: str = None):
+        """Leads/contacts/responses/conversions per hour or day bucket, newest first."""
+        try:
+            return fetch_trends(self.supabase, periods, granularity, campaign_id, platform)
+        except Exception as e:
+            logger.error(f"DB Trends Error: {e}")
+            return []
+
+    def rebuild_lead_trends(self, campaign_id=None) -> int:
+        return rebuild_lead_trends(self.supabase, campaign_id)
+
+    def get_top_leads(self, k: int = 10, campaign_id=None, platform: str = None, columns=TOP_LEAD_COLUMNS,
+                      campaign_ids=None, chunk: int = 200):
+        """Highest-intent leads via `order by intent_score desc limit k` in the database.
+
+        Covers one campaign, a set of campaigns (`campaign_ids`), one platform, or all
+        campaigns when none are given. Long id lists are queried in chunks and merged.
+        """
+        try:
+            if campaign_ids is None:
+                return leads_from_rows(self._top_lead_rows(k, campaign_id, platform, columns))
+            ids = list(dict.fromkeys(campaign_ids))
+            rows = []
+            for start in range(0, len(ids), chunk):
+                rows.extend(self._top_lead_rows(k, campaign_id, platform, columns, ids[start:start + chunk]))
+            if len(ids) > chunk:
+                rows = heapq.nlargest(k, rows, key=lambda row: row.get('intent_score') or 0)
+            return leads_from_rows(rows)
+        except Exception as e:
+            logger.error(f"DB Fetch Error: {e}")
+            return []
+
+    def _top_lead_rows(self, k, campaign_id, platform, columns, campaign_ids=None):
+        query = self.supabase.table('leads').select(",".join(columns))
+        if campaign_id is not None:
+            query = query.eq('campaign_id', campaign_id)
+        if campaign_ids is not None:
+            query = query.in_('campaign_id', campaign_ids)
+        if platform is not None:
+            query = query.eq('platform', platform)
+        return query.order('intent_score', desc=True, nullsfirst=False).limit(k).execute().data or []
+
+    def get_top_leads_by_platform(self, platforms, k: int = 10, campaign_id=None, campaign_ids=None) -> dict:
+        """{platform: top k leads}: one indexed limit-k query per platform."""
+        return {platform: self.get_top_leads(k, campaign_id, platform, campaign_ids=campaign_ids)
+                for platform in platforms}
+
+    def get_campaign_leads(self, campaign_id, columns=LEAD_EXPORT_COLUMNS, limit: int = None):
+        """Leads of one campaign as Lead objects, read page by page with only the given columns."""
+        leads = []
+        try:
+            for rows in iter_lead_pages(self.supabase, campaign_id, columns):
+                leads.extend(leads_from_rows(rows))
+                if limit is not None and len(leads) >= limit:
+                    return leads[:limit]
+        except Exception as e:
+            logger.error(f"DB Fetch Error: {e}")
+        return leads
+
+    def export_leads(self, campaign_id, path: str, fmt: str = None, columns=LEAD_EXPORT_COLUMNS, progress=None) -> int:
+        """Stream a campaign's leads to CSV/NDJSON/Parquet with constant memory; returns the row count."""
+        if progress is None:
+            def progress(written, total):
+                logger.info(f"Export {path}: {written}/{total if total is not None else '?'} leads")
+        return export_leads(self.supabase, path, campaign_id, fmt=fmt, columns=columns, progress=progress)
+
+    def export_leads_to_csv(self, campaign_id, filepath: str) -> bool:
+        try:
+            self.export_leads(campaign_id, filepath, fmt='csv')
+            return True
+        except Exception as e:
+            logger.error(f"Export Error: {e}")
+            return False
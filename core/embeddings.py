@@ -0,0 +1,37 @@
+import logging
+import threading
+from typing import List
+
+import numpy as np
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_model = None
+_lock = threading.Lock()
+
+
+def get_embedder():
+    """نموذج التضمين المشترك (يحمل مرة واحدة لكل عملية)"""
+    global _model
+    with _lock:
+        if _model is None:
+            from sentence_transformers import SentenceTransformer
+
+            logger.info(f"Loading embedding model {settings.EMBEDDING_MODEL}")
+            _model = SentenceTransformer(settings.EMBEDDING_MODEL, device="cpu")
+    return _model
+
+
+def embed(texts: List[str], batch_size: int = None) -> np.ndarray:
+    """تضمين النصوص كمتجهات float32 مطبّعة (الضرب النقطي = تشابه جيب التمام)"""
+    if not texts:
+        return np.zeros((0, get_embedder().get_sentence_embedding_dimension()), dtype=np.float32)
+    vectors = get_embedder().encode(
+        list(texts),
+        batch_size=batch_size or settings.LOCAL_BATCH_SIZE,
+        normalize_embeddings=True,
+        convert_to_numpy=True
+    )
+    return vectors.astype(np.float32, copy=False)
@@ -0,0 +1,76 @@
+import logging
+import shutil
+import sys
+from pathlib import Path
+from typing import Optional
+
+from transformers import AutoTokenizer, pipeline
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+SENTIMENT_MODEL = "distilbert-base-uncased-finetuned-sst-2-english"
+ZERO_SHOT_MODEL = "facebook/bart-large-mnli"
+
+QUANTIZED_FILE = "model_quantized.onnx"
+
+
+def build_pipeline(task: str, model_id: str, backend: Optional[str] = None):
+    """إنشاء pipeline للمهمة بالواجهة الخلفية المحددة في الإعدادات (torch أو onnx)"""
+    backend = backend or settings.INFERENCE_BACKEND
+
+    if backend == "onnx":
+        return _build_onnx_pipeline(task, model_id)
+    if backend != "torch":
+        raise ValueError(f"Unknown inference backend: {backend}")
+
+    return pipeline(task, model=model_id)
+
+
+def onnx_model_dir(model_id: str) -> Path:
+    """مجلد النسخة المصدرة والمكممة من النموذج"""
+    return Path(settings.ONNX_MODEL_DIR) / model_id.replace("/", "__")
+
+
+def _build_onnx_pipeline(task: str, model_id: str):
+    """pipeline يعمل على ONNX Runtime بنموذج int8 مكمم"""
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+
+    model_dir = onnx_model_dir(model_id)
+    if not (model_dir / QUANTIZED_FILE).exists():
+        logger.info(f"No quantized ONNX model for {model_id}, exporting to {model_dir}")
+        export_quantized(model_id, model_dir)
+
+    model = ORTModelForSequenceClassification.from_pretrained(model_dir, file_name=QUANTIZED_FILE)
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    return pipeline(task, model=model, tokenizer=tokenizer)
+
+
+def export_quantized(model_id: str, output_dir: Optional[Path] = None) -> Path:
+    """تصدير النموذج إلى ONNX ثم تكميمه ديناميكياً إلى int8"""
+    from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    output_dir = Path(output_dir or onnx_model_dir(model_id))
+    fp32_dir = output_dir / "fp32"
+
+    model = ORTModelForSequenceClassification.from_pretrained(model_id, export=True)
+    model.save_pretrained(fp32_dir)
+    AutoTokenizer.from_pretrained(model_id).save_pretrained(output_dir)
+
+    # التكميم الديناميكي لا يحتاج بيانات معايرة
+    qconfig = getattr(AutoQuantizationConfig, settings.ONNX_QUANTIZATION)(is_static=False, per_channel=False)
+    quantizer = ORTQuantizer.from_pretrained(fp32_dir)
+    quantizer.quantize(save_dir=output_dir, quantization_config=qconfig)
+
+    shutil.rmtree(fp32_dir, ignore_errors=True)
+    logger.info(f"Exported quantized {model_id} to {output_dir}")
+    return output_dir
+
+
+if __name__ == "__main__":
+    # python -m core.inference_backends [model_id ...]
+    logging.basicConfig(level=logging.INFO)
+    for model_id in sys.argv[1:] or [SENTIMENT_MODEL, ZERO_SHOT_MODEL]:
+        export_quantized(model_id)
@@ -0,0 +1,250 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.settings import settings
+from core.inference_backends import SENTIMENT_MODEL, ZERO_SHOT_MODEL, build_pipeline
+from core.text_budget import get_token_counter, run_bucketed
+
+logger = logging.getLogger(__name__)
+
+TASK_MODELS = {
+    "sentiment-analysis": SENTIMENT_MODEL,
+    "zero-shot-classification": ZERO_SHOT_MODEL,
+}
+
+# حد طول السطر الواحد في البروتوكول (JSON لكل سطر)
+STREAM_LIMIT = 16 * 1024 * 1024
+
+
+class InferenceServer:
+    """خادم استدلال محلي مشترك: يحمل النماذج مرة واحدة ويجمع طلبات كل العملاء في دفعات"""
+
+    def __init__(self, socket_path: str = None):
+        self.socket_path = socket_path or settings.INFERENCE_SOCKET
+        self.pipelines = {task: build_pipeline(task, model_id) for task, model_id in TASK_MODELS.items()}
+        self.token_counters = {task: get_token_counter(pipe.tokenizer) for task, pipe in self.pipelines.items()}
+        self.queue: asyncio.Queue = None
+        # خيط واحد للنماذج: الدفعات تتشارك المعالج بدلاً من التنافس عليه
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    async def serve(self):
+        """تشغيل الخادم على Unix socket"""
+        self.queue = asyncio.Queue()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        server = await asyncio.start_unix_server(self._handle_client, path=self.socket_path, limit=STREAM_LIMIT)
+        batcher = asyncio.create_task(self._batch_loop())
+        logger.info(f"Inference server listening on {self.socket_path}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """قراءة الطلبات من العميل ووضعها في طابور التجميع"""
+        pending = set()
+        try:
+            while line := await reader.readline():
+                request, error = self._parse(line)
+                if error:
+                    # رد بالخطأ بدل إدخال طلب معطوب إلى حلقة التجميع
+                    writer.write(json.dumps({'id': request.get('id'), 'error': error}).encode() + b"\n")
+                    await writer.drain()
+                    continue
+                future = asyncio.get_running_loop().create_future()
+                await self.queue.put((request, future))
+                task = asyncio.create_task(self._reply(writer, request.get('id'), future))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        except Exception as e:
+            logger.error(f"Inference client error: {e}")
+        finally:
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            writer.close()
+
+    def _parse(self, line: bytes) -> Tuple[Dict, Optional[str]]:
+        """تحليل طلب والتحقق من حقوله؛ يعيد (الطلب، رسالة الخطأ أو None)"""
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return {}, f"invalid JSON: {e}"
+        if not isinstance(request, dict):
+            return {}, "request must be a JSON object"
+        if request.get('task') not in self.pipelines:
+            return request, f"unknown task: {request.get('task')!r}"
+        inputs = request.get('inputs')
+        if not isinstance(inputs, list) or not all(isinstance(text, str) for text in inputs):
+            return request, "inputs must be a list of strings"
+        if request['task'] == "zero-shot-classification" and not request.get('candidate_labels'):
+            return request, "candidate_labels required for zero-shot-classification"
+        return request, None
+
+    async def _reply(self, writer: asyncio.StreamWriter, request_id: Any, future: asyncio.Future):
+        try:
+            response = {'id': request_id, 'outputs': await future}
+        except Exception as e:
+            response = {'id': request_id, 'error': str(e)}
+        writer.write(json.dumps(response).encode() + b"\n")
+        await writer.drain()
+
+    async def _batch_loop(self):
+        """تجميع الطلبات المتشابهة خلال نافذة زمنية قصيرة وتشغيلها كدفعة واحدة"""
+        loop = asyncio.get_running_loop()
+        window = settings.INFERENCE_BATCH_WINDOW_MS / 1000
+
+        while True:
+            batch = [await self.queue.get()]
+            size = len(batch[0][0]['inputs'])
+            deadline = loop.time() + window
+            while size < settings.INFERENCE_MAX_BATCH:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                size += len(item[0]['inputs'])
+
+            # لا تُجمع إلا الطلبات التي تتطابق في المهمة والتسميات
+            groups: Dict[Tuple, List] = {}
+            for request, future in batch:
+                key = (request['task'], tuple(request.get('candidate_labels') or ()), bool(request.get('multi_label')))
+                groups.setdefault(key, []).append((request, future))
+
+            for key, items in groups.items():
+                try:
+                    outputs = await loop.run_in_executor(self.executor, self._run, key, items)
+                except Exception as e:
+                    for _, future in items:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                offset = 0
+                for request, future in items:
+                    count = len(request['inputs'])
+                    if not future.done():
+                        future.set_result(outputs[offset:offset + count])
+                    offset += count
+
+    def _run(self, key: Tuple, items: List) -> List:
+        task, labels, multi_label = key
+        inputs = [text for request, _ in items for text in request['inputs']]
+        pipe = self.pipelines[task]
+
+        if task == "zero-shot-classification":
+            run = lambda chunk, size: pipe(chunk, list(labels), multi_label=multi_label, batch_size=size)
+        else:
+            run = lambda chunk, size: pipe(chunk, batch_size=size)
+        # دفعات متقاربة الطول من كل العملاء معاً
+        return run_bucketed(run, inputs, self.token_counters[task], settings.LOCAL_BATCH_SIZE)
+
+
+class RemotePipeline:
+    """عميل خفيف بنفس واجهة pipeline في transformers، يرسل الطلبات إلى خادم الاستدلال"""
+
+    def __init__(self, task: str, socket_path: str = None):
+        self.task = task
+        self.socket_path = socket_path or settings.INFERENCE_SOCKET
+        self._sock: Optional[socket.socket] = None
+        self._file = None
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def _connect(self):
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.connect(self.socket_path)
+        self._file = self._sock.makefile('rb')
+
+    def close(self):
+        if self._sock:
+            self._sock.close()
+        self._sock, self._file = None, None
+
+    def __call__(self, inputs, candidate_labels=None, multi_label=False, **kwargs):
+        single = isinstance(inputs, str)
+        texts = [inputs] if single else list(inputs)
+
+        with self._lock:
+            self._next_id += 1
+            request = {
+                'id': self._next_id,
+                'task': self.task,
+                'inputs': texts,
+                'candidate_labels': candidate_labels,
+                'multi_label': multi_label
+            }
+            response = None
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    self._sock.sendall(json.dumps(request).encode() + b"\n")
+                    line = self._file.readline()
+                    if not line:
+                        raise ConnectionError("Inference server closed the connection")
+                    response = json.loads(line)
+                    break
+                except OSError:
+                    # إعادة الاتصال مرة واحدة إذا أعيد تشغيل الخادم
+                    self.close()
+                    if attempt:
+                        raise
+
+        if 'error' in response:
+            raise RuntimeError(f"Inference server error: {response['error']}")
+
+        outputs = response['outputs']
+        # نفس شكل مخرجات pipeline: zero-shot لنص واحد يعيد dict
+        if single and self.task == "zero-shot-classification":
+            return outputs[0]
+        return outputs
+
+
+def server_available(socket_path: str = None) -> bool:
+    """هل خادم الاستدلال يعمل ويقبل الاتصالات؟"""
+    socket_path = socket_path or settings.INFERENCE_SOCKET
+    if not socket_path or not os.path.exists(socket_path):
+        return False
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            probe.connect(socket_path)
+        return True
+    except OSError:
+        return False
+
+
+def wait_for_server(timeout: float, socket_path: str = None) -> bool:
+    """انتظار الخادم حتى المهلة: ينشئ الـ socket بعد تحميل نماذجه، وقد يبدأ العمال قبله"""
+    deadline = time.monotonic() + timeout
+    while True:
+        if server_available(socket_path):
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.5)
+
+
+def load_pipeline(task: str, model_id: str):
+    """استخدام خادم الاستدلال المشترك إن كان متاحاً (بعد انتظاره)، وإلا تحميل النموذج محلياً"""
+    if settings.INFERENCE_SOCKET and wait_for_server(settings.INFERENCE_WAIT_SECONDS):
+        logger.info(f"Using shared inference server for {task}")
+        return RemotePipeline(task)
+    logger.info(f"Inference server not available (waited {settings.INFERENCE_WAIT_SECONDS:.0f}s), loading {task} locally")
+    return build_pipeline(task, model_id)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(InferenceServer().serve())
@@ -0,0 +1,283 @@
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config.settings import settings
+from core.codec import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    tbl TEXT NOT NULL,
+    op TEXT NOT NULL,            -- upsert / update
+    key_column TEXT NOT NULL,    -- عمود التعارض (url) أو المطابقة (id)
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS dead_letter (
+    seq INTEGER PRIMARY KEY,
+    tbl TEXT NOT NULL,
+    op TEXT NOT NULL,
+    key_column TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    attempts INTEGER NOT NULL,
+    error TEXT,
+    failed_at REAL NOT NULL
+);
+"""
+
+JournalEntry = Tuple[int, str, str, str, str, Dict[str, Any]]
+
+
+class WriteJournal:
+    """سجل كتابة محلي (SQLite بوضع WAL): كل كتابة تُحفظ محلياً أولاً ثم تُنسخ إلى Supabase"""
+
+    def __init__(self, path: str = None):
+        self.path = path or settings.JOURNAL_PATH
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL مع WAL: لا fsync لكل معاملة، والسجل يبقى متسقاً بعد انقطاع العملية
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def append(self, table: str, op: str, payload: Dict[str, Any], key_column: str):
+        """إضافة كتابة إلى السجل (زمن القرص المحلي فقط)"""
+        key = dumps(payload[key_column])
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO outbox (tbl, op, key_column, key, payload, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (table, op, key_column, key, dumps(payload), time.time())
+            )
+
+    def pending(self, limit: int) -> List[JournalEntry]:
+        """أقدم الكتابات التي لم تُنسخ بعد"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, tbl, op, key_column, key, payload FROM outbox ORDER BY seq LIMIT ?", (limit,)
+            ).fetchall()
+        return [(seq, tbl, op, key_column, key, loads(payload))
+                for seq, tbl, op, key_column, key, payload in rows]
+
+    def ack(self, seqs: List[int]):
+        """حذف الكتابات التي وصلت إلى Supabase"""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("DELETE FROM outbox WHERE seq = ?", [(seq,) for seq in seqs])
+            self._conn.execute("COMMIT")
+
+    def mark_failed(self, seqs: List[int], error: str = None) -> int:
+        """زيادة محاولات كتابات رفضتها Supabase؛ ما بلغ الحد يُنقل إلى dead_letter ويعاد عدده"""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("UPDATE outbox SET attempts = attempts + 1 WHERE seq = ?", [(seq,) for seq in seqs])
+            marks = ",".join("?" * len(seqs))
+            params = (settings.JOURNAL_MAX_ATTEMPTS, *seqs)
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO dead_letter SELECT seq, tbl, op, key_column, key, payload, created_at, attempts, ?, ? "
+                f"FROM outbox WHERE attempts >= ? AND seq IN ({marks})",
+                (error, time.time(), *params)
+            )
+            dead = self._conn.execute(f"DELETE FROM outbox WHERE attempts >= ? AND seq IN ({marks})", params).rowcount
+            self._conn.execute("COMMIT")
+        return dead
+
+    def dead_letters(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM dead_letter").fetchone()[0]
+
+    def requeue_dead_letters(self) -> int:
+        """إعادة الكتابات الميتة إلى الطابور يدوياً (بعد إصلاح سبب رفضها)"""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "INSERT INTO outbox (seq, tbl, op, key_column, key, payload, created_at) "
+                "SELECT seq, tbl, op, key_column, key, payload, created_at FROM dead_letter"
+            )
+            requeued = self._conn.execute("DELETE FROM dead_letter").rowcount
+            self._conn.execute("COMMIT")
+        return requeued
+
+    def backlog(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+
+class JournalReplicator:
+    """خيط خلفي ينسخ السجل إلى Supabase على دفعات، بكتابات متكررة الأمان وتراجع أسي عند التعثر"""
+
+    def __init__(self, journal: WriteJournal, client_factory: Callable[[], Any]):
+        self.journal = journal
+        self.client_factory = client_factory
+        self.client = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="journal-replicator", daemon=True)
+
+    def start(self) -> "JournalReplicator":
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+
+    def notify(self):
+        """إيقاظ الناسخ بعد كتابة جديدة بدل انتظار المهلة"""
+        self._wake.set()
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """انتظار تفريغ السجل (عند الإغلاق مثلاً)؛ يعيد True إذا فرغ"""
+        deadline = time.monotonic() + timeout
+        while self.journal.pending(1):
+            if time.monotonic() >= deadline:
+                return False
+            self._wake.set()
+            time.sleep(0.1)
+        return True
+
+    def _run(self):
+        backoff = settings.JOURNAL_FLUSH_INTERVAL
+        while not self._stop.is_set():
+            entries = self.journal.pending(settings.JOURNAL_BATCH_SIZE)
+            if not entries:
+                self._wake.wait(settings.JOURNAL_FLUSH_INTERVAL)
+                self._wake.clear()
+                continue
+
+            try:
+                if self.client is None:
+                    self.client = self.client_factory()
+                failed = self._replicate(entries)
+            except Exception as e:
+                # عطل في الاتصال أو الخدمة أو الصلاحية: لا يُحسب على الكتابات، والدفعة كلها تنتظر
+                backoff = min(backoff * 2, settings.JOURNAL_MAX_BACKOFF)
+                logger.warning(f"Replication failed ({len(entries)} writes pending), retrying in {backoff:.0f}s: {e}")
+                # الانتظار مع تذبذب عشوائي؛ الإيقاظ بكتابة جديدة لا يقطع التراجع
+                self._stop.wait(backoff * random.uniform(0.8, 1.2))
+                continue
+
+            backoff = settings.JOURNAL_FLUSH_INTERVAL
+            logger.debug(f"Replicated {len(entries) - failed} journal writes, {failed} rejected")
+            if failed or len(entries) < settings.JOURNAL_BATCH_SIZE:
+                # تجميع الكتابات المتفرقة في دفعة واحدة كل فترة (ومهلة قبل إعادة المرفوضة)
+                self._stop.wait(settings.JOURNAL_FLUSH_INTERVAL)
+
+    def _replicate(self, entries: List[JournalEntry]) -> int:
+        """دفع دفعة؛ إن رفضتها Supabase تُنصّف حتى عزل الصفوف المرفوضة، ويُؤكد الباقي. يعيد عدد المرفوض"""
+        try:
+            self._push(entries)
+        except Exception as e:
+            if not _is_rejection(e):
+                raise
+            if len(entries) == 1:
+                dead = self.journal.mark_failed([entries[0][0]], str(e))
+                if dead:
+                    logger.error(f"Journal write {entries[0][0]} ({entries[0][1]}) moved to dead_letter: {e}")
+                else:
+                    logger.warning(f"Journal write {entries[0][0]} ({entries[0][1]}) rejected: {e}")
+                return 1
+            middle = len(entries) // 2
+            return self._replicate(entries[:middle]) + self._replicate(entries[middle:])
+        self.journal.ack([entry[0] for entry in entries])
+        return 0
+
+    def _push(self, entries: List[JournalEntry]):
+        """دمج الكتابات لكل مفتاح ثم إرسالها كطلبات جماعية"""
+        upserts: Dict[Tuple[str, str], Dict[str, Dict]] = {}
+        updates: Dict[Tuple[str, str], Dict[str, Dict]] = {}
+        for _, table, op, key_column, key, payload in entries:
+            target = upserts if op == "upsert" else updates
+            # الكتابات اللاحقة لنفس المفتاح تتغلب على السابقة
+            target.setdefault((table, key_column), {}).setdefault(key, {}).update(payload)
+
+        for (table, key_column), rows in upserts.items():
+            # الصفوف في الطلب الواحد يجب أن تتشارك نفس الأعمدة
+            by_columns: Dict[Tuple[str, ...], List[Dict]] = {}
+            for row in rows.values():
+                by_columns.setdefault(tuple(sorted(row)), []).append(row)
+            for batch in by_columns.values():
+                self.client.table(table).upsert(batch, on_conflict=key_column).execute()
+
+        for (table, key_column), rows in updates.items():
+            # تحديث واحد لكل مجموعة قيم متطابقة (مثل نفس الحالة لعدة حملات)
+            by_values: Dict[str, Tuple[Dict, List]] = {}
+            for row in rows.values():
+                fields = {k: v for k, v in row.items() if k != key_column}
+                signature = dumps(sorted(fields.items()))
+                by_values.setdefault(signature, (fields, []))[1].append(row[key_column])
+            for fields, keys in by_values.values():
+                self.client.table(table).update(fields).in_(key_column, keys).execute()
+
+
+# رفض لبيانات الصفوف نفسها: حالات HTTP، وأكواد Postgres/PostgREST
+# (22 قيمة غير صالحة، 23 قيود، 42 عمود أو نوع عدا 42501 الصلاحيات، PGRST1/PGRST2 الطلب والمخطط)
+_REJECTED_STATUS = {400, 404, 409, 422}
+_REJECTED_CODES = ("22", "23", "42", "PGRST1", "PGRST2")
+
+
+def _status_of(error: Exception) -> Optional[int]:
+    # APIError يحمل حالة HTTP في code عندما لا يكون الرد JSON (بوابة 502/503/429)
+    for value in (getattr(error, "status_code", None),
+                  getattr(getattr(error, "response", None), "status_code", None),
+                  getattr(error, "code", None)):
+        if isinstance(value, int) or (isinstance(value, str) and len(value) == 3 and value.isdigit()):
+            return int(value)
+    return None
+
+
+def _is_rejection(error: Exception) -> bool:
+    """رفض Supabase لبيانات صف معين (تُنصّف الدفعة لعزله)
+
+    ما عداه (الشبكة، 5xx، 429، 401/403، أكواد PGRST0/PGRST3) عطل في الخدمة أو الصلاحية:
+    تنتظر الدفعة كاملة دون احتساب محاولات على الكتابات.
+    """
+    status = _status_of(error)
+    if status is not None:
+        return status in _REJECTED_STATUS
+    code = getattr(error, "code", None)
+    return isinstance(code, str) and code != "42501" and code.startswith(_REJECTED_CODES)
+
+
+_journal: Optional[WriteJournal] = None
+_replicator: Optional[JournalReplicator] = None
+_journal_lock = threading.Lock()
+
+
+def get_journal(client_factory: Callable[[], Any] = None) -> WriteJournal:
+    """سجل الكتابة المشترك للعملية؛ أول مستدعٍ يمرر client_factory يشغّل الناسخ"""
+    global _journal, _replicator
+    with _journal_lock:
+        if _journal is None:
+            _journal = WriteJournal()
+            dead = _journal.dead_letters()
+            if dead:
+                logger.warning(f"{dead} journal writes are in dead_letter (requeue_dead_letters() after fixing them)")
+        if _replicator is None and client_factory is not None:
+            _replicator = JournalReplicator(_journal, client_factory).start()
+    return _journal
+
+
+def get_replicator() -> Optional[JournalReplicator]:
+    return _replicator
+
+
+def journal_write(table: str, op: str, payload: Dict[str, Any], key_column: str):
+    """كتابة إلى السجل مع إيقاظ الناسخ"""
+    get_journal().append(table, op, payload, key_column)
+    if _replicator is not None:
+        _replicator.notify()
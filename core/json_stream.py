@@ -0,0 +1,78 @@
+import json
+from typing import Any, Dict, Optional
+
+# ما يُنهي رقماً داخل كائن
+_NUMBER_END = ",} \t\r\n"
+
+
+class IncrementalJSONObject:
+    """محلل JSON تدريجي لكائن على المستوى الأعلى: يكشف كل حقل فور اكتمال قيمته أثناء البث"""
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields: Dict[str, Any] = {}
+        self.complete = False
+        self._pos = 0
+        self._state = "start"   # start -> key -> colon -> value -> key ... -> done
+        self._key: Optional[str] = None
+        self._decoder = json.JSONDecoder()
+
+    def feed(self, chunk: str) -> Dict[str, Any]:
+        """إضافة جزء جديد من النص وإعادة الحقول المكتملة حتى الآن"""
+        self.buffer += chunk
+        self._advance()
+        return self.fields
+
+    def _skip_whitespace(self):
+        while self._pos < len(self.buffer) and self.buffer[self._pos] in " \t\r\n":
+            self._pos += 1
+
+    def _advance(self):
+        buf = self.buffer
+        while not self.complete:
+            self._skip_whitespace()
+            if self._pos >= len(buf):
+                return
+            ch = buf[self._pos]
+
+            if self._state == "start":
+                # تجاهل أي نص قبل بداية الكائن (مثل ```json)
+                start = buf.find("{", self._pos)
+                if start < 0:
+                    self._pos = len(buf)
+                    return
+                self._pos = start + 1
+                self._state = "key"
+
+            elif self._state == "key":
+                if ch == "}":
+                    self._pos += 1
+                    self.complete = True
+                elif ch == ",":
+                    self._pos += 1
+                elif ch == '"':
+                    try:
+                        self._key, self._pos = self._decoder.raw_decode(buf, self._pos)
+                    except ValueError:
+                        return
+                    self._state = "colon"
+                else:
+                    raise ValueError(f"Unexpected character {ch!r} in JSON object")
+
+            elif self._state == "colon":
+                if ch != ":":
+                    raise ValueError(f"Expected ':' after key {self._key!r}")
+                self._pos += 1
+                self._state = "value"
+
+            elif self._state == "value":
+                try:
+                    value, end = self._decoder.raw_decode(buf, self._pos)
+                except ValueError:
+                    return  # القيمة لم تكتمل بعد
+                if isinstance(value, (int, float)) and not isinstance(value, bool) \
+                        and (end >= len(buf) or buf[end] not in _NUMBER_END):
+                    return  # لا يكتمل الرقم إلا بفاصل بعده: "87" قد يتبعها ".5" أو "e3" في جزء لاحق
+                self.fields[self._key] = value
+                self._pos = end
+                self._state = "key"
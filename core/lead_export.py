@@ -0,0 +1,181 @@
+import csv
+import logging
+import os
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from config.settings import settings
+from core.codec import dumps
+
+logger = logging.getLogger(__name__)
+
+# الأعمدة الافتراضية للتصدير والقراءة (بدل select *)
+LEAD_EXPORT_COLUMNS = (
+    "id", "campaign_id", "url", "intent_score", "status", "message_draft", "contact_info", "created_at",
+)
+FORMATS = ("csv", "ndjson", "parquet")
+
+Row = Dict[str, Any]
+Progress = Callable[[int, Optional[int]], None]
+
+
+def iter_lead_pages(client: Any,
+                    campaign_id: Any = None,
+                    columns: Sequence[str] = LEAD_EXPORT_COLUMNS,
+                    page_size: int = None,
+                    table: str = "leads") -> Iterator[List[Row]]:
+    """صفحات من جدول leads بترقيم keyset على (created_at, id): كل صفحة استعلام بفهرس، بلا OFFSET"""
+    page_size = page_size or settings.EXPORT_PAGE_SIZE
+    # مفتاح الترقيم مطلوب في كل صفحة حتى لو لم يُطلب عموداه
+    select = list(columns) + [c for c in ("created_at", "id") if c not in columns]
+    last: Optional[Row] = None
+    while True:
+        query = client.table(table).select(",".join(select))
+        if campaign_id is not None:
+            query = query.eq("campaign_id", campaign_id)
+        if last is not None:
+            created_at, lead_id = last["created_at"], last["id"]
+            # القيم بين علامتي تنصيص: الطابع الزمني يحتوي ':' و'+'
+            query = query.or_(f'created_at.gt."{created_at}",and(created_at.eq."{created_at}",id.gt."{lead_id}")')
+        rows = query.order("created_at").order("id").limit(page_size).execute().data or []
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        last = rows[-1]
+
+
+def count_leads(client: Any, campaign_id: Any = None, table: str = "leads") -> Optional[int]:
+    """عدد الصفوف (للتقدم فقط)؛ None إذا تعذر العد"""
+    try:
+        query = client.table(table).select("id", count="exact").limit(1)
+        if campaign_id is not None:
+            query = query.eq("campaign_id", campaign_id)
+        return query.execute().count
+    except Exception as e:
+        logger.debug(f"Lead count unavailable: {e}")
+        return None
+
+
+# ---- الكتّاب: صفحة بصفحة إلى الملف ----
+
+def _flat(value: Any) -> Any:
+    # القيم المركبة (contact_info) تُكتب كنص JSON في الصيغ المسطحة
+    return dumps(value) if isinstance(value, (dict, list)) else value
+
+
+class _CsvWriter:
+    def __init__(self, f, columns: Sequence[str]):
+        self._writer = csv.DictWriter(f, fieldnames=list(columns), extrasaction="ignore")
+        self._writer.writeheader()
+
+    def write(self, rows: List[Row]):
+        self._writer.writerows({k: _flat(v) for k, v in row.items()} for row in rows)
+
+    def close(self):
+        pass
+
+
+class _NdjsonWriter:
+    def __init__(self, f, columns: Sequence[str]):
+        self._f = f
+        self._columns = list(columns)
+
+    def write(self, rows: List[Row]):
+        self._f.write("".join(dumps({c: row.get(c) for c in self._columns}) + "\n" for row in rows))
+
+    def close(self):
+        pass
+
+
+# أنواع Parquet الثابتة؛ أي عمود آخر يُكتب نصاً. contact_info نص JSON كما في CSV
+PARQUET_TYPES = {"intent_score": "float64"}
+
+
+class _ParquetWriter:
+    """مجموعة صفوف Parquet لكل صفحة؛ الذاكرة بحجم صفحة واحدة
+
+    المخطط صريح ولا يُستنتج من الصفحة الأولى: عمود فارغ (null) في أولها لا يفسد بقية الملف.
+    """
+
+    def __init__(self, path: str, columns: Sequence[str]):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+        self._pa, self._pq = pa, pq
+        self._path = path
+        self._columns = list(columns)
+        self._schema = pa.schema([(c, pa.type_for_alias(PARQUET_TYPES.get(c, "string"))) for c in self._columns])
+        self._writer = None
+
+    def _value(self, column: str, value: Any) -> Any:
+        if value is None or column in PARQUET_TYPES:
+            return value
+        value = _flat(value)
+        return value if isinstance(value, str) else str(value)
+
+    def write(self, rows: List[Row]):
+        table = self._pa.table({c: [self._value(c, row.get(c)) for row in rows] for c in self._columns},
+                               schema=self._schema)
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self._path, self._schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        else:
+            self._pq.write_table(self._schema.empty_table(), self._path)
+
+
+def _format_of(path: str, fmt: Optional[str]) -> str:
+    fmt = (fmt or os.path.splitext(path)[1].lstrip(".") or "csv").lower()
+    fmt = {"jsonl": "ndjson", "json": "ndjson", "pq": "parquet"}.get(fmt, fmt)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt} (expected one of {FORMATS})")
+    return fmt
+
+
+def export_leads(client: Any,
+                 path: str,
+                 campaign_id: Any = None,
+                 fmt: str = None,
+                 columns: Sequence[str] = LEAD_EXPORT_COLUMNS,
+                 page_size: int = None,
+                 progress: Progress = None) -> int:
+    """تصدير العملاء إلى CSV أو NDJSON أو Parquet صفحة بصفحة (ذاكرة ثابتة مهما كبرت الحملة)
+
+    الكتابة إلى ملف مؤقت ثم إعادة تسميته، فلا يبقى ملف ناقص عند الفشل. يعيد عدد الصفوف.
+    """
+    fmt = _format_of(path, fmt)
+    total = count_leads(client, campaign_id) if progress is not None else None
+    partial = f"{path}.part"
+    written = 0
+
+    try:
+        if fmt == "parquet":
+            writer = _ParquetWriter(partial, columns)
+            f = None
+        else:
+            f = open(partial, "w", encoding="utf-8", newline="")
+            writer = (_CsvWriter if fmt == "csv" else _NdjsonWriter)(f, columns)
+        try:
+            for rows in iter_lead_pages(client, campaign_id, columns, page_size):
+                writer.write(rows)
+                written += len(rows)
+                if progress is not None:
+                    progress(written, total)
+                logger.debug(f"Exported {written}/{total if total is not None else '?'} leads to {path}")
+        finally:
+            writer.close()
+            if f is not None:
+                f.close()
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+
+    logger.info(f"Exported {written} leads to {path} ({fmt})")
+    return written
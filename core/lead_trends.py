@@ -0,0 +1,161 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from core.campaign_stats import CONTACTED_STATUSES, CONVERTED_STATUSES, RESPONDED_STATUSES, _sql_list
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+
+# عدادات زمنية لكل (دقة، بداية الفترة، حملة، منصة) تُبنى من أحداث العملاء داخل قاعدة البيانات
+TRENDS_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS lead_trends (
+    granularity TEXT NOT NULL,              -- hour / day
+    bucket_start TIMESTAMPTZ NOT NULL,      -- بداية الفترة بتوقيت UTC
+    campaign_id UUID NOT NULL REFERENCES campaigns(id) ON DELETE CASCADE,
+    platform TEXT NOT NULL DEFAULT 'generic',
+    leads BIGINT NOT NULL DEFAULT 0,
+    contacts BIGINT NOT NULL DEFAULT 0,
+    responses BIGINT NOT NULL DEFAULT 0,
+    conversions BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, bucket_start, campaign_id, platform)
+);
+
+CREATE OR REPLACE FUNCTION lead_trends_bump(cid UUID, plat TEXT, happened_at TIMESTAMPTZ,
+                                            d_leads INT, d_contacts INT, d_responses INT, d_conversions INT)
+RETURNS VOID AS $$
+DECLARE
+    gran TEXT;
+BEGIN
+    FOREACH gran IN ARRAY ARRAY['hour', 'day'] LOOP
+        INSERT INTO lead_trends AS t (granularity, bucket_start, campaign_id, platform,
+                                      leads, contacts, responses, conversions)
+        VALUES (gran, date_trunc(gran, happened_at, 'UTC'), cid, COALESCE(plat, 'generic'),
+                d_leads, d_contacts, d_responses, d_conversions)
+        ON CONFLICT (granularity, bucket_start, campaign_id, platform) DO UPDATE SET
+            leads = t.leads + EXCLUDED.leads,
+            contacts = t.contacts + EXCLUDED.contacts,
+            responses = t.responses + EXCLUDED.responses,
+            conversions = t.conversions + EXCLUDED.conversions;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- حدث = عميل جديد أو انتقال حالته إلى مرحلة لم يبلغها من قبل، في فترة وقوعه
+CREATE OR REPLACE FUNCTION lead_trends_on_lead() RETURNS TRIGGER AS $$
+DECLARE
+    -- حالة NULL تجعل IN تعيد NULL: COALESCE يبقي العدادات أرقاماً
+    was_contacted BOOLEAN := TG_OP = 'UPDATE' AND COALESCE(OLD.status IN ({_sql_list(CONTACTED_STATUSES)}), false);
+    was_responded BOOLEAN := TG_OP = 'UPDATE' AND COALESCE(OLD.status IN ({_sql_list(RESPONDED_STATUSES)}), false);
+    was_converted BOOLEAN := TG_OP = 'UPDATE' AND COALESCE(OLD.status IN ({_sql_list(CONVERTED_STATUSES)}), false);
+    d_leads INT := (TG_OP = 'INSERT')::INT;
+    d_contacts INT := (COALESCE(NEW.status IN ({_sql_list(CONTACTED_STATUSES)}), false) AND NOT was_contacted)::INT;
+    d_responses INT := (COALESCE(NEW.status IN ({_sql_list(RESPONDED_STATUSES)}), false) AND NOT was_responded)::INT;
+    d_conversions INT := (COALESCE(NEW.status IN ({_sql_list(CONVERTED_STATUSES)}), false) AND NOT was_converted)::INT;
+BEGIN
+    IF NEW.campaign_id IS NULL OR d_leads + d_contacts + d_responses + d_conversions = 0 THEN
+        RETURN NULL;
+    END IF;
+    PERFORM lead_trends_bump(NEW.campaign_id, NEW.platform, NOW(), d_leads, d_contacts, d_responses, d_conversions);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS leads_trends ON leads;
+CREATE TRIGGER leads_trends AFTER INSERT OR UPDATE OF status ON leads
+    FOR EACH ROW EXECUTE FUNCTION lead_trends_on_lead();
+
+-- سلسلة زمنية مجمّعة: تقرأ الفترات المحسوبة مسبقاً فقط، صف واحد لكل فترة
+CREATE OR REPLACE FUNCTION lead_trends_series(gran TEXT, since TIMESTAMPTZ, cid UUID DEFAULT NULL, plat TEXT DEFAULT NULL)
+RETURNS TABLE (bucket_start TIMESTAMPTZ, leads BIGINT, contacts BIGINT, responses BIGINT, conversions BIGINT) AS $$
+    SELECT t.bucket_start, SUM(t.leads)::BIGINT, SUM(t.contacts)::BIGINT,
+           SUM(t.responses)::BIGINT, SUM(t.conversions)::BIGINT
+    FROM lead_trends t
+    WHERE t.granularity = gran AND t.bucket_start >= since
+      AND (cid IS NULL OR t.campaign_id = cid) AND (plat IS NULL OR t.platform = plat)
+    GROUP BY t.bucket_start
+    ORDER BY t.bucket_start;
+$$ LANGUAGE sql STABLE;
+
+-- إعادة بناء من leads: أوقات الانتقالات السابقة غير محفوظة، فتُنسب كل المراحل إلى created_at
+CREATE OR REPLACE FUNCTION rebuild_lead_trends(cid UUID DEFAULT NULL) RETURNS BIGINT AS $$
+DECLARE
+    rebuilt BIGINT;
+BEGIN
+    LOCK TABLE leads IN SHARE MODE;
+    DELETE FROM lead_trends WHERE cid IS NULL OR campaign_id = cid;
+    INSERT INTO lead_trends (granularity, bucket_start, campaign_id, platform, leads, contacts, responses, conversions)
+    SELECT g.gran, date_trunc(g.gran, l.created_at::TIMESTAMPTZ, 'UTC'),
+           l.campaign_id, COALESCE(l.platform, 'generic'),
+           COUNT(*),
+           COUNT(*) FILTER (WHERE l.status IN ({_sql_list(CONTACTED_STATUSES)})),
+           COUNT(*) FILTER (WHERE l.status IN ({_sql_list(RESPONDED_STATUSES)})),
+           COUNT(*) FILTER (WHERE l.status IN ({_sql_list(CONVERTED_STATUSES)}))
+    FROM leads l CROSS JOIN (VALUES ('hour'), ('day')) AS g(gran)
+    WHERE l.campaign_id IS NOT NULL AND (cid IS NULL OR l.campaign_id = cid)
+    GROUP BY 1, 2, 3, 4;
+    GET DIAGNOSTICS rebuilt = ROW_COUNT;
+    RETURN rebuilt;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ملء أولي عند الإنشاء على قاعدة فيها عملاء سابقون، لتظهر اتجاهات 7/30/90 يوماً مباشرة
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM lead_trends) AND EXISTS (SELECT 1 FROM leads) THEN
+        PERFORM rebuild_lead_trends();
+    END IF;
+END;
+$$;
+"""
+
+
+def _bucket_start(moment: datetime, granularity: str) -> datetime:
+    moment = moment.astimezone(timezone.utc)
+    if granularity == "day":
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def fetch_trends(client: Any,
+                 periods: int,
+                 granularity: str = "day",
+                 campaign_id: Any = None,
+                 platform: str = None,
+                 now: datetime = None) -> List[Dict[str, Any]]:
+    """آخر periods فترة (الأحدث أولاً)، بأصفار للفترات بلا نشاط؛ عدد الصفوف المقروءة ثابت مهما كبر السجل"""
+    step = GRANULARITIES[granularity]
+    latest = _bucket_start(now or datetime.now(timezone.utc), granularity)
+    since = latest - step * (periods - 1)
+    rows = client.rpc("lead_trends_series", {
+        "gran": granularity,
+        "since": since.isoformat(),
+        "cid": campaign_id,
+        "plat": platform,
+    }).execute().data or []
+    by_start = {datetime.fromisoformat(row["bucket_start"]).astimezone(timezone.utc): row for row in rows}
+
+    trends = []
+    for i in range(periods):
+        start = latest - step * i
+        row = by_start.get(start, {})
+        contacts = row.get("contacts") or 0
+        responses = row.get("responses") or 0
+        trends.append({
+            "date": start.date().isoformat() if granularity == "day" else start.isoformat(),
+            "leads": row.get("leads") or 0,
+            "contacts": contacts,
+            "responses": responses,
+            "conversions": row.get("conversions") or 0,
+            "response_rate": responses / contacts * 100 if contacts else 0.0,
+        })
+    return trends
+
+
+def rebuild_lead_trends(client: Any, campaign_id: Any = None) -> int:
+    """إعادة حساب الفترات من جدول leads؛ يعيد عدد صفوف الفترات"""
+    rebuilt = client.rpc("rebuild_lead_trends", {"cid": campaign_id}).execute().data or 0
+    logger.info(f"Rebuilt {rebuilt} lead trend buckets")
+    return rebuilt
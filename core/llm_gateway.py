@@ -0,0 +1,245 @@
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from config.settings import settings
+from core.text_budget import get_token_counter
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 9
+
+
+class TokenBucket:
+    """دلو رموز يمتلئ بمعدل ثابت في الدقيقة"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """الثواني اللازمة حتى يتوفر المقدار (0 إن كان متوفراً)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def refund(self, amount: float):
+        """إرجاع الفرق بين التقدير والاستهلاك الفعلي"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def drain(self):
+        """تفريغ الدلو بعد 429 حتى يهدأ الضغط"""
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+
+
+@dataclass
+class ModelLimiter:
+    """حدود الطلبات والرموز في الدقيقة لنموذج واحد"""
+    requests: TokenBucket
+    tokens: TokenBucket
+
+    def wait_time(self, estimate: int) -> float:
+        return max(self.requests.wait_time(1), self.tokens.wait_time(estimate))
+
+
+@dataclass(order=True)
+class _QueuedCall:
+    priority: int
+    sequence: int
+    provider: str = field(compare=False)
+    model: str = field(compare=False)
+    messages: List[Dict] = field(compare=False)
+    kwargs: Dict[str, Any] = field(compare=False)
+    estimate: int = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    attempt: int = field(default=0, compare=False)
+    # للبث: يستدعى مع كل جزء نصي، وإرجاع False يوقف البث
+    on_delta: Optional[Callable[[str], bool]] = field(default=None, compare=False)
+
+
+class LLMGateway:
+    """بوابة موحدة لنماذج اللغة: عملاء async مشتركة، حدود RPM/TPM لكل نموذج، وطابور بالأولوية
+
+    تعمل البوابة في حلقة أحداث خاصة بها على خيط مستقل، لذلك يمكن استدعاؤها من كود
+    async (chat) أو كود متزامن (chat_sync / submit) وتتشارك كل الاستدعاءات نفس الحدود.
+    """
+
+    def __init__(self, concurrency: int = None):
+        self.concurrency = concurrency or settings.LLM_CONCURRENCY
+        self._count_tokens = get_token_counter()
+        self._sequence = itertools.count()
+        self._clients: Dict[str, Any] = {}
+        self._limiters: Dict[str, ModelLimiter] = {}
+
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, name="llm-gateway", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._workers = [self._loop.create_task(self._worker()) for _ in range(self.concurrency)]
+        self._ready.set()
+        self._loop.run_forever()
+
+    # ---- الواجهة العامة ----
+
+    def submit(self, provider: str, model: str, messages: List[Dict],
+               priority: int = PRIORITY_NORMAL, on_delta: Callable[[str], bool] = None, **kwargs) -> Future:
+        """إرسال طلب من أي خيط؛ يعيد concurrent.futures.Future
+
+        مع on_delta يُبث الرد ويكون ناتج الـ Future هو النص المستلم حتى التوقف.
+        """
+        return asyncio.run_coroutine_threadsafe(
+            self._enqueue(provider, model, messages, priority, kwargs, on_delta), self._loop
+        )
+
+    async def chat(self, provider: str, model: str, messages: List[Dict],
+                   priority: int = PRIORITY_NORMAL, **kwargs):
+        """استدعاء async من أي حلقة أحداث"""
+        return await asyncio.wrap_future(self.submit(provider, model, messages, priority, **kwargs))
+
+    def chat_sync(self, provider: str, model: str, messages: List[Dict],
+                  priority: int = PRIORITY_NORMAL, **kwargs):
+        """استدعاء متزامن (يحجب الخيط الحالي فقط)"""
+        return self.submit(provider, model, messages, priority, **kwargs).result()
+
+    async def chat_stream(self, provider: str, model: str, messages: List[Dict],
+                          on_delta: Callable[[str], bool], priority: int = PRIORITY_NORMAL, **kwargs) -> str:
+        """بث الرد مع إمكانية الإيقاف المبكر من on_delta (يعمل داخل خيط البوابة)"""
+        return await asyncio.wrap_future(self.submit(provider, model, messages, priority, on_delta, **kwargs))
+
+    def chat_stream_sync(self, provider: str, model: str, messages: List[Dict],
+                         on_delta: Callable[[str], bool], priority: int = PRIORITY_NORMAL, **kwargs) -> str:
+        return self.submit(provider, model, messages, priority, on_delta, **kwargs).result()
+
+    def run(self, coro) -> Future:
+        """تشغيل coroutine على حلقة البوابة (مثل التوجيه) من أي خيط"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def estimate_tokens(self, messages: List[Dict], max_tokens: Optional[int] = None) -> int:
+        """تقدير الرموز قبل الإرسال: المدخلات + 4 لكل رسالة + سقف المخرجات"""
+        prompt = sum(self._count_tokens(m.get('content') or '') + 4 for m in messages)
+        return prompt + (max_tokens or settings.LLM_COMPLETION_TOKENS_ESTIMATE)
+
+    # ---- داخل حلقة البوابة ----
+
+    async def _enqueue(self, provider, model, messages, priority, kwargs, on_delta=None):
+        future = self._loop.create_future()
+        estimate = self.estimate_tokens(messages, kwargs.get('max_tokens'))
+        await self._queue.put(_QueuedCall(priority, next(self._sequence), provider, model,
+                                          messages, kwargs, estimate, future, on_delta=on_delta))
+        return await future
+
+    def _client(self, provider: str):
+        """عميل async واحد مشترك لكل مزود (تجمع اتصالات HTTP)"""
+        if provider not in self._clients:
+            if provider == "groq":
+                from groq import AsyncGroq
+                self._clients[provider] = AsyncGroq(api_key=settings.GROQ_API_KEY, max_retries=0)
+            elif provider == "openai":
+                from openai import AsyncOpenAI
+                self._clients[provider] = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, max_retries=0)
+            else:
+                raise ValueError(f"Unknown LLM provider: {provider}")
+        return self._clients[provider]
+
+    def _limiter(self, model: str) -> ModelLimiter:
+        if model not in self._limiters:
+            rpm, tpm = settings.LLM_RATE_LIMITS.get(model, (settings.LLM_DEFAULT_RPM, settings.LLM_DEFAULT_TPM))
+            self._limiters[model] = ModelLimiter(TokenBucket(rpm), TokenBucket(tpm))
+        return self._limiters[model]
+
+    async def _worker(self):
+        while True:
+            call = await self._queue.get()
+            if call.future.cancelled():
+                continue
+
+            limiter = self._limiter(call.model)
+            while (wait := limiter.wait_time(call.estimate)) > 0:
+                await asyncio.sleep(wait)
+            limiter.requests.consume(1)
+            limiter.tokens.consume(call.estimate)
+
+            try:
+                if call.on_delta:
+                    response = await self._stream(call, limiter)
+                else:
+                    response = await self._client(call.provider).chat.completions.create(
+                        model=call.model, messages=call.messages, **call.kwargs
+                    )
+            except Exception as e:
+                if getattr(e, 'status_code', None) == 429 and call.attempt < settings.MAX_RETRIES:
+                    # 429: تفريغ الحدود وإعادة الطلب بنفس أولويته
+                    logger.warning(f"Rate limited on {call.model}, backing off (attempt {call.attempt + 1})")
+                    limiter.requests.drain()
+                    limiter.tokens.drain()
+                    call.attempt += 1
+                    await self._queue.put(call)
+                elif not call.future.done():
+                    call.future.set_exception(e)
+                continue
+
+            usage = getattr(response, 'usage', None)
+            if usage is not None and getattr(usage, 'total_tokens', None):
+                limiter.tokens.refund(call.estimate - usage.total_tokens)
+            if not call.future.done():
+                call.future.set_result(response)
+
+    async def _stream(self, call: _QueuedCall, limiter: ModelLimiter) -> str:
+        """قراءة الرد المبثوث حتى نهايته أو حتى يطلب on_delta التوقف"""
+        stream = await self._client(call.provider).chat.completions.create(
+            model=call.model, messages=call.messages, stream=True, **call.kwargs
+        )
+        parts = []
+        try:
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    if call.on_delta(delta) is False:
+                        break
+        finally:
+            # إغلاق الاتصال يوقف التوليد ولا تُحتسب بقية الرموز
+            await stream.close()
+
+        text = "".join(parts)
+        completion_estimate = call.kwargs.get('max_tokens') or settings.LLM_COMPLETION_TOKENS_ESTIMATE
+        limiter.tokens.refund(completion_estimate - self._count_tokens(text))
+        return text
+
+
+_gateway: Optional[LLMGateway] = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway() -> LLMGateway:
+    """البوابة المشتركة للعملية"""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = LLMGateway()
+    return _gateway
@@ -0,0 +1,228 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from config.settings import settings
+from core.llm_gateway import get_gateway
+
+logger = logging.getLogger(__name__)
+
+# عينات آخر 5 دقائق فقط: الخلفية المتعثرة تعود للترشيح بعد أن تخرج أخطاؤها من النافذة
+STATS_WINDOW_S = 300
+MAX_SAMPLES = 200
+MIN_SAMPLES = 5
+UNHEALTHY_ERROR_RATE = 0.5
+
+
+@dataclass(frozen=True)
+class Backend:
+    """خلفية يمكن توجيه الطلب إليها"""
+    name: str
+    provider: Optional[str]     # groq / openai، أو None للمصنف المحلي
+    model: Optional[str]
+    slo_ms: float               # بعد هذه المدة بلا رد يُرسل طلب احتياطي (hedge)
+    weight: float = 1.0         # تفضيل الجودة: وزن أعلى = أقل تفضيلاً عند تساوي الزمن
+    capacity: int = 8           # طلبات متزامنة قبل أن يبدأ الطابور بإبطائها
+
+    @property
+    def local(self) -> bool:
+        return self.provider is None
+
+
+BACKENDS = {
+    backend.name: backend for backend in (
+        Backend("groq-70b", "groq", "llama3-70b-8192", slo_ms=4000, weight=1.0),
+        Backend("groq-8b", "groq", "llama3-8b-8192", slo_ms=1500, weight=3.0),
+        Backend("openai", "openai", settings.ANALYSIS_MODEL, slo_ms=3000, weight=1.5),
+        # المصنف المحلي أضعف جودة: يُختار فقط عند تعثر النماذج البعيدة
+        Backend("local", None, None, slo_ms=1000, weight=10.0, capacity=1),
+    )
+}
+
+
+class BackendStats:
+    """إحصاءات حية لخلفية واحدة: الزمن، الأخطاء، والطلبات الجارية"""
+
+    def __init__(self, backend: Backend):
+        self.backend = backend
+        self.samples: deque = deque(maxlen=MAX_SAMPLES)  # (وقت، زمن بالمللي ثانية أو None عند الخطأ)
+        self.in_flight = 0
+        self.calls = 0
+        self.wins = 0
+        self.hedges = 0
+
+    def _recent(self):
+        cutoff = time.monotonic() - STATS_WINDOW_S
+        return [latency for at, latency in self.samples if at >= cutoff]
+
+    def _percentile(self, latencies: List[float], q: float) -> Optional[float]:
+        if not latencies:
+            return None
+        latencies = sorted(latencies)
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    def record(self, latency_ms: Optional[float]):
+        self.samples.append((time.monotonic(), latency_ms))
+
+    @property
+    def p50(self) -> Optional[float]:
+        return self._percentile([l for l in self._recent() if l is not None], 0.5)
+
+    @property
+    def p95(self) -> Optional[float]:
+        return self._percentile([l for l in self._recent() if l is not None], 0.95)
+
+    @property
+    def error_rate(self) -> float:
+        recent = self._recent()
+        return sum(1 for l in recent if l is None) / len(recent) if recent else 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return len(self._recent()) < MIN_SAMPLES or self.error_rate < UNHEALTHY_ERROR_RATE
+
+    def score(self) -> float:
+        """تكلفة متوقعة بالمللي ثانية: الزمن المتوقع × ضغط الطابور × الأخطاء × الوزن"""
+        p50, p95 = self.p50, self.p95
+        # بلا عينات: نصف الـ SLO كتقدير أولي
+        expected = (p50 + p95) / 2 if p50 is not None else self.backend.slo_ms / 2
+        load = 1 + self.in_flight / self.backend.capacity
+        return expected * load * self.backend.weight / max(1 - self.error_rate, 0.05)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'p50_ms': self.p50,
+            'p95_ms': self.p95,
+            'error_rate': round(self.error_rate, 3),
+            'in_flight': self.in_flight,
+            'calls': self.calls,
+            'wins': self.wins,
+            'hedges': self.hedges,
+            'healthy': self.healthy,
+            'score': round(self.score(), 1),
+        }
+
+
+Handler = Callable[[Backend], Awaitable[Any]]
+
+
+class LLMRouter:
+    """توجيه كل طلب إلى أسرع خلفية سليمة حالياً، مع طلب احتياطي إذا تجاوزت الأولى الـ SLO"""
+
+    def __init__(self, backends: Dict[str, Backend] = None, max_hedges: int = None):
+        self.backends = backends or BACKENDS
+        self.max_hedges = settings.LLM_MAX_HEDGES if max_hedges is None else max_hedges
+        self.stats = {name: BackendStats(backend) for name, backend in self.backends.items()}
+
+    def rank(self, names: List[str]) -> List[Backend]:
+        """ترتيب الخلفيات المرشحة: السليمة أولاً ثم حسب التكلفة المتوقعة"""
+        stats = [self.stats[name] for name in names]
+        ranked = sorted(stats, key=lambda s: (not s.healthy, s.score()))
+        return [s.backend for s in ranked]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """إحصاءات كل خلفية لمراجعة قرارات التوجيه"""
+        return {name: stats.snapshot() for name, stats in self.stats.items()}
+
+    def submit(self, handlers: Dict[str, Handler]) -> Future:
+        """توجيه من أي خيط: يعمل على حلقة البوابة فتبقى الإحصاءات في خيط واحد"""
+        return get_gateway().run(self.route(handlers))
+
+    async def _timed(self, backend: Backend, handler: Handler):
+        stats = self.stats[backend.name]
+        stats.in_flight += 1
+        stats.calls += 1
+        started = time.perf_counter()
+        try:
+            result = await handler(backend)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            stats.record(None)
+            raise
+        else:
+            stats.record((time.perf_counter() - started) * 1000)
+            return result
+        finally:
+            stats.in_flight -= 1
+
+    async def route(self, handlers: Dict[str, Handler]) -> Any:
+        """تنفيذ الطلب على أفضل خلفية من handlers (اسم الخلفية -> دالة async)
+
+        عند الخطأ ينتقل فوراً إلى الخلفية التالية، وعند تجاوز الـ SLO يرسل طلباً احتياطياً
+        ويعتمد أول رد ناجح ويلغي الباقي.
+        """
+        order = self.rank([name for name in handlers if name in self.stats])
+        if not order:
+            raise ValueError(f"No known backends among {list(handlers)}")
+
+        pending: Dict[asyncio.Task, Backend] = {}
+        deadline: Optional[float] = None
+        last_error: Optional[Exception] = None
+        loop = asyncio.get_running_loop()
+        remaining = iter(order)
+
+        def launch() -> bool:
+            nonlocal deadline
+            backend = next(remaining, None)
+            if backend is None:
+                return False
+            task = asyncio.ensure_future(self._timed(backend, handlers[backend.name]))
+            pending[task] = backend
+            deadline = loop.time() + backend.slo_ms / 1000
+            return True
+
+        launch()
+        try:
+            while pending:
+                can_hedge = deadline is not None and len(pending) <= self.max_hedges
+                timeout = max(deadline - loop.time(), 0) if can_hedge else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    slow = next(reversed(pending.values()))
+                    if launch():
+                        self.stats[slow.name].hedges += 1
+                        logger.info(f"{slow.name} exceeded {slow.slo_ms:.0f}ms SLO, hedging")
+                    else:
+                        deadline = None
+                    continue
+
+                for task in done:
+                    backend = pending.pop(task)
+                    if task.exception() is None:
+                        self.stats[backend.name].wins += 1
+                        return task.result()
+                    last_error = task.exception()
+                    logger.warning(f"Backend {backend.name} failed: {last_error}")
+
+                # الفشل ينقل الطلب فوراً إلى الخلفية التالية
+                if not pending:
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise last_error or RuntimeError("All backends failed")
+
+
+_router: Optional[LLMRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> LLMRouter:
+    """الموجّه المشترك للعملية: كل المستدعين يتشاركون نفس الإحصاءات"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = LLMRouter()
+    return _router
+
+
+def router_stats() -> Dict[str, Dict[str, Any]]:
+    return get_router().snapshot()
@@ -0,0 +1,146 @@
+import hashlib
+import logging
+import random
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from config.settings import settings
+from core.embeddings import embed
+
+logger = logging.getLogger(__name__)
+
+# خانات القالب التي تُملأ محلياً لكل مستلم
+NAME_SLOT = "{name}"
+TOPIC_SLOT = "{topic}"
+
+GREETINGS = ("Hi", "Hey", "Hello")
+_GREETING = re.compile(r'^\s*(hi|hey|hello|dear)\b', re.IGNORECASE)
+
+
+@dataclass
+class MessageTemplate:
+    text: str
+    uses: int = 0
+
+
+@dataclass
+class _Pool:
+    """قوالب حملة ومنصة واحدة مع متجهات المقتطفات التي ولّدتها"""
+    vectors: List[np.ndarray] = field(default_factory=list)
+    templates: List[MessageTemplate] = field(default_factory=list)
+    sent: Set[str] = field(default_factory=set)  # بصمات النصوص المرسلة لمنع التطابق
+
+
+class MessageCache:
+    """ذاكرة دلالية لرسائل التواصل لكل (حملة، منصة)
+
+    المقتطف القريب دلالياً من مقتطف سابق يعيد استخدام قالبه مع ملء الخانات محلياً،
+    مع حد لإعادة استخدام كل قالب وتنويع التحية ومنع إرسال نص مطابق مرتين.
+    """
+
+    def __init__(self, similarity: float = None, max_reuse: int = None, seed: int = None):
+        self.similarity = similarity or settings.MESSAGE_CACHE_SIMILARITY
+        self.max_reuse = max_reuse or settings.MESSAGE_CACHE_MAX_REUSE
+        self.pools: Dict[Tuple[Hashable, str], _Pool] = {}
+        self.hits = 0
+        self.misses = 0
+        self._rng = random.Random(seed)
+
+    def embed(self, snippet: str) -> Optional[np.ndarray]:
+        """متجه المقتطف، أو None إذا لم يتوفر نموذج التضمين (تعطيل الذاكرة)"""
+        try:
+            return embed([snippet or ""])[0]
+        except Exception as e:
+            logger.warning(f"Message cache disabled: {e}")
+            return None
+
+    def lookup(self, campaign_id: Hashable, platform: str, vector: Optional[np.ndarray],
+               slots: Dict[str, str]) -> Optional[str]:
+        """رسالة جاهزة من قالب قريب، أو None إذا لزم توليد رسالة جديدة"""
+        pool = self.pools.get((campaign_id, platform))
+        if vector is None or pool is None or not pool.templates:
+            self.misses += 1
+            return None
+
+        similarities = np.stack(pool.vectors) @ vector
+        # الأقل استخداماً أولاً بين القوالب القريبة بما يكفي
+        candidates = sorted(
+            (i for i in np.flatnonzero(similarities >= self.similarity)
+             if pool.templates[i].uses < self.max_reuse),
+            key=lambda i: (pool.templates[i].uses, -similarities[i])
+        )
+        for i in candidates:
+            message = self._render(pool, pool.templates[i], slots)
+            if message is not None:
+                self.hits += 1
+                return message
+
+        self.misses += 1
+        return None
+
+    def store(self, campaign_id: Hashable, platform: str, vector: Optional[np.ndarray],
+              template: str, slots: Dict[str, str]) -> str:
+        """حفظ قالب مولّد حديثاً وإعادة الرسالة المملوءة للمستلم الحالي"""
+        pool = self.pools.setdefault((campaign_id, platform), _Pool())
+        # القوالب المستنفدة لا تعود للاختيار: إزالتها تبقي البحث صغيراً
+        live = [i for i, t in enumerate(pool.templates) if t.uses < self.max_reuse]
+        pool.vectors = [pool.vectors[i] for i in live]
+        pool.templates = [pool.templates[i] for i in live]
+
+        entry = MessageTemplate(template)
+        # بلا خانة الاسم قد يحمل النص اسم هذا المستلم أو تحيته: يُرسل له وحده ولا يُحفظ
+        if vector is not None and NAME_SLOT in template:
+            pool.vectors.append(vector)
+            pool.templates.append(entry)
+        message = self._fill(template, slots)
+        entry.uses += 1
+        pool.sent.add(self._fingerprint(message))
+        return message
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    # ---- الملء والتنويع ----
+
+    def _render(self, pool: _Pool, template: MessageTemplate, slots: Dict[str, str]) -> Optional[str]:
+        """ملء القالب بتحية متنوعة، مع رفض أي نص أُرسل حرفياً من قبل"""
+        greetings = list(GREETINGS)
+        self._rng.shuffle(greetings)
+        for greeting in greetings:
+            message = self._fill(self._vary_greeting(template.text, greeting), slots)
+            fingerprint = self._fingerprint(message)
+            if fingerprint not in pool.sent:
+                pool.sent.add(fingerprint)
+                template.uses += 1
+                return message
+        return None
+
+    @staticmethod
+    def _vary_greeting(text: str, greeting: str) -> str:
+        return _GREETING.sub(greeting, text, count=1)
+
+    @staticmethod
+    def _fill(template: str, slots: Dict[str, str]) -> str:
+        # استبدال مباشر وليس format: الرسائل قد تحتوي أقواساً أخرى
+        message = template
+        for slot, value in slots.items():
+            message = message.replace(slot, value)
+        return message
+
+    @staticmethod
+    def _fingerprint(message: str) -> str:
+        normalized = " ".join(message.lower().split())
+        return hashlib.sha1(normalized.encode()).hexdigest()
+
+
+def message_slots(lead: Dict, keywords: List[str]) -> Dict[str, str]:
+    """قيم الخانات لمستلم واحد: اسمه (إن عُرف) وأقرب كلمة مفتاحية لما كتبه"""
+    contact = lead.get("contact") or {}
+    name = contact.get("value") if contact.get("type") in ("dm", "message") else None
+    text = f"{lead.get('title', '')} {lead.get('snippet', '')}".lower()
+    topic = next((k for k in keywords if k.lower() in text), keywords[0] if keywords else "this")
+    return {NAME_SLOT: name or "there", TOPIC_SLOT: topic}
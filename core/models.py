@@ -1,9 +1,24 @@
+import heapq
+import sys
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional, Any
-from datetime import datetime
+from typing import List, Dict, Optional, Any, Iterable, Sequence, Union
+from datetime import datetime, timezone
 from enum import Enum
 
-class Platform(Enum):
+import numpy as np
+
+class CodedEnum(Enum):
+    """تعداد برمز صحيح صغير ثابت (ترتيب التعريف) للتخزين العمودي"""
+
+    @property
+    def code(self) -> int:
+        return _ENUM_CODES[type(self)][self]
+
+    @classmethod
+    def from_code(cls, code: int) -> 'CodedEnum':
+        return _ENUM_MEMBERS[cls][code]
+
+class Platform(CodedEnum):
     TWITTER = "twitter"
     LINKEDIN = "linkedin"
     EMAIL = "email"
@@ -13,7 +28,7 @@ class Platform(Enum):
     MEDIUM = "medium"
     GENERIC = "generic"
 
-class LeadStatus(Enum):
+class LeadStatus(CodedEnum):
     NEW = "new"
     PROCESSING = "processing"
     CONTACTED = "contacted"
@@ -21,14 +36,21 @@ class LeadStatus(Enum):
     CONVERTED = "converted"
     FAILED = "failed"
 
-class CampaignStatus(Enum):
+class CampaignStatus(CodedEnum):
     DRAFT = "draft"
     ACTIVE = "active"
     PAUSED = "paused"
     COMPLETED = "completed"
     ARCHIVED = "archived"
 
-@dataclass
+_ENUM_MEMBERS = {cls: tuple(cls) for cls in (Platform, LeadStatus, CampaignStatus)}
+_ENUM_CODES = {cls: {member: i for i, member in enumerate(members)} for cls, members in _ENUM_MEMBERS.items()}
+
+def _intern(value: Any) -> Any:
+    """قيم متكررة بكثرة (مثل معرف الحملة) تُخزن نسخة واحدة منها"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+@dataclass(slots=True)
 class Lead:
     """نموذج عميل محتمل"""
     id: Optional[str] = None
@@ -77,8 +99,14 @@ class Lead:
             'last_contacted': self.last_contacted,
             'created_at': self.created_at.isoformat()
         }
+    
+    @classmethod
+    def from_dict(cls, row: Dict) -> 'Lead':
+        """عكس to_dict (أو صف من جدول leads)"""
+        from core.codec import leads_from_rows
+        return leads_from_rows([row])[0]
 
-@dataclass
+@dataclass(slots=True)
 class Campaign:
     """نموذج حملة تسويقية"""
     id: Optional[str] = None
@@ -102,27 +130,207 @@ class Campaign:
     
     @classmethod
     def from_db_row(cls, row: Dict) -> 'Campaign':
-        campaign = cls()
-        campaign.id = row.get('id')
-        campaign.name = row.get('name', '')
-        campaign.description = row.get('description', '')
-        campaign.keywords = row.get('keywords', '').split(',') if row.get('keywords') else []
-        campaign.target_platforms = [Platform(p) for p in row.get('target_platforms', '').split(',') if p]
-        campaign.target_regions = row.get('target_regions', '').split(',') if row.get('target_regions') else []
-        campaign.target_industries = row.get('target_industries', '').split(',') if row.get('target_industries') else []
-        campaign.target_job_titles = row.get('target_job_titles', '').split(',') if row.get('target_job_titles') else []
-        campaign.usp = row.get('usp', '')
-        campaign.product_link = row.get('product_link', '')
-        campaign.messaging_tone = row.get('messaging_tone', 'professional')
-        campaign.max_leads = row.get('max_leads', 100)
-        campaign.min_intent_score = row.get('min_intent_score', 70.0)
-        campaign.min_relevance_score = row.get('min_relevance_score', 60.0)
-        campaign.status = CampaignStatus(row.get('status', 'draft'))
-        campaign.created_at = datetime.fromisoformat(row['created_at']) if row.get('created_at') else datetime.now()
-        
-        if row.get('started_at'):
-            campaign.started_at = datetime.fromisoformat(row['started_at'])
-        if row.get('completed_at'):
-            campaign.completed_at = datetime.fromisoformat(row['completed_at'])
-        
-        return campaign
+        # التحويل الجماعي في core.codec هو المرجع الوحيد لصيغة الصف
+        from core.codec import campaigns_from_rows
+        return campaigns_from_rows([row])[0]
+
+def top_leads(leads: Iterable[Lead], k: int, platform: Optional[Platform] = None,
+              key: str = 'intent_score') -> List[Lead]:
+    """أعلى k عملاء من قائمة في الذاكرة بكومة محدودة الحجم: O(n log k) بدل ترتيب القائمة كاملة"""
+    if platform is not None:
+        leads = (lead for lead in leads if lead.platform is platform)
+    return heapq.nlargest(k, leads, key=lambda lead: getattr(lead, key))
+
+# أعمدة LeadBatch الرقمية: 24 بايت لكل عميل بدلاً من كائن Python كامل
+LEAD_COLUMNS = {
+    'intent_score': np.float32,
+    'sentiment_score': np.float32,
+    'relevance_score': np.float32,
+    'status': np.uint8,
+    'platform': np.uint8,
+    'message_sent': np.bool_,
+    'response_received': np.bool_,
+    'created_at': 'datetime64[s]',
+}
+
+class LeadBatch:
+    """تخزين عمودي لعدد كبير من العملاء: تصفية وترتيب وأعلى-k بعمليات NumPy
+
+    مصفوفة مستقلة لكل عمود رقمي (بأسلوب Arrow)، والمعرفات والروابط في مصفوفات كائنات،
+    وكائنات Lead الأصلية (إن وجدت) تُحفظ للرجوع إليها دون إعادة بنائها.
+    """
+    
+    __slots__ = ('columns', 'ids', 'campaign_ids', 'urls', 'leads')
+    
+    def __init__(self, columns: Dict[str, np.ndarray], ids: np.ndarray, campaign_ids: np.ndarray,
+                 urls: np.ndarray, leads: Optional[np.ndarray] = None):
+        self.columns = columns
+        self.ids = ids
+        self.campaign_ids = campaign_ids
+        self.urls = urls
+        self.leads = leads
+    
+    @classmethod
+    def from_leads(cls, leads: Sequence[Lead]) -> 'LeadBatch':
+        values = {
+            'intent_score': [lead.intent_score for lead in leads],
+            'sentiment_score': [lead.sentiment_score for lead in leads],
+            'relevance_score': [lead.relevance_score for lead in leads],
+            'status': [lead.status.code for lead in leads],
+            'platform': [lead.platform.code for lead in leads],
+            'message_sent': [lead.message_sent for lead in leads],
+            'response_received': [lead.response_received for lead in leads],
+            'created_at': [lead.created_at for lead in leads],
+        }
+        return cls(
+            {name: np.array(values[name], dtype=dtype) for name, dtype in LEAD_COLUMNS.items()},
+            _objects(lead.id for lead in leads),
+            _objects(lead.campaign_id for lead in leads),
+            _objects(lead.url for lead in leads),
+            _objects(leads)
+        )
+    
+    @classmethod
+    def from_rows(cls, rows: Sequence[Dict]) -> 'LeadBatch':
+        """بناء مباشر من صفوف قاعدة البيانات دون إنشاء كائنات Lead"""
+        platform_codes = {p.value: p.code for p in Platform}
+        status_codes = {s.value: s.code for s in LeadStatus}
+        values = {
+            'intent_score': [row.get('intent_score') or 0.0 for row in rows],
+            'sentiment_score': [row.get('sentiment_score') or 0.0 for row in rows],
+            'relevance_score': [row.get('relevance_score') or 0.0 for row in rows],
+            'status': [status_codes.get(row.get('status'), LeadStatus.NEW.code) for row in rows],
+            'platform': [platform_codes.get(row.get('platform'), Platform.GENERIC.code) for row in rows],
+            'message_sent': [bool(row.get('message_sent')) for row in rows],
+            'response_received': [bool(row.get('response_received')) for row in rows],
+            # نص ISO بدقة الثواني بتوقيت UTC (datetime64 بلا منطقة زمنية)
+            'created_at': [_iso_seconds(row.get('created_at')) for row in rows],
+        }
+        return cls(
+            {name: np.array(values[name], dtype=dtype) for name, dtype in LEAD_COLUMNS.items()},
+            _objects(row.get('id') for row in rows),
+            _objects(_intern(row.get('campaign_id') or '') for row in rows),
+            _objects(row.get('url', '') for row in rows)
+        )
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def __getitem__(self, index: Union[np.ndarray, slice]) -> 'LeadBatch':
+        """مجموعة جزئية بقناع منطقي أو مصفوفة مواقع"""
+        return LeadBatch(
+            {name: column[index] for name, column in self.columns.items()},
+            self.ids[index], self.campaign_ids[index], self.urls[index],
+            self.leads[index] if self.leads is not None else None
+        )
+    
+    def mask(self,
+             min_intent: float = None,
+             status: Iterable[LeadStatus] = None,
+             platform: Iterable[Platform] = None,
+             campaign_id: str = None,
+             since: datetime = None) -> np.ndarray:
+        """قناع منطقي للشروط المحددة (كلها مطلوبة)"""
+        mask = np.ones(len(self), dtype=bool)
+        if min_intent is not None:
+            mask &= self.columns['intent_score'] >= min_intent
+        if status is not None:
+            mask &= np.isin(self.columns['status'], [s.code for s in status])
+        if platform is not None:
+            mask &= np.isin(self.columns['platform'], [p.code for p in platform])
+        if campaign_id is not None:
+            mask &= self.campaign_ids == campaign_id
+        if since is not None:
+            mask &= self.columns['created_at'] >= np.datetime64(since, 's')
+        return mask
+    
+    def filter(self, **conditions) -> 'LeadBatch':
+        return self[self.mask(**conditions)]
+    
+    def argsort(self, column: str = 'intent_score', descending: bool = True) -> np.ndarray:
+        """مواقع الترتيب فقط، دون نسخ الأعمدة (الأسرع عند الحاجة لجزء من النتيجة)"""
+        values = self.columns[column]
+        return np.argsort(-_sort_key(values) if descending else values, kind='stable')
+    
+    def sort_by(self, column: str = 'intent_score', descending: bool = True) -> 'LeadBatch':
+        return self[self.argsort(column, descending)]
+    
+    def top_k(self, k: int, column: str = 'intent_score', **conditions) -> 'LeadBatch':
+        """أعلى k حسب العمود بين العملاء المطابقين للشروط (نفس شروط mask)
+
+        التصفية والاختيار على المواقع فقط، ثم نسخ k صفاً في النهاية.
+        """
+        candidates = np.flatnonzero(self.mask(**conditions)) if conditions else np.arange(len(self))
+        values = -_sort_key(self.columns[column][candidates])
+        if k <= 0 or not len(candidates):
+            return self[candidates[:0]]
+        if k < len(candidates):
+            # ترتيب المواقع أولاً ليبقى ترتيب المتساويين كترتيبهم الأصلي
+            best = np.sort(np.argpartition(values, k - 1)[:k])
+        else:
+            best = np.arange(len(candidates))
+        return self[candidates[best[np.argsort(values[best], kind='stable')]]]
+    
+    def counts(self, column: str = 'status') -> Dict[CodedEnum, int]:
+        """عدد العملاء لكل قيمة تعداد (status أو platform)"""
+        enum_cls = LeadStatus if column == 'status' else Platform
+        members = _ENUM_MEMBERS[enum_cls]
+        counts = np.bincount(self.columns[column], minlength=len(members))
+        return {member: int(counts[member.code]) for member in members}
+    
+    def to_leads(self) -> List[Lead]:
+        if self.leads is not None:
+            return list(self.leads)
+        c = self.columns
+        return [
+            Lead(
+                id=self.ids[i],
+                campaign_id=self.campaign_ids[i],
+                url=self.urls[i],
+                platform=Platform.from_code(int(c['platform'][i])),
+                intent_score=float(c['intent_score'][i]),
+                sentiment_score=float(c['sentiment_score'][i]),
+                relevance_score=float(c['relevance_score'][i]),
+                status=LeadStatus.from_code(int(c['status'][i])),
+                message_sent=bool(c['message_sent'][i]),
+                response_received=bool(c['response_received'][i]),
+                created_at=c['created_at'][i].astype(datetime)
+            )
+            for i in range(len(self))
+        ]
+    
+    @property
+    def nbytes(self) -> int:
+        """حجم الأعمدة الرقمية ومصفوفات المؤشرات (دون السلاسل النصية نفسها)"""
+        arrays = [*self.columns.values(), self.ids, self.campaign_ids, self.urls]
+        if self.leads is not None:
+            arrays.append(self.leads)
+        return sum(a.nbytes for a in arrays)
+
+def _objects(values: Iterable) -> np.ndarray:
+    values = list(values)
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+def _sort_key(values: np.ndarray) -> np.ndarray:
+    """قيم تقبل السالب للترتيب التنازلي: التواريخ والأعداد بلا إشارة تُحوّل إلى float64"""
+    if values.dtype.kind == 'f':
+        return values
+    if values.dtype.kind == 'M':
+        # NaT أصغر int64، فيأتي في آخر الترتيب التنازلي
+        values = values.view(np.int64)
+    return values.astype(np.float64)
+
+def _iso_seconds(value: Any) -> Any:
+    if value is None:
+        return np.datetime64('NaT')
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+    offset = value[19:].lstrip('.0123456789')
+    if offset in ('', 'Z', '+00:00', '+00'):
+        # المسار السريع: نص بلا إزاحة أو بتوقيت UTC
+        return value[:19]
+    return datetime.fromisoformat(value).astimezone(timezone.utc).replace(tzinfo=None)
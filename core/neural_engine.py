@@ -1,13 +1,29 @@
-import os
+import asyncio
 import json
-from groq import Groq
 from loguru import logger
 
+from config.settings import settings
+from core.json_stream import IncrementalJSONObject
+from core.llm_gateway import get_gateway
+from core.llm_router import get_router
+from core.prompt_compression import compress_prompt
+
+MODEL = "llama3-70b-8192"
+CONFIRMED_FIELDS = ("score", "analysis", "message")
+# Router candidates, all able to write the outreach message
+ROUTE_BACKENDS = ("groq-70b", "groq-8b", "openai")
+
 class NeuralEngine:
     def __init__(self):
-        self.client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+        self.gateway = get_gateway()
+        self.router = get_router()
+
+    def _messages(self, content: str, usp: str, product_link: str, keywords=None):
+        # Keep only the sentences relevant to the campaign before paying for them in tokens
+        compressed = compress_prompt(content, [*(keywords or []), usp], settings.PROMPT_CONTENT_TOKENS)
+        logger.info(f"Prompt tokens: {compressed.tokens_before} -> {compressed.tokens_after}")
+        content = compressed.text
 
-    def analyze(self, content: str, usp: str, product_link: str):
         prompt = f"""
         Analyze content for high buying intent (>97%).
         Product USP: {usp}
@@ -22,14 +38,68 @@ class NeuralEngine:
         }}
         Else return {{ "is_confirmed": false }}
         """
-        
+        return [{"role": "user", "content": f"{prompt}\n\nContent: {content}"}]
+
+    @staticmethod
+    def _verdict_reader():
+        """Returns (on_delta, parser): on_delta stops the stream once the verdict is settled."""
+        parser = IncrementalJSONObject()
+
+        def on_delta(delta: str) -> bool:
+            fields = parser.feed(delta)
+            if parser.complete or fields.get("is_confirmed") is False:
+                return False
+            # Confirmed leads need the full message before we can stop
+            return not (fields.get("is_confirmed") and all(k in fields for k in CONFIRMED_FIELDS))
+
+        return on_delta, parser
+
+    @staticmethod
+    def _streamed_result(parser: IncrementalJSONObject):
+        """Only an explicit `false` or a complete confirmed verdict counts; anything else is an error
+        so VectorMemory does not store a truncated stream as a negative verdict."""
+        fields = parser.fields
+        if fields.get("is_confirmed") is False:
+            logger.debug(f"Stream stopped early after {len(parser.buffer)} chars")
+            return fields
+        if "is_confirmed" not in fields:
+            return {"is_confirmed": False, "error": f"Stream ended without a verdict ({len(parser.buffer)} chars)"}
+        missing = [k for k in CONFIRMED_FIELDS if k not in fields]
+        if fields["is_confirmed"] and missing:
+            return {"is_confirmed": False, "error": f"Stream ended before {', '.join(missing)}"}
+        return fields
+
+    async def _complete(self, provider: str, model: str, messages):
+        if settings.NEURAL_STREAMING:
+            on_delta, parser = self._verdict_reader()
+            await self.gateway.chat_stream(provider, model, messages, on_delta)
+            return self._streamed_result(parser)
+        response = await self.gateway.chat(
+            provider, model, messages, response_format={"type": "json_object"}
+        )
+        return json.loads(response.choices[0].message.content)
+
+    async def _analyze(self, messages):
+        if not settings.LLM_ROUTING:
+            return await self._complete("groq", MODEL, messages)
+        # Fastest healthy backend first, hedged on another one if it misses its SLO
+        return await self.router.route({
+            name: lambda backend: self._complete(backend.provider, backend.model, messages)
+            for name in ROUTE_BACKENDS
+        })
+
+    def analyze(self, content: str, usp: str, product_link: str, keywords=None):
+        try:
+            messages = self._messages(content, usp, product_link, keywords)
+            return self.gateway.run(self._analyze(messages)).result()
+        except Exception as e:
+            logger.error(f"Neural Error: {e}")
+            return {"is_confirmed": False, "error": str(e)}
+
+    async def analyze_async(self, content: str, usp: str, product_link: str, keywords=None):
         try:
-            response = self.client.chat.completions.create(
-                messages=[{"role": "user", "content": f"{prompt}\n\nContent: {content}"}],
-                model="llama3-70b-8192",
-                response_format={"type": "json_object"}
-            )
-            return json.loads(response.choices[0].message.content)
+            messages = self._messages(content, usp, product_link, keywords)
+            return await asyncio.wrap_future(self.gateway.run(self._analyze(messages)))
         except Exception as e:
             logger.error(f"Neural Error: {e}")
-            return {"is_confirmed": False}
+            return {"is_confirmed": False, "error": str(e)}
@@ -0,0 +1,99 @@
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+from core.text_budget import INTENT_CUES, TokenCounter, get_token_counter, split_sentences, truncate_to_tokens
+
+_WORD = re.compile(r'[a-z0-9]{3,}')
+
+STOP_WORDS = {
+    'the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'any', 'can', 'our', 'out', 'has',
+    'how', 'new', 'now', 'who', 'its', 'use', 'with', 'your', 'from', 'that', 'this', 'what',
+    'will', 'have', 'into', 'just', 'more', 'most', 'only', 'than', 'them', 'they', 'when',
+    'about', 'would', 'could', 'should', 'there', 'their', 'which', 'best', 'help', 'make'
+}
+
+# جمل القوالب والتنقل التي لا تحمل محتوى
+BOILERPLATE = (
+    'cookie', 'privacy policy', 'terms of service', 'sign up', 'log in', 'login', 'subscribe',
+    'all rights reserved', 'skip to content', 'accept all', 'newsletter', 'javascript'
+)
+
+# BM25
+K1 = 1.2
+B = 0.75
+
+
+@dataclass
+class CompressedPrompt:
+    """نتيجة الضغط مع عدد الرموز قبل وبعد"""
+    text: str
+    tokens_before: int
+    tokens_after: int
+
+    @property
+    def saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+def _terms(text: str) -> List[str]:
+    return [w for w in _WORD.findall(text.lower()) if w not in STOP_WORDS]
+
+
+def compress_prompt(content: str,
+                    query: Iterable[str],
+                    token_budget: int,
+                    count: Optional[TokenCounter] = None) -> CompressedPrompt:
+    """الإبقاء على أكثر الجمل صلة بالكلمات المفتاحية وميزة المنتج ضمن ميزانية الرموز"""
+    count = count or get_token_counter()
+    before = count(content or '')
+    if before <= token_budget:
+        return CompressedPrompt(content, before, before)
+
+    sentences = split_sentences(content)
+    sentence_terms = [_terms(s) for s in sentences]
+    query_terms = set(_terms(" ".join(query)))
+
+    # BM25 لكل جملة مقابل مصطلحات الحملة
+    n = len(sentences)
+    avg_len = sum(len(t) for t in sentence_terms) / max(n, 1) or 1.0
+    df = Counter(term for terms in sentence_terms for term in set(terms) if term in query_terms)
+
+    scores = []
+    for i, (sentence, terms) in enumerate(zip(sentences, sentence_terms)):
+        tf = Counter(t for t in terms if t in query_terms)
+        score = 0.0
+        for term, freq in tf.items():
+            idf = math.log(1 + (n - df[term] + 0.5) / (df[term] + 0.5))
+            score += idf * freq * (K1 + 1) / (freq + K1 * (1 - B + B * len(terms) / avg_len))
+
+        lower = sentence.lower()
+        score += 0.5 * sum(1 for cue in INTENT_CUES if cue in lower) + 0.5 * sentence.count('?')
+        if any(marker in lower for marker in BOILERPLATE) or len(terms) < 3:
+            score -= 2.0
+        scores.append((score, -i))
+
+    kept, used, seen = {}, 0, set()
+    for score, neg_index in sorted(scores, reverse=True):
+        i = -neg_index
+        key = sentences[i].lower()
+        # لا حشو بجمل عديمة الصلة، ولا تكرار لجمل متطابقة (شائع في الصفحات المستخرجة)
+        if (score <= 0 and kept) or key in seen:
+            continue
+        seen.add(key)
+        cost = count(sentences[i]) + 1
+        if used + cost <= token_budget:
+            kept[i] = sentences[i]
+            used += cost
+        elif not kept:
+            # الجملة الأعلى صلة أطول من الميزانية: تُقتطع بدل تجاوزها إلى جمل أقل صلة
+            kept[i] = truncate_to_tokens(sentences[i], token_budget - 1, count, query_terms)
+            used += count(kept[i]) + 1
+
+    text = " ".join(kept[i] for i in sorted(kept) if kept[i])
+    if not text.strip():
+        # محتوى غير فارغ لا يُضغط أبداً إلى نص فارغ
+        text = truncate_to_tokens(content, token_budget, count, query_terms)
+    return CompressedPrompt(text, before, count(text))
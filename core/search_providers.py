@@ -0,0 +1,284 @@
+import asyncio
+import json
+from abc import ABC, abstractmethod
+import logging
+import random
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Type
+
+import aiohttp
+
+from config.settings import settings
+from core.models import Platform
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ProviderProfile:
+    """ملف تكلفة وأداء مزود البحث"""
+    cost_per_query: float = 0.0        # بالدولار
+    rate_limit_per_minute: int = 0     # 0 = بدون حد
+    latency_p50_ms: int = 0
+    latency_p95_ms: int = 0
+
+
+class SearchProvider(ABC):
+    """واجهة موحدة لمزودي البحث"""
+
+    name: str = ""
+    profile: ProviderProfile = ProviderProfile()
+    # المنصات التي يخدمها المزود مباشرة (بقيم Platform)
+    platforms: Tuple[str, ...] = ()
+    # مزود بديل عند الفشل
+    fallback: Optional[str] = None
+
+    def __init__(self):
+        self._next_slot = 0.0
+
+    async def search(self, query: str, max_results: int,
+                     session: Optional[aiohttp.ClientSession] = None) -> List[Dict]:
+        """بحث مع احترام حد المعدل والتحويل إلى المزود البديل عند الفشل
+
+        بلا مزود بديل يُرفع الخطأ للمستدعي (لتعمل إعادة المحاولة لديه) بدل نتيجة فارغة.
+        """
+        try:
+            await self._throttle()
+            return await self._search(query, max_results, session)
+        except Exception as e:
+            if not self.fallback:
+                raise
+            logger.warning(f"{self.name} search error, falling back to {self.fallback}: {e}")
+            return await get_provider(self.fallback).search(query, max_results, session)
+
+    @abstractmethod
+    async def _search(self, query: str, max_results: int,
+                      session: Optional[aiohttp.ClientSession]) -> List[Dict]:
+        """طلب البحث الفعلي لدى المزود"""
+
+    async def _throttle(self):
+        """المباعدة بين الطلبات وفق rate_limit_per_minute"""
+        if not self.profile.rate_limit_per_minute:
+            return
+        # حجز الموعد التالي قبل الانتظار حتى لا تتزاحم الطلبات المتزامنة
+        now = time.monotonic()
+        start = max(now, self._next_slot)
+        self._next_slot = start + 60.0 / self.profile.rate_limit_per_minute
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    @staticmethod
+    def _result(url: str, title: str, snippet: str, source: str, **extra) -> Dict:
+        """توحيد شكل النتيجة بين المزودين"""
+        return {'url': url, 'title': title, 'snippet': snippet or '', 'search_source': source, **extra}
+
+
+_PROVIDERS: Dict[str, Type[SearchProvider]] = {}
+_INSTANCES: Dict[str, SearchProvider] = {}
+
+
+def register_provider(cls: Type[SearchProvider]) -> Type[SearchProvider]:
+    """تسجيل مزود بحث جديد (يستخدم كـ decorator)"""
+    _PROVIDERS[cls.name] = cls
+    return cls
+
+
+def get_provider(name: str) -> SearchProvider:
+    """الحصول على نسخة مشتركة من المزود بالاسم"""
+    if name not in _INSTANCES:
+        if name not in _PROVIDERS:
+            raise KeyError(f"Unknown search provider: {name}")
+        _INSTANCES[name] = _PROVIDERS[name]()
+    return _INSTANCES[name]
+
+
+def available_providers() -> Dict[str, ProviderProfile]:
+    """قائمة المزودين المسجلين مع ملفاتهم"""
+    return {name: cls.profile for name, cls in _PROVIDERS.items()}
+
+
+def resolve_provider(platform: str = Platform.GENERIC.value, default: str = "google") -> SearchProvider:
+    """اختيار المزود: إعداد SEARCH_PROVIDER أولاً، ثم مزود المنصة، ثم الافتراضي"""
+    if settings.SEARCH_PROVIDER:
+        return get_provider(settings.SEARCH_PROVIDER)
+    for name, cls in _PROVIDERS.items():
+        if platform in cls.platforms:
+            return get_provider(name)
+    return get_provider(default)
+
+
+@register_provider
+class GoogleSearchProvider(SearchProvider):
+    """Google Custom Search API"""
+
+    name = "google"
+    profile = ProviderProfile(cost_per_query=0.005, rate_limit_per_minute=100,
+                              latency_p50_ms=450, latency_p95_ms=1200)
+
+    async def _search(self, query, max_results, session):
+        params = {
+            'key': settings.GOOGLE_API_KEY,
+            'cx': settings.GOOGLE_CX,
+            'q': query,
+            'num': min(max_results, 10),
+            'start': 1
+        }
+        own_session = session is None
+        session = session or aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=settings.REQUEST_TIMEOUT))
+        try:
+            async with session.get("https://www.googleapis.com/customsearch/v1", params=params) as response:
+                if response.status != 200:
+                    logger.error(f"Google API error: {response.status}")
+                response.raise_for_status()
+                data = await response.json()
+        finally:
+            if own_session:
+                await session.close()
+
+        return [
+            self._result(item.get('link', ''), item.get('title', ''), item.get('snippet', ''), self.name)
+            for item in data.get('items', [])
+        ]
+
+
+@register_provider
+class GitHubSearchProvider(SearchProvider):
+    """GitHub users search API"""
+
+    name = "github"
+    profile = ProviderProfile(cost_per_query=0.0, rate_limit_per_minute=10,
+                              latency_p50_ms=350, latency_p95_ms=900)
+    platforms = (Platform.GITHUB.value,)
+    fallback = "google"
+
+    async def _search(self, query, max_results, session):
+        search_term = query.replace("site:github.com", "").strip()
+        params = {'q': f"{search_term} in:login,in:name", 'per_page': min(max_results, 30)}
+        headers = {'Accept': 'application/vnd.github.v3+json'}
+
+        own_session = session is None
+        session = session or aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=settings.REQUEST_TIMEOUT))
+        try:
+            async with session.get("https://api.github.com/search/users", params=params, headers=headers) as response:
+                if response.status != 200:
+                    logger.error(f"GitHub API error: {response.status}")
+                response.raise_for_status()
+                data = await response.json()
+        finally:
+            if own_session:
+                await session.close()
+
+        return [
+            self._result(
+                item.get('html_url', ''), item.get('login', ''), item.get('bio', ''), 'github_api',
+                platform=Platform.GITHUB.value,
+                metadata={'type': item.get('type', ''), 'score': item.get('score', 0)}
+            )
+            for item in data.get('items', [])[:max_results]
+        ]
+
+
+@register_provider
+class DuckDuckGoSearchProvider(SearchProvider):
+    """DuckDuckGo عبر duckduckgo_search"""
+
+    name = "duckduckgo"
+    profile = ProviderProfile(cost_per_query=0.0, rate_limit_per_minute=30,
+                              latency_p50_ms=800, latency_p95_ms=2500)
+
+    async def _search(self, query, max_results, session):
+        from duckduckgo_search import DDGS
+
+        results = await asyncio.to_thread(lambda: DDGS().text(query, max_results=max_results))
+        return [
+            self._result(item.get('href', ''), item.get('title', ''), item.get('body', ''), self.name)
+            for item in results or []
+        ]
+
+
+@register_provider
+class FixtureSearchProvider(SearchProvider):
+    """مزود محلي يقدم نتائج مسجلة مسبقاً، للاختبار وقياس الأداء بدون شبكة"""
+
+    name = "fixture"
+    profile = ProviderProfile()
+
+    def __init__(self, path: Optional[str] = None):
+        super().__init__()
+        self.path = Path(path or settings.SEARCH_FIXTURES_PATH)
+        self.recorded: Dict[str, List[Dict]] = {}
+        self.pool: List[Dict] = []
+        self._load()
+        if settings.SEARCH_FIXTURE_SIMULATE_LATENCY:
+            # محاكاة زمن استجابة المزود الذي سُجلت منه النتائج
+            self.profile = GoogleSearchProvider.profile
+
+    def _load(self):
+        """تحميل ملفات JSON: [{"query": ..., "results": [...]}]"""
+        files = sorted(self.path.glob("*.json")) if self.path.is_dir() else [self.path]
+        for file in files:
+            if not file.exists():
+                logger.warning(f"Search fixture not found: {file}")
+                continue
+            for record in json.loads(file.read_text(encoding='utf-8')):
+                self.recorded.setdefault(self._normalize(record['query']), []).extend(record['results'])
+                self.pool.extend(record['results'])
+        logger.info(f"Loaded {len(self.recorded)} recorded queries ({len(self.pool)} results)")
+
+    @staticmethod
+    def _normalize(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    def _lookup(self, query: str) -> List[Dict]:
+        """مطابقة تامة، ثم أقرب استعلام مسجل، ثم عينة ثابتة من كل النتائج"""
+        key = self._normalize(query)
+        if key in self.recorded:
+            return self.recorded[key]
+
+        tokens = set(re.findall(r'\w+', key))
+        best, best_overlap = None, 0.0
+        for recorded_query, results in self.recorded.items():
+            recorded_tokens = set(re.findall(r'\w+', recorded_query))
+            overlap = len(tokens & recorded_tokens) / (len(tokens | recorded_tokens) or 1)
+            if overlap > best_overlap:
+                best, best_overlap = results, overlap
+        if best is not None:
+            return best
+
+        if not self.pool:
+            return []
+        start = sum(key.encode()) % len(self.pool)
+        return self.pool[start:] + self.pool[:start]
+
+    async def _search(self, query, max_results, session):
+        if self.profile.latency_p95_ms:
+            delay = random.triangular(self.profile.latency_p50_ms / 2, self.profile.latency_p95_ms,
+                                      self.profile.latency_p50_ms)
+            await asyncio.sleep(delay / 1000)
+        return [
+            self._result(r.get('url', ''), r.get('title', ''), r.get('snippet', ''), self.name,
+                         **{k: v for k, v in r.items() if k not in ('url', 'title', 'snippet', 'search_source')})
+            for r in self._lookup(query)[:max_results]
+        ]
+
+
+class RecordingSearchProvider(SearchProvider):
+    """غلاف يسجل نتائج مزود حقيقي بصيغة FixtureSearchProvider"""
+
+    def __init__(self, inner: SearchProvider, path: str):
+        super().__init__()
+        self.inner = inner
+        self.name = f"recording:{inner.name}"
+        # حد المعدل والتحويل للبديل يطبقهما المزود الداخلي
+        self.path = Path(path)
+
+    async def _search(self, query, max_results, session):
+        results = await self.inner.search(query, max_results, session)
+        records = json.loads(self.path.read_text(encoding='utf-8')) if self.path.exists() else []
+        records.append({'query': query, 'provider': self.inner.name, 'results': results})
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(records, ensure_ascii=False, indent=2), encoding='utf-8')
+        return results
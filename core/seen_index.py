@@ -0,0 +1,130 @@
+import hashlib
+import logging
+import math
+import threading
+from typing import Any, Iterable, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_url(url: str) -> str:
+    """شكل موحد للرابط: مخطط ونطاق بأحرف صغيرة، بلا جزء (#) ولا شرطة أخيرة"""
+    parts = urlsplit((url or "").strip())
+    path = parts.path.rstrip("/")
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ""))
+
+
+def _digest(url: str) -> bytes:
+    return hashlib.blake2b(normalize_url(url).encode(), digest_size=16).digest()
+
+
+class BloomFilter:
+    """مرشح Bloom بمعدل إيجابيات كاذبة محدد عند السعة المطلوبة"""
+
+    def __init__(self, capacity: int, fp_rate: float):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, digest: bytes):
+        # تجزئة مزدوجة: k موقعاً من قيمتين 64-بت
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, digest: bytes):
+        for pos in self._positions(digest):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, digest: bytes) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(digest))
+
+
+class SeenUrlIndex:
+    """روابط العملاء المحتملين المعالجة سابقاً، لتجاوزها مباشرة بعد البحث
+
+    "set": مجموعة بصمات 64-بت (دقيقة)، أو "bloom": مرشح Bloom بحجم ثابت وإيجابيات كاذبة محدودة.
+    """
+
+    def __init__(self, mode: str = None, capacity: int = None, fp_rate: float = None):
+        self.mode = mode or settings.SEEN_INDEX_MODE
+        self.fp_rate = fp_rate or settings.SEEN_INDEX_FP_RATE
+        self.capacity = capacity or settings.SEEN_INDEX_CAPACITY
+        self._lock = threading.Lock()
+        self.count = 0
+        self._reset(self.capacity)
+
+    def _reset(self, capacity: int):
+        self.capacity = capacity
+        self._set = set() if self.mode == "set" else None
+        self._bloom = BloomFilter(capacity, self.fp_rate) if self.mode == "bloom" else None
+        self.count = 0
+
+    def add(self, url: str):
+        digest = _digest(url)
+        with self._lock:
+            if self._set is not None:
+                self._set.add(int.from_bytes(digest[:8], "little"))
+            else:
+                self._bloom.add(digest)
+            self.count += 1
+
+    def add_many(self, urls: Iterable[str]):
+        for url in urls:
+            if url:
+                self.add(url)
+
+    def __contains__(self, url: str) -> bool:
+        digest = _digest(url)
+        if self._set is not None:
+            return int.from_bytes(digest[:8], "little") in self._set
+        return digest in self._bloom
+
+    def __len__(self) -> int:
+        return len(self._set) if self._set is not None else self.count
+
+    def warm(self, client: Any, table: str = "leads", page_size: int = None) -> int:
+        """تحميل الروابط الموجودة بترقيم keyset على عمود url فقط (بلا OFFSET)"""
+        page_size = page_size or settings.SEEN_INDEX_PAGE_SIZE
+        if self._bloom is not None:
+            # حجم المرشح من عدد الصفوف الفعلي مع هامش للنمو
+            total = client.table(table).select("url", count="exact").limit(1).execute().count or 0
+            if total * 2 > self.capacity:
+                self._reset(total * 2)
+
+        loaded, last = 0, None
+        while True:
+            query = client.table(table).select("url").order("url").limit(page_size)
+            if last is not None:
+                query = query.gt("url", last)
+            rows = query.execute().data or []
+            self.add_many(row["url"] for row in rows)
+            loaded += len(rows)
+            if len(rows) < page_size:
+                break
+            last = rows[-1]["url"]
+
+        logger.info(f"Seen-URL index warmed with {loaded} urls ({self.mode})")
+        return loaded
+
+
+_index: Optional[SeenUrlIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_seen_index(client: Any = None) -> SeenUrlIndex:
+    """الفهرس المشترك للعملية؛ يُحمّل من جدول leads عند أول استدعاء بعميل متاح"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SeenUrlIndex()
+            if client is not None:
+                try:
+                    _index.warm(client)
+                except Exception as e:
+                    logger.warning(f"Could not warm seen-URL index: {e}")
+    return _index
@@ -0,0 +1,194 @@
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.f32"
+META_FILE = "meta.jsonl"
+HNSW_FILE = "hnsw.bin"
+INITIAL_CAPACITY = 1024
+
+# HNSW: جودة البناء والبحث مقابل الزمن
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+
+
+class SemanticIndex:
+    """فهرس تشابه محلي على القرص: متجهات مطبّعة في ملف memmap وبيانات وصفية JSONL
+
+    بحث دقيق بـ NumPy للمجموعات الصغيرة، وHNSW (hnswlib إن كانت مثبتة) فوق حد معين.
+    """
+
+    def __init__(self, path: str, dim: int, hnsw_threshold: int = None):
+        self.path = path
+        self.dim = dim
+        self.hnsw_threshold = hnsw_threshold or settings.VECTOR_HNSW_THRESHOLD
+        self.meta: List[Dict[str, Any]] = []
+        self._groups: Dict[Hashable, List[int]] = {}  # مجموعة (مثل الحملة) -> مواقع متجهاتها
+        self._vectors: Optional[np.memmap] = None
+        self._hnsw = None
+        self._lock = threading.Lock()
+
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    # ---- التخزين ----
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _load(self):
+        meta_path = self._file(META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                self.meta = [json.loads(line) for line in f if line.strip()]
+
+        vectors_path = self._file(VECTORS_FILE)
+        capacity = INITIAL_CAPACITY
+        if os.path.exists(vectors_path):
+            capacity = max(capacity, os.path.getsize(vectors_path) // (4 * self.dim))
+        # سطر وصفي بلا متجه (كتابة منقطعة) لا يُعتد به
+        self.meta = self.meta[:capacity] if os.path.exists(vectors_path) else []
+        for i, meta in enumerate(self.meta):
+            self._groups.setdefault(meta.get('group'), []).append(i)
+        self._open_vectors(capacity)
+
+        if len(self.meta) >= self.hnsw_threshold:
+            self._load_hnsw()
+
+    def _open_vectors(self, capacity: int):
+        """فتح ملف المتجهات بسعة معينة (توسيعه على القرص إن لزم)"""
+        vectors_path = self._file(VECTORS_FILE)
+        size = capacity * self.dim * 4
+        with open(vectors_path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        if self._vectors is not None:
+            self._vectors.flush()
+        self._vectors = np.memmap(vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def __len__(self) -> int:
+        return len(self.meta)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[:len(self.meta)]
+
+    def add(self, vectors: np.ndarray, metas: List[Dict[str, Any]]):
+        """إضافة متجهات (مطبّعة) مع بياناتها الوصفية وكتابتها إلى القرص
+
+        المفتاح 'group' في البيانات الوصفية يحدد المجموعة التي يقتصر عليها البحث.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if len(vectors) != len(metas):
+            raise ValueError("vectors and metas must have the same length")
+        if not len(vectors):
+            return
+
+        with self._lock:
+            start = len(self.meta)
+            end = start + len(vectors)
+            if end > self._vectors.shape[0]:
+                # مضاعفة السعة: عدد قليل من عمليات التوسيع مهما كبر الفهرس
+                self._open_vectors(max(end, self._vectors.shape[0] * 2))
+            self._vectors[start:end] = vectors
+            self._vectors.flush()
+
+            with open(self._file(META_FILE), "a", encoding="utf-8") as f:
+                for meta in metas:
+                    f.write(json.dumps(meta, ensure_ascii=False) + "\n")
+            for i, meta in enumerate(metas, start):
+                self._groups.setdefault(meta.get('group'), []).append(i)
+            self.meta.extend(metas)
+
+            if self._hnsw is not None:
+                self._hnsw_add(vectors, start)
+            elif end >= self.hnsw_threshold:
+                self._build_hnsw()
+
+    # ---- HNSW ----
+
+    def _build_hnsw(self):
+        try:
+            import hnswlib
+        except ImportError:
+            logger.info("hnswlib not installed, staying on exact search")
+            self.hnsw_threshold = float("inf")
+            return
+        logger.info(f"Building HNSW index over {len(self.meta)} vectors")
+        self._hnsw = hnswlib.Index(space="ip", dim=self.dim)
+        self._hnsw.init_index(max_elements=self._vectors.shape[0], ef_construction=HNSW_EF_CONSTRUCTION, M=HNSW_M)
+        self._hnsw.add_items(self.vectors, np.arange(len(self.meta)))
+        self._hnsw.set_ef(HNSW_EF_SEARCH)
+
+    def _load_hnsw(self):
+        hnsw_path = self._file(HNSW_FILE)
+        try:
+            import hnswlib
+        except ImportError:
+            self.hnsw_threshold = float("inf")
+            return
+        if not os.path.exists(hnsw_path):
+            self._build_hnsw()
+            return
+        self._hnsw = hnswlib.Index(space="ip", dim=self.dim)
+        self._hnsw.load_index(hnsw_path, max_elements=self._vectors.shape[0])
+        self._hnsw.set_ef(HNSW_EF_SEARCH)
+        indexed = self._hnsw.get_current_count()
+        if indexed < len(self.meta):
+            # متجهات أضيفت بعد آخر حفظ للرسم البياني
+            self._hnsw_add(self.vectors[indexed:], indexed)
+
+    def _hnsw_add(self, vectors: np.ndarray, start: int):
+        needed = start + len(vectors)
+        if needed > self._hnsw.get_max_elements():
+            self._hnsw.resize_index(max(needed, self._hnsw.get_max_elements() * 2))
+        self._hnsw.add_items(vectors, np.arange(start, needed))
+
+    def save(self):
+        """حفظ الرسم البياني لـ HNSW (المتجهات والبيانات الوصفية تكتب فور الإضافة)"""
+        with self._lock:
+            self._vectors.flush()
+            if self._hnsw is not None:
+                self._hnsw.save_index(self._file(HNSW_FILE))
+
+    # ---- البحث ----
+
+    def search(self,
+               query: np.ndarray,
+               k: int = 5,
+               group: Hashable = None) -> List[Tuple[float, Dict[str, Any]]]:
+        """أقرب k عناصر (تشابه جيب التمام، بيانات وصفية)، داخل مجموعة واحدة إن حُددت"""
+        if group is not None:
+            members = self._groups.get(group)
+            if not members:
+                return []
+        elif not self.meta:
+            return []
+        query = np.asarray(query, dtype=np.float32).reshape(self.dim)
+
+        # المجموعات الصغيرة تُبحث بدقة حتى مع وجود HNSW
+        if self._hnsw is not None and (group is None or len(members) > self.hnsw_threshold):
+            # جلب مرشحين أكثر لتعويض ما يقع خارج المجموعة
+            fetch = min(len(self.meta), k if group is None else k * 8)
+            labels, distances = self._hnsw.knn_query(query, k=fetch)
+            allowed = None if group is None else set(members)
+            hits = [(float(1.0 - d), self.meta[int(i)]) for i, d in zip(labels[0], distances[0])
+                    if allowed is None or int(i) in allowed]
+            return hits[:k]
+
+        # بحث دقيق: ضرب مصفوفة واحد على متجهات المجموعة فقط
+        ids = np.asarray(members) if group is not None else np.arange(len(self.meta))
+        similarities = self._vectors[ids] @ query
+        top = min(k, len(ids))
+        best = np.argpartition(-similarities, top - 1)[:top]
+        best = best[np.argsort(-similarities[best])]
+        return [(float(similarities[j]), self.meta[int(ids[j])]) for j in best]
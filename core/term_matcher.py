@@ -0,0 +1,90 @@
+from collections import deque
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+class TermMatcher:
+    """مطابق متعدد الأنماط (Aho-Corasick) يجد كل مصطلحات القواميس في مرور واحد على النص"""
+
+    def __init__(self, dictionaries: Dict[Hashable, Iterable[str]], word_boundary: bool = False):
+        self.word_boundary = word_boundary
+        self.categories = list(dictionaries)
+
+        # الحالة 0 هي الجذر
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[Hashable, str]]] = [[]]
+
+        for category, terms in dictionaries.items():
+            for term in terms:
+                self._add(category, term.lower())
+        self._build_failure_links()
+
+    def _add(self, category: Hashable, term: str):
+        """إضافة مصطلح إلى الشجرة"""
+        if not term:
+            return
+        node = 0
+        for ch in term:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[node][ch] = nxt
+            node = nxt
+        if (category, term) not in self._out[node]:
+            self._out[node].append((category, term))
+
+    def _build_failure_links(self):
+        """بناء روابط الفشل بالعرض (BFS) ودمج المخرجات"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def scan(self, text: str) -> Dict[Hashable, List[str]]:
+        """كل الفئات التي ظهرت مع مصطلحاتها المميزة بترتيب أول ظهور"""
+        hits: Dict[Hashable, List[str]] = {}
+        if not text:
+            return hits
+
+        text = text.lower()
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for category, term in out[node]:
+                if self.word_boundary and not self._on_boundary(text, i + 1 - len(term), i + 1):
+                    continue
+                found = hits.setdefault(category, [])
+                if term not in found:
+                    found.append(term)
+        return hits
+
+    def counts(self, text: str) -> Dict[Hashable, int]:
+        """عدد المصطلحات المميزة لكل فئة"""
+        return {category: len(terms) for category, terms in self.scan(text).items()}
+
+    def first_category(self, text: str, hits: Optional[Dict[Hashable, List[str]]] = None) -> Optional[Hashable]:
+        """أول فئة (بترتيب القواميس) لها تطابق"""
+        hits = self.scan(text) if hits is None else hits
+        for category in self.categories:
+            if category in hits:
+                return category
+        return None
+
+    @staticmethod
+    def _on_boundary(text: str, start: int, end: int) -> bool:
+        before = text[start - 1] if start > 0 else ' '
+        after = text[end] if end < len(text) else ' '
+        return not (before.isalnum() or before == '_') and not (after.isalnum() or after == '_')
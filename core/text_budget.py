@@ -0,0 +1,111 @@
+import re
+from typing import Callable, Iterable, List, Optional, Sequence
+
+TokenCounter = Callable[[str], int]
+
+# عبارات تدل على نية شرائية أو حاجة، ترفع أولوية الجملة عند الاقتطاع
+INTENT_CUES = (
+    'looking for', 'need', 'recommend', 'suggest', 'buy', 'purchase', 'budget', 'pricing',
+    'price', 'alternative', 'switch', 'help', 'problem', 'struggling', 'anyone', 'hiring'
+)
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?؟])\s+|\n+')
+_WORD = re.compile(r'\w+')
+
+
+def split_sentences(text: str) -> List[str]:
+    """تقسيم النص إلى جمل"""
+    return [s.strip() for s in _SENTENCE_SPLIT.split(text or '') if s and s.strip()]
+
+
+def get_token_counter(tokenizer=None) -> TokenCounter:
+    """عداد رموز: tokenizer النموذج إن وجد، ثم tiktoken، ثم تقدير (4 أحرف لكل رمز)"""
+    if tokenizer is not None:
+        return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+    try:
+        import tiktoken
+
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text))
+    except Exception:
+        return lambda text: (len(text) + 3) // 4
+
+
+def sentence_salience(sentence: str, position: int, terms: Iterable[str] = ()) -> float:
+    """قيمة الجملة: مؤشرات النية، الأسئلة، تطابق المصطلحات، وأفضلية البداية"""
+    lower = sentence.lower()
+    score = sum(1.0 for cue in INTENT_CUES if cue in lower)
+    score += 1.5 * sentence.count('?')
+    words = set(_WORD.findall(lower))
+    score += 2.0 * sum(1 for term in terms if term and term.lower() in words)
+    if position == 0:
+        score += 1.0
+    if len(words) < 3:
+        score -= 1.0
+    return score
+
+
+def truncate_to_tokens(text: str,
+                       max_tokens: int,
+                       count: Optional[TokenCounter] = None,
+                       terms: Iterable[str] = ()) -> str:
+    """اقتطاع النص إلى حد رموز النموذج مع الإبقاء على الجمل الأعلى قيمة بترتيبها الأصلي"""
+    count = count or get_token_counter()
+    if not text or count(text) <= max_tokens:
+        return text
+
+    terms = list(terms)
+    sentences = split_sentences(text)
+    ranked = sorted(range(len(sentences)),
+                    key=lambda i: sentence_salience(sentences[i], i, terms), reverse=True)
+
+    kept, used = [], 0
+    for i in ranked:
+        cost = count(sentences[i]) + 1
+        if used + cost <= max_tokens:
+            kept.append(i)
+            used += cost
+
+    if not kept:
+        # جملة واحدة أطول من الحد: قص بالتناسب ثم التحقق
+        best = sentences[ranked[0]]
+        cut = best[:max(1, len(best) * max_tokens // max(count(best), 1))]
+        while cut and count(cut) > max_tokens:
+            cut = cut[:int(len(cut) * 0.9)]
+        return cut
+
+    return " ".join(sentences[i] for i in sorted(kept))
+
+
+def length_buckets(texts: Sequence[str],
+                   count: TokenCounter,
+                   batch_size: int,
+                   boundaries: Sequence[int] = (32, 64, 128, 256, 512)) -> List[List[int]]:
+    """تجميع فهارس النصوص في دفعات متقاربة الطول لتقليل الحشو الديناميكي"""
+    lengths = [count(text) for text in texts]
+    buckets: List[List[int]] = [[] for _ in range(len(boundaries) + 1)]
+    for i, length in enumerate(lengths):
+        slot = next((b for b, limit in enumerate(boundaries) if length <= limit), len(boundaries))
+        buckets[slot].append(i)
+
+    batches = []
+    for bucket in buckets:
+        bucket.sort(key=lambda i: lengths[i])
+        for start in range(0, len(bucket), batch_size):
+            batches.append(bucket[start:start + batch_size])
+    return batches
+
+
+def run_bucketed(fn: Callable[[List[str], int], List],
+                 texts: Sequence[str],
+                 count: TokenCounter,
+                 batch_size: int) -> List:
+    """تشغيل fn(دفعة، حجمها) على دفعات متقاربة الطول وإعادة المخرجات بترتيب المدخلات"""
+    outputs: List = [None] * len(texts)
+    for batch in length_buckets(texts, count, batch_size):
+        result = fn([texts[i] for i in batch], len(batch))
+        if isinstance(result, dict):
+            result = [result]
+        for i, output in zip(batch, result):
+            outputs[i] = output
+    return outputs
@@ -1,8 +1,16 @@
 import os
+from typing import List, Optional, Tuple
+
+import numpy as np
 from supabase import create_client, Client
 from loguru import logger
 from datetime import datetime
 
+from config.settings import settings
+from core.campaign_cache import get_campaign_cache
+from core.embeddings import embed, get_embedder
+from core.semantic_index import SemanticIndex
+
 class VectorMemory:
     def __init__(self):
         url: str = os.getenv("SUPABASE_URL")
@@ -10,12 +18,62 @@ class VectorMemory:
         if not url or not key:
             raise ValueError("Database Credentials Missing")
         self.supabase: Client = create_client(url, key)
+        self._index: Optional[SemanticIndex] = None
+
+    @property
+    def index(self) -> SemanticIndex:
+        """Local ANN index of analysed lead content, opened on first use."""
+        if self._index is None:
+            dim = get_embedder().get_sentence_embedding_dimension()
+            self._index = SemanticIndex(settings.VECTOR_INDEX_PATH, dim)
+        return self._index
+
+    def lookup(self, campaign_id, contents: List[str]) -> Tuple[Optional[np.ndarray], List[Optional[dict]]]:
+        """Embed contents and return past verdicts of near-identical content for the same campaign.
+
+        A None entry means nothing close enough is stored and the lead needs a fresh analysis.
+        """
+        try:
+            vectors = embed(contents)
+            hits = []
+            for vector in vectors:
+                best = self.index.search(vector, k=1, group=campaign_id)
+                close = best and best[0][0] >= settings.VECTOR_REUSE_SIMILARITY
+                hits.append(best[0][1] if close else None)
+            return vectors, hits
+        except Exception as e:
+            logger.warning(f"Semantic lookup unavailable: {e}")
+            return None, [None] * len(contents)
+
+    def remember(self, campaign_id, vectors: Optional[np.ndarray], urls: List[str], results: List[dict]):
+        """Store fresh verdicts (score, reason, hook) so similar leads can reuse them."""
+        if vectors is None or not len(vectors):
+            return
+        # Failed analyses are not verdicts and must not be reused
+        kept = [i for i, result in enumerate(results) if 'error' not in result]
+        vectors, urls, results = vectors[kept], [urls[i] for i in kept], [results[i] for i in kept]
+        metas = [
+            {
+                "group": campaign_id,
+                "url": url,
+                "is_confirmed": bool(result.get('is_confirmed')),
+                "score": result.get('score'),
+                "reason": result.get('analysis'),
+                "hook": result.get('message'),
+                "created_at": datetime.utcnow().isoformat()
+            }
+            for url, result in zip(urls, results)
+        ]
+        try:
+            self.index.add(vectors, metas)
+            self.index.save()
+        except Exception as e:
+            logger.error(f"Semantic index write error: {e}")
 
     def fetch_missions(self):
         """Fetch active campaigns from DB."""
         try:
-            response = self.supabase.table('campaigns').select("*").eq('status', 'active').execute()
-            return response.data
+            return get_campaign_cache(self.supabase).active()
         except Exception as e:
             logger.error(f"Memory Read Error: {e}")
             return []
@@ -17,9 +17,19 @@ from loguru import logger as loguru_logger
 from tenacity import retry, stop_after_attempt, wait_exponential
 from fake_useragent import UserAgent
 import requests
-from groq import Groq
 import tweepy
 
+from config.settings import settings
+from core.campaign_cache import get_campaign_cache
+from core.campaign_stats import STATS_SCHEMA
+from core.lead_trends import TRENDS_SCHEMA
+from core.journal import get_journal, journal_write
+from core.llm_gateway import get_gateway
+from core.message_cache import MessageCache, NAME_SLOT, TOPIC_SLOT, message_slots
+from core.prompt_compression import compress_prompt
+from core.search_providers import resolve_provider
+from core.seen_index import get_seen_index
+
 # Configure advanced logging with rotation and levels
 loguru_logger.add("nexus_prime.log", rotation="10 MB", level="DEBUG", format="{time} {level} {message}")
 logger = loguru_logger
@@ -63,6 +73,14 @@ class Campaign:
         self.min_intent = row.get("min_intent_score", 70)
         self.target_platforms = row.get("target_platforms", "twitter,email,linkedin").split(",")
 
+    @classmethod
+    def from_rows(cls, rows):
+        return [cls(row) for row in rows]
+
+# Only the columns the loop reads are fetched, never select *
+CAMPAIGN_COLUMNS = ("id", "name", "keywords", "usp", "product_link", "max_leads",
+                    "min_intent_score", "target_platforms", "status", "updated_at")
+
 class SupabaseService:
     def __init__(self):
         try:
@@ -71,6 +89,10 @@ class SupabaseService:
         except Exception as e:
             logger.error(f"Supabase init failed: {e}. Using mock mode.")
             self.client = None  # Fallback to local storage or mock
+        # Lead writes go to the local journal first; the replicator reconnects if init failed
+        get_journal(client_factory=lambda: self.client or create_client(SUPABASE_URL, SUPABASE_KEY))
+        self.seen = get_seen_index(self.client)
+        self.campaigns = get_campaign_cache(self.client, CAMPAIGN_COLUMNS) if self.client else None
 
     def initialize_schema(self):
         try:
@@ -87,8 +109,23 @@ class SupabaseService:
                     max_leads INTEGER DEFAULT 15,
                     min_intent_score INTEGER DEFAULT 70,
                     target_platforms TEXT DEFAULT 'twitter,email,linkedin',
-                    created_at TIMESTAMP DEFAULT NOW()
+                    target_region TEXT,
+                    created_at TIMESTAMP DEFAULT NOW(),
+                    updated_at TIMESTAMPTZ DEFAULT NOW()
                 );
+                ALTER TABLE campaigns ADD COLUMN IF NOT EXISTS target_region TEXT;
+                ALTER TABLE campaigns ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT NOW();
+                CREATE INDEX IF NOT EXISTS campaigns_updated_at_idx ON campaigns (updated_at);
+                -- Every change bumps updated_at so the campaign cache only polls changed rows
+                CREATE OR REPLACE FUNCTION touch_updated_at() RETURNS TRIGGER AS $$
+                BEGIN
+                    NEW.updated_at = NOW();
+                    RETURN NEW;
+                END;
+                $$ LANGUAGE plpgsql;
+                DROP TRIGGER IF EXISTS campaigns_touch_updated_at ON campaigns;
+                CREATE TRIGGER campaigns_touch_updated_at BEFORE UPDATE ON campaigns
+                    FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
                 CREATE TABLE IF NOT EXISTS leads (
                     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
                     campaign_id UUID REFERENCES campaigns(id) ON DELETE CASCADE,
@@ -97,56 +134,68 @@ class SupabaseService:
                     ai_analysis_text TEXT,
                     message_draft TEXT,
                     status TEXT DEFAULT 'new',
+                    platform TEXT DEFAULT 'generic',
                     contact_info JSONB,  # Flexible for emails, usernames, etc.
                     created_at TIMESTAMP DEFAULT NOW()
                 );
+                CREATE UNIQUE INDEX IF NOT EXISTS leads_url_key ON leads (url);
+                -- Keyset pages for exports and paged reads: (campaign_id, created_at, id)
+                CREATE INDEX IF NOT EXISTS leads_campaign_keyset_idx ON leads (campaign_id, created_at, id);
+                -- Top-K leads: order by intent_score desc limit k walks these indexes
+                ALTER TABLE leads ADD COLUMN IF NOT EXISTS platform TEXT DEFAULT 'generic';
+                CREATE INDEX IF NOT EXISTS leads_intent_idx ON leads (intent_score DESC NULLS LAST);
+                CREATE INDEX IF NOT EXISTS leads_campaign_intent_idx ON leads (campaign_id, intent_score DESC NULLS LAST);
+                CREATE INDEX IF NOT EXISTS leads_platform_intent_idx ON leads (platform, intent_score DESC NULLS LAST);
                 """
             }).execute()
+            # Per-campaign counters maintained by a trigger on leads
+            self.client.rpc('execute_sql', {'sql': STATS_SCHEMA}).execute()
+            # Hourly/daily trend buckets built from lead events
+            self.client.rpc('execute_sql', {'sql': TRENDS_SCHEMA}).execute()
             logger.info("Schema verified/created successfully.")
         except Exception as e:
             logger.warning(f"Schema init failed: {e}. Continuing with existing tables.")
 
     async def get_active_campaigns(self):
         try:
-            res = self.client.table("campaigns").select("*").eq("status", "active").execute()
-            return [Campaign(row) for row in res.data or []]
+            # Polls only rows changed since the last watermark; unchanged campaigns keep their objects
+            return self.campaigns.objects(Campaign.from_rows)
         except Exception as e:
             logger.error(f"Campaign fetch failed: {e}. Returning empty list.")
             return []
 
     async def insert_or_update_lead(self, payload):
         try:
-            existing = self.client.table("leads").select("id").eq("url", payload["url"]).execute()
-            if existing.data:
-                res = self.client.table("leads").update(payload).eq("id", existing.data[0]["id"]).execute()
-            else:
-                res = self.client.table("leads").insert(payload).execute()
-            return bool(res.data)
+            # Idempotent upsert on the unique url, replicated in bulk from the local journal
+            journal_write("leads", "upsert", payload, key_column="url")
+            self.seen.add(payload["url"])
+            return True
         except Exception as e:
             logger.error(f"Lead operation failed: {e}. Skipping insert.")
             return False
 
 class LeadFinder:
-    def __init__(self):
+    def __init__(self, seen=None):
         self.ua = UserAgent()
         self.session = requests.Session()
+        self.provider = resolve_provider()
+        self.seen = seen if seen is not None else get_seen_index()
 
     @retry(stop=stop_after_attempt(5), wait=wait_exponential(multiplier=2, min=4, max=30))
     async def search_leads(self, keywords, max_results=15):
         query = f"{' '.join(keywords)} (buy OR purchase OR need OR looking for) site:twitter.com OR site:linkedin.com OR site:reddit.com OR site:instagram.com"
-        url = "https://www.googleapis.com/customsearch/v1"
-        params = {"q": query, "key": GOOGLE_API_KEY, "cx": GOOGLE_CX, "num": min(max_results, 10)}
-        headers = {"User-Agent": self.ua.random}
-        r = self.session.get(url, params=params, headers=headers, timeout=20)
-        r.raise_for_status()
-        items = r.json().get("items", [])
+        items = await self.provider.search(query, min(max_results, 10))
+        # Drop URLs already stored as leads before contact extraction
+        fresh = [item for item in items if item["url"] not in self.seen]
+        if len(fresh) < len(items):
+            logger.info(f"Skipped {len(items) - len(fresh)} already-seen leads")
         leads = []
-        for item in items:
+        for item in fresh:
             lead = {
-                "url": item["link"],
+                "url": item["url"],
                 "title": item.get("title", ""),
                 "snippet": item.get("snippet", ""),
-                "platform": self.detect_platform(item["link"])
+                "platform": self.detect_platform(item["url"])
             }
             lead["contact"] = await self.extract_contact(lead)
             leads.append(lead)
@@ -196,26 +245,41 @@ class LeadFinder:
 
 class MessageGenerator:
     def __init__(self):
-        self.groq = Groq(api_key=GROQ_API_KEY)
+        self.gateway = get_gateway()
+        self.cache = MessageCache()
 
     @retry(stop=stop_after_attempt(4), wait=wait_exponential(multiplier=1, min=3, max=15))
     async def generate_message(self, lead, campaign):
+        # Near-paraphrase snippets in the same campaign reuse a cached template with this lead's slots
+        slots = message_slots(lead, campaign.keywords)
+        vector = await asyncio.to_thread(self.cache.embed, lead['snippet'])
+        cached = self.cache.lookup(campaign.id, lead['platform'], vector, slots)
+        if cached:
+            logger.debug(f"Message cache hit for {lead['url']} (hit rate {self.cache.hit_rate():.0%})")
+            return cached
+
+        # Trim scraped snippets to the sentences relevant to this campaign
+        snippet = compress_prompt(lead['snippet'], campaign.keywords + [campaign.usp], settings.PROMPT_CONTENT_TOKENS)
+        logger.info(f"Prompt tokens: {snippet.tokens_before} -> {snippet.tokens_after}")
         prompt = f"""
         Transform this lead into a personalized, reassuring message.
-        Lead snippet: {lead['snippet']}
+        Lead snippet: {snippet.text}
         USP: {campaign.usp}
         Link: {campaign.product_link}
         Make it natural, benefit-focused, platform-adapted (short for social, detailed for email).
         Avoid spam: Start with empathy, end with CTA.
+        Write "{NAME_SLOT}" where the recipient's name goes and "{TOPIC_SLOT}" for the need they mention.
         """
         try:
-            response = self.groq.chat.completions.create(
-                model="llama3-70b-8192",
-                messages=[{"role": "system", "content": "You are an adaptive marketing AI."}, {"role": "user", "content": prompt}],
+            response = await self.gateway.chat(
+                "groq",
+                "llama3-70b-8192",
+                [{"role": "system", "content": "You are an adaptive marketing AI."}, {"role": "user", "content": prompt}],
                 temperature=0.65,
                 max_tokens=250
             )
-            return response.choices[0].message.content.strip()
+            template = response.choices[0].message.content.strip()
+            return self.cache.store(campaign.id, lead['platform'], vector, template, slots)
         except Exception as e:
             logger.error(f"Groq failed: {e}. Falling back to mock message.")
             return f"Hi, saw your interest in {', '.join(campaign.keywords[:2])}. Our solution offers {campaign.usp}. Check: {campaign.product_link}"
@@ -290,7 +354,7 @@ class MessageSender:
 
 async def nexus_prime_loop():
     db = SupabaseService()
-    finder = LeadFinder()
+    finder = LeadFinder(db.seen)
     gen = MessageGenerator()
     sender = MessageSender()
 
@@ -316,7 +380,7 @@ async def nexus_prime_loop():
                             "ai_analysis_text": "AI-transformed lead",
                             "message_draft": message,
                             "status": "sent" if success else "failed",
-                            "contact_info": json.dumps(lead["contact"])
+                            "contact_info": lead["contact"]  # JSONB: sent as an object, not a JSON string
                         }
                         await db.insert_or_update_lead(payload)
                     await asyncio.sleep(random.uniform(5, 20))
@@ -1,6 +1,10 @@
+import asyncio
+from config.settings import settings
 from core.database import DatabaseService
 from core.cyber_hunter import CyberHunter
 from core.neural_engine import NeuralEngine
+from core.vector_memory import VectorMemory
+from core.llm_router import router_stats
 from loguru import logger
 
 class NexusOrchestrator:
@@ -8,29 +12,79 @@ class NexusOrchestrator:
         self.db = DatabaseService()
         self.hunter = CyberHunter()
         self.engine = NeuralEngine()
+        self.memory = VectorMemory()
+
+    @staticmethod
+    def _from_memory(hit: dict) -> dict:
+        return {
+            "is_confirmed": hit['is_confirmed'],
+            "score": hit['score'],
+            "analysis": hit['reason'],
+            "message": hit['hook']
+        }
 
     def run(self):
+        asyncio.run(self.run_async())
+
+    async def run_async(self):
         missions = self.db.fetch_active_campaigns()
+        # Scan every active campaign in one concurrent, de-duplicated batch
+        scans = await self.hunter.scan_batch(self.hunter.build_jobs(missions))
+
         for mission in missions:
             leads_acquired = 0
             max_leads = mission.get('max_leads', 5)
             
-            raw_leads = self.hunter.scan(mission['keywords'], mission['target_region'])
+            # URLs already in the leads table are skipped before any analysis
+            raw_leads = [lead for lead in scans.get(mission['id'], []) if lead['href'] not in self.db.seen]
+            keywords = [k.strip() for k in (mission.get('keywords') or '').split(',') if k.strip()]
             
-            for lead in raw_leads:
-                if leads_acquired >= max_leads:
-                    break
+            texts = [f"{lead['title']} {lead['body']}" for lead in raw_leads]
+            # Near-duplicates of already analysed content reuse the stored verdict instead of the LLM
+            vectors, recalled = await asyncio.to_thread(self.memory.lookup, mission['id'], texts)
+            results = [self._from_memory(hit) if hit else None for hit in recalled]
+            reused = sum(1 for result in results if result is not None)
+            if reused:
+                logger.info(f"Reused {reused} past verdicts for campaign {mission['id']}")
+            
+            # Leads are analysed in waves sized to what is still needed, so the LLM is not
+            # called (or billed) for leads past max_leads
+            position = 0
+            while position < len(raw_leads) and leads_acquired < max_leads:
+                size = max(settings.ANALYSIS_WAVE_MIN, 2 * (max_leads - leads_acquired))
+                wave = range(position, min(len(raw_leads), position + size))
+                position = wave.stop
                 
-                content = f"{lead['title']} {lead['body']}"
-                result = self.engine.analyze(content, mission['usp'], mission['product_link'])
+                fresh = [i for i in wave if results[i] is None]
+                # A wave goes through the LLM gateway at once; it runs it within the model's limits
+                analyzed = await asyncio.gather(*(
+                    self.engine.analyze_async(texts[i], mission['usp'], mission['product_link'], keywords)
+                    for i in fresh
+                ))
+                for i, result in zip(fresh, analyzed):
+                    results[i] = result
+                self.memory.remember(
+                    mission['id'],
+                    vectors[fresh] if vectors is not None else None,
+                    [raw_leads[i]['href'] for i in fresh],
+                    analyzed
+                )
                 
-                if result.get('is_confirmed'):
-                    self.db.log_lead({
-                        "campaign_id": mission['id'],
-                        "url": lead['href'],
-                        "intent_score": result['score'],
-                        "ai_analysis": result['analysis'],
-                        "message_draft": result['message'],
-                        "status": "confirmed"
-                    })
-                    leads_acquired += 1
+                for i in wave:
+                    if leads_acquired >= max_leads:
+                        break
+                    
+                    result = results[i]
+                    if result.get('is_confirmed'):
+                        self.db.log_lead({
+                            "campaign_id": mission['id'],
+                            "url": raw_leads[i]['href'],
+                            "intent_score": result['score'],
+                            "ai_analysis": result['analysis'],
+                            "message_draft": result['message'],
+                            "status": "confirmed"
+                        })
+                        leads_acquired += 1
+
+        # Per-backend latency/error/hedge counters behind the routing decisions
+        logger.info(f"LLM routing stats: {router_stats()}")
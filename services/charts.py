@@ -0,0 +1,78 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+FigureBuilder = Callable[[Any, Any, Any], Any]  # (go, px, data) -> Figure
+
+
+def _plotly():
+    """استيراد plotly عند أول رسم فعلي فقط (المكتبة ثقيلة التحميل)"""
+    import plotly.express as px
+    import plotly.graph_objects as go
+    return go, px
+
+
+def plotly_script_tag() -> str:
+    """وسم تحميل plotly.js مرة واحدة في الصفحة: من PLOTLY_JS_SRC أو CDN بنفس إصدار المكتبة المثبتة"""
+    src = settings.PLOTLY_JS_SRC
+    if not src:
+        from plotly.offline import get_plotlyjs_version
+        src = f"https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"
+    return f'<script src="{src}" charset="utf-8"></script>'
+
+
+def write_plotly_asset(directory: str, filename: str = "plotly.min.js") -> str:
+    """كتابة plotly.js كملف ثابت مشترك (مرة واحدة) لاستخدامه في PLOTLY_JS_SRC؛ يعيد المسار"""
+    path = os.path.join(directory, filename)
+    if not os.path.exists(path):
+        from plotly.offline import get_plotlyjs
+        os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(get_plotlyjs())
+    return path
+
+
+class ChartRenderer:
+    """أجزاء HTML للرسوم بلا مكتبة plotly.js مضمّنة، مع ذاكرة LRU مفتاحها بصمة البيانات المغذية لكل رسم"""
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or settings.CHART_CACHE_SIZE
+        self._fragments: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(name: str, data: Any) -> str:
+        payload = json.dumps([name, data], sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def render(self, name: str, data: Any, build: FigureBuilder) -> str:
+        key = self._key(name, data)
+        with self._lock:
+            fragment = self._fragments.get(key)
+            if fragment is not None:
+                self._fragments.move_to_end(key)
+                self.hits += 1
+                return fragment
+            self.misses += 1
+
+        go, px = _plotly()
+        # معرّف ثابت للعنصر: نفس البيانات تعطي نفس الجزء
+        fragment = build(go, px, data).to_html(full_html=False, include_plotlyjs=False, div_id=f"chart-{key[:12]}")
+        with self._lock:
+            self._fragments[key] = fragment
+            while len(self._fragments) > self.max_entries:
+                self._fragments.popitem(last=False)
+        return fragment
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._fragments), "hits": self.hits, "misses": self.misses}
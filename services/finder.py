@@ -8,6 +8,7 @@ from datetime import datetime
 
 from config.settings import settings
 from core.models import Platform
+from core.search_providers import resolve_provider
 
 logger = logging.getLogger(__name__)
 
@@ -43,19 +44,8 @@ class LeadFinder:
             
             for platform in platforms:
                 platform_query = self._build_platform_query(keywords, platform, region)
-                
-                if platform == Platform.TWITTER:
-                    task = self._search_twitter(platform_query, max_results // len(platforms))
-                elif platform == Platform.LINKEDIN:
-                    task = self._search_linkedin(platform_query, max_results // len(platforms))
-                elif platform == Platform.GITHUB:
-                    task = self._search_github(platform_query, max_results // len(platforms))
-                elif platform == Platform.PRODUCT_HUNT:
-                    task = self._search_product_hunt(platform_query, max_results // len(platforms))
-                else:
-                    task = self._search_google(platform_query, max_results // len(platforms))
-                
-                search_tasks.append(task)
+                provider = resolve_provider(platform.value)
+                search_tasks.append(provider.search(platform_query, max_results // len(platforms), self.session))
             
             # تشغيل جميع عمليات البحث بشكل متزامن
             results = await asyncio.gather(*search_tasks, return_exceptions=True)
@@ -66,6 +56,9 @@ class LeadFinder:
                 if isinstance(result, Exception):
                     logger.error(f"Search error: {result}")
                     continue
+                for lead in result:
+                    lead.setdefault('platform', self._detect_platform(lead['url']))
+                    lead['timestamp'] = datetime.now().isoformat()
                 all_leads.extend(result)
             
             # إزالة التكرارات
@@ -107,124 +100,6 @@ class LeadFinder:
             enhanced_terms = ["contact", "email", "hire", "consult", "services", "looking for"]
             return f"{base_query} {' '.join(enhanced_terms)}"
     
-    async def _search_google(self, query: str, max_results: int) -> List[Dict]:
-        """بحث باستخدام Google Custom Search API"""
-        try:
-            url = "https://www.googleapis.com/customsearch/v1"
-            
-            params = {
-                'key': settings.GOOGLE_API_KEY,
-                'cx': settings.GOOGLE_CX,
-                'q': query,
-                'num': min(max_results, 10),
-                'start': 1
-            }
-            
-            async with self.session.get(url, params=params) as response:
-                if response.status != 200:
-                    logger.error(f"Google API error: {response.status}")
-                    return []
-                
-                data = await response.json()
-                items = data.get('items', [])
-                
-                leads = []
-                for item in items:
-                    lead = {
-                        'url': item.get('link', ''),
-                        'title': item.get('title', ''),
-                        'snippet': item.get('snippet', ''),
-                        'platform': self._detect_platform(item.get('link', '')),
-                        'search_source': 'google',
-                        'timestamp': datetime.now().isoformat()
-                    }
-                    leads.append(lead)
-                
-                return leads
-                
-        except Exception as e:
-            logger.error(f"Google search error: {e}")
-            return []
-    
-    async def _search_twitter(self, query: str, max_results: int) -> List[Dict]:
-        """بحث في تويتر باستخدام Twitter API v2"""
-        try:
-            # Note: This requires Twitter API v2 access
-            # For now, we'll use Google search with Twitter filter
-            return await self._search_google(query, max_results)
-            
-        except Exception as e:
-            logger.error(f"Twitter search error: {e}")
-            return []
-    
-    async def _search_linkedin(self, query: str, max_results: int) -> List[Dict]:
-        """بحث في لينكد إن"""
-        try:
-            # LinkedIn requires authentication
-            # For now, use Google search with LinkedIn filter
-            return await self._search_google(query, max_results)
-            
-        except Exception as e:
-            logger.error(f"LinkedIn search error: {e}")
-            return []
-    
-    async def _search_github(self, query: str, max_results: int) -> List[Dict]:
-        """بحث في جيت هاب باستخدام GitHub API"""
-        try:
-            url = "https://api.github.com/search/users"
-            
-            # استخراج كلمة البحث الرئيسية
-            search_term = query.replace("site:github.com", "").strip()
-            
-            params = {
-                'q': f"{search_term} in:login,in:name",
-                'per_page': min(max_results, 30)
-            }
-            
-            headers = {
-                'Accept': 'application/vnd.github.v3+json'
-            }
-            
-            async with self.session.get(url, params=params, headers=headers) as response:
-                if response.status != 200:
-                    logger.error(f"GitHub API error: {response.status}")
-                    return []
-                
-                data = await response.json()
-                items = data.get('items', [])
-                
-                leads = []
-                for item in items[:max_results]:
-                    lead = {
-                        'url': item.get('html_url', ''),
-                        'title': item.get('login', ''),
-                        'snippet': item.get('bio', ''),
-                        'platform': Platform.GITHUB.value,
-                        'search_source': 'github_api',
-                        'timestamp': datetime.now().isoformat(),
-                        'metadata': {
-                            'type': item.get('type', ''),
-                            'score': item.get('score', 0)
-                        }
-                    }
-                    leads.append(lead)
-                
-                return leads
-                
-        except Exception as e:
-            logger.error(f"GitHub search error: {e}")
-            return await self._search_google(query, max_results)
-    
-    async def _search_product_hunt(self, query: str, max_results: int) -> List[Dict]:
-        """بحث في Product Hunt"""
-        try:
-            # Product Hunt search via Google
-            return await self._search_google(query, max_results)
-            
-        except Exception as e:
-            logger.error(f"Product Hunt search error: {e}")
-            return []
-    
     def _detect_platform(self, url: str) -> str:
         """اكتشاف المنصة من الرابط"""
         url_lower = url.lower()
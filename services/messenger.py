@@ -11,10 +11,29 @@ import json
 
 from config.settings import settings
 from core.models import Lead, Platform
+from core.term_matcher import TermMatcher
 from utils.helpers import format_message
 
 logger = logging.getLogger(__name__)
 
+# قواميس الملاحظات والهاشتاقات بترتيب الأولوية
+OBSERVATION_TERMS = {
+    "you're looking for solutions in this area": ['looking for', 'need', 'searching for'],
+    "you mentioned some challenges that we might be able to help with": ['problem', 'challenge', 'issue'],
+    "your interest in this field": ['interest', 'interested in', 'passionate about']
+}
+
+HASHTAG_TERMS = {
+    "#tech #software": ['tech', 'software', 'developer'],
+    "#marketing #growth": ['marketing', 'growth', 'seo'],
+    "#startup #entrepreneur": ['startup', 'entrepreneur', 'founder']
+}
+
+SUMMARY_MATCHER = TermMatcher({
+    **{('observation', text): terms for text, terms in OBSERVATION_TERMS.items()},
+    **{('hashtag', tag): terms for tag, terms in HASHTAG_TERMS.items()}
+})
+
 class MessageSender:
     """مرسل ذكي للرسائل عبر منصات متعددة"""
     
@@ -136,18 +155,21 @@ Best,
             """
         }
         
+        # مرور واحد على ملخص المحتوى لكل الملاحظات والهاشتاقات
+        summary_hits = SUMMARY_MATCHER.scan(lead.content_summary)
+        
         # جمع البيانات للمقابلات
         template_data = {
             'name': lead.name or "there",
             'subject': f"Regarding {campaign_data.get('product_name', 'our solution')}",
             'intro': self._get_intro_based_on_time(),
             'specific_mention': self._get_specific_mention(lead),
-            'observation': self._get_observation(lead),
+            'observation': self._get_observation(lead, summary_hits),
             'product_service': campaign_data.get('product_name', 'our solution'),
             'usp': campaign_data.get('usp', ''),
             'product_link': campaign_data.get('product_link', ''),
             'signature': campaign_data.get('signature', 'Best regards'),
-            'relevant_hashtag': self._get_relevant_hashtag(lead)
+            'relevant_hashtag': self._get_relevant_hashtag(lead, summary_hits)
         }
         
         # استخدام القالب المناسب
@@ -191,31 +213,25 @@ Best,
         
         return ""
     
-    def _get_observation(self, lead: Lead) -> str:
+    def _get_observation(self, lead: Lead, hits: Dict = None) -> str:
         """الحصول على ملاحظة مخصصة بناءً على محتوى العميل"""
         if lead.content_summary:
-            summary_lower = lead.content_summary.lower()
+            hits = SUMMARY_MATCHER.scan(lead.content_summary) if hits is None else hits
             
-            if any(word in summary_lower for word in ['looking for', 'need', 'searching for']):
-                return "you're looking for solutions in this area"
-            elif any(word in summary_lower for word in ['problem', 'challenge', 'issue']):
-                return "you mentioned some challenges that we might be able to help with"
-            elif any(word in summary_lower for word in ['interest', 'interested in', 'passionate about']):
-                return "your interest in this field"
+            for observation in OBSERVATION_TERMS:
+                if ('observation', observation) in hits:
+                    return observation
         
         return "your work in this field"
     
-    def _get_relevant_hashtag(self, lead: Lead) -> str:
+    def _get_relevant_hashtag(self, lead: Lead, hits: Dict = None) -> str:
         """الحصول على هاشتاق مناسب"""
         if lead.content_summary:
-            summary_lower = lead.content_summary.lower()
+            hits = SUMMARY_MATCHER.scan(lead.content_summary) if hits is None else hits
             
-            if any(word in summary_lower for word in ['tech', 'software', 'developer']):
-                return "#tech #software"
-            elif any(word in summary_lower for word in ['marketing', 'growth', 'seo']):
-                return "#marketing #growth"
-            elif any(word in summary_lower for word in ['startup', 'entrepreneur', 'founder']):
-                return "#startup #entrepreneur"
+            for hashtag in HASHTAG_TERMS:
+                if ('hashtag', hashtag) in hits:
+                    return hashtag
         
         return "#business"
     
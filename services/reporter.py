@@ -1,23 +1,21 @@
 import logging
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
-import pandas as pd
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import plotly.express as px
 from io import BytesIO
 import base64
 
 from core.database import DatabaseService
-from core.models import Campaign
+from core.models import Campaign, Lead, Platform, top_leads
+from services.charts import ChartRenderer, plotly_script_tag
 
 logger = logging.getLogger(__name__)
 
 class ReportGenerator:
     """مولد تقارير ذكي ومتقدم"""
     
-    def __init__(self, db_service: DatabaseService):
+    def __init__(self, db_service: DatabaseService, charts: Optional[ChartRenderer] = None):
         self.db = db_service
+        self.charts = charts or ChartRenderer()
     
     def generate_campaign_report(self, campaign_id: str, export_format: str = 'html') -> Dict:
         """توليد تقرير تفصيلي للحملة"""
@@ -59,21 +57,26 @@ class ReportGenerator:
         """توليد تقرير لوحة التحكم"""
         try:
             campaigns = self.db.get_active_campaigns()
+            # لقطة إحصائيات واحدة لكل الأقسام: استعلام مجمّع بدل استعلام لكل حملة في كل قسم
+            snapshot = self._stats_snapshot(campaigns)
+            # فترة اليوم هي أول عنصر في سلسلة الأيام: قراءة واحدة للقسمين
+            daily_trends = self._get_daily_trends(7)
+            today = daily_trends[0] if daily_trends else {}
             
             dashboard_data = {
                 'total_campaigns': len(campaigns),
                 'active_campaigns': sum(1 for c in campaigns if c.status.value == 'active'),
-                'total_leads_today': self._get_todays_leads_count(),
-                'conversion_rate_today': self._get_todays_conversion_rate(),
+                'total_leads_today': self._get_todays_leads_count(today),
+                'conversion_rate_today': self._get_todays_conversion_rate(today),
                 'campaign_performance': [],
                 'platform_performance': {},
-                'daily_trends': self._get_daily_trends(7),
-                'alerts': self._generate_alerts()
+                'daily_trends': daily_trends,
+                'alerts': self._generate_alerts(campaigns, snapshot)
             }
             
             # أداء الحملات
             for campaign in campaigns:
-                stats = self.db.get_campaign_stats(campaign.id)
+                stats = snapshot.get(campaign.id, {})
                 campaign_perf = {
                     'id': campaign.id,
                     'name': campaign.name,
@@ -88,7 +91,7 @@ class ReportGenerator:
             # أداء المنصات
             platform_stats = {}
             for campaign in campaigns:
-                stats = self.db.get_campaign_stats(campaign.id)
+                stats = snapshot.get(campaign.id, {})
                 platform_dist = stats.get('platform_distribution', {})
                 
                 for platform, count in platform_dist.items():
@@ -100,9 +103,20 @@ class ReportGenerator:
                         }
                     
                     platform_stats[platform]['total_leads'] += count
+                    platform_stats[platform]['converted_leads'] += stats.get('platform_converted', {}).get(platform, 0)
+                    platform_stats[platform]['campaigns'].append(campaign.id)
             
             dashboard_data['platform_performance'] = platform_stats
             
+            # أفضل العملاء: عبر الحملات النشطة نفسها التي تغطيها بقية الأقسام، ولكل منصة
+            campaign_ids = [campaign.id for campaign in campaigns]
+            dashboard_data['top_leads'] = self._get_top_leads(limit=10, campaign_ids=campaign_ids)
+            dashboard_data['top_leads_by_platform'] = {
+                platform: [self._lead_summary(lead) for lead in leads]
+                for platform, leads in self.db.get_top_leads_by_platform(
+                    platform_stats, 5, campaign_ids=campaign_ids).items()
+            }
+            
             return dashboard_data
             
         except Exception as e:
@@ -143,53 +157,62 @@ class ReportGenerator:
         return summary
     
     def _generate_charts(self, stats: Dict) -> Dict:
-        """توليد رسوم بيانية"""
+        """توليد رسوم بيانية (أجزاء HTML بلا plotly.js، مخزنة حسب بياناتها)"""
         charts = {}
         
         try:
             # 1. مخطط توزيع المنصات
             if stats.get('platform_distribution'):
-                fig1 = px.pie(
-                    values=list(stats['platform_distribution'].values()),
-                    names=list(stats['platform_distribution'].keys()),
-                    title='Lead Distribution by Platform'
-                )
-                charts['platform_distribution'] = fig1.to_html(full_html=False)
+                charts['platform_distribution'] = self.charts.render(
+                    'platform_distribution', stats['platform_distribution'], self._platform_figure)
             
             # 2. مخطط توزيع النقاط
             if stats.get('score_distribution'):
-                fig2 = px.bar(
-                    x=list(stats['score_distribution'].keys()),
-                    y=list(stats['score_distribution'].values()),
-                    title='Lead Quality Distribution',
-                    labels={'x': 'Intent Score Range', 'y': 'Number of Leads'}
-                )
-                charts['score_distribution'] = fig2.to_html(full_html=False)
+                charts['score_distribution'] = self.charts.render(
+                    'score_distribution', stats['score_distribution'], self._score_figure)
             
             # 3. مخطط أداء الحملة
-            metrics = ['Total Leads', 'Contacted', 'Converted']
             values = [
                 stats.get('total_leads', 0),
                 stats.get('contacted_leads', 0),
                 stats.get('converted_leads', 0)
             ]
-            
-            fig3 = go.Figure(data=[
-                go.Bar(name='Count', x=metrics, y=values, marker_color=['blue', 'orange', 'green'])
-            ])
-            
-            fig3.update_layout(
-                title='Campaign Performance Metrics',
-                yaxis_title='Number of Leads'
-            )
-            
-            charts['performance_metrics'] = fig3.to_html(full_html=False)
+            charts['performance_metrics'] = self.charts.render('performance_metrics', values, self._performance_figure)
             
         except Exception as e:
             logger.error(f"Error generating charts: {e}")
         
         return charts
     
+    @staticmethod
+    def _platform_figure(go, px, distribution: Dict):
+        return px.pie(
+            values=list(distribution.values()),
+            names=list(distribution.keys()),
+            title='Lead Distribution by Platform'
+        )
+    
+    @staticmethod
+    def _score_figure(go, px, distribution: Dict):
+        return px.bar(
+            x=list(distribution.keys()),
+            y=list(distribution.values()),
+            title='Lead Quality Distribution',
+            labels={'x': 'Intent Score Range', 'y': 'Number of Leads'}
+        )
+    
+    @staticmethod
+    def _performance_figure(go, px, values: List[int]):
+        metrics = ['Total Leads', 'Contacted', 'Converted']
+        fig = go.Figure(data=[
+            go.Bar(name='Count', x=metrics, y=values, marker_color=['blue', 'orange', 'green'])
+        ])
+        fig.update_layout(
+            title='Campaign Performance Metrics',
+            yaxis_title='Number of Leads'
+        )
+        return fig
+    
     def _generate_recommendations(self, stats: Dict) -> List[str]:
         """توليد توصيات ذكية بناءً على البيانات"""
         recommendations = []
@@ -225,31 +248,37 @@ class ReportGenerator:
         
         return recommendations[:5]  # إرجاع أفضل 5 توصيات فقط
     
-    def _get_top_leads(self, campaign_id: str, limit: int = 10) -> List[Dict]:
-        """جلب أفضل العملاء بناءً على النتيجة"""
+    def _get_top_leads(self, campaign_id: Optional[str] = None, limit: int = 10,
+                       platform: Optional[str] = None, leads: Optional[List[Lead]] = None,
+                       campaign_ids: Optional[List[str]] = None) -> List[Dict]:
+        """جلب أفضل العملاء بناءً على النتيجة (حملة، مجموعة حملات، منصة، أو كل الحملات)
+
+        الترتيب والحد في قاعدة البيانات؛ وإن كانت العملاء في الذاكرة فكومة بحجم limit.
+        """
         try:
-            leads = self.db.get_campaign_leads(campaign_id)
-            
-            # ترتيب حسب النتيجة
-            sorted_leads = sorted(leads, key=lambda x: x.intent_score, reverse=True)
-            
-            top_leads = []
-            for lead in sorted_leads[:limit]:
-                top_leads.append({
-                    'name': lead.name or 'Unknown',
-                    'email': lead.email,
-                    'score': lead.intent_score,
-                    'platform': lead.platform.value,
-                    'status': lead.status.value,
-                    'last_contacted': lead.last_contacted.isoformat() if lead.last_contacted else None
-                })
-            
-            return top_leads
+            if leads is not None:
+                selected = top_leads(leads, limit, Platform(platform) if platform else None)
+            else:
+                selected = self.db.get_top_leads(limit, campaign_id, platform, campaign_ids=campaign_ids)
+            return [self._lead_summary(lead) for lead in selected]
             
         except Exception as e:
             logger.error(f"Error getting top leads: {e}")
             return []
     
+    @staticmethod
+    def _lead_summary(lead: Lead) -> Dict:
+        return {
+            'name': lead.name or 'Unknown',
+            'email': lead.email,
+            'campaign_id': lead.campaign_id,
+            'url': lead.url,
+            'score': lead.intent_score,
+            'platform': lead.platform.value,
+            'status': lead.status.value,
+            'last_contacted': lead.last_contacted.isoformat() if lead.last_contacted else None
+        }
+    
     def _calculate_grade(self, conversion_rate: float) -> str:
         """حساب درجة الأداء"""
         if conversion_rate >= 20:
@@ -271,38 +300,41 @@ class ReportGenerator:
         # For now, return a mock campaign
         return None
     
-    def _get_todays_leads_count(self) -> int:
+    def _get_todays_bucket(self) -> Dict:
+        trends = self.db.get_lead_trends(1, 'day')
+        return trends[0] if trends else {}
+    
+    def _get_todays_leads_count(self, today: Optional[Dict] = None) -> int:
         """عدد العملاء اليوم"""
-        # Implementation would query database for today's leads
-        return 0
+        today = self._get_todays_bucket() if today is None else today
+        return today.get('leads', 0)
     
-    def _get_todays_conversion_rate(self) -> float:
+    def _get_todays_conversion_rate(self, today: Optional[Dict] = None) -> float:
         """معدل التحويل اليوم"""
-        return 0.0
+        today = self._get_todays_bucket() if today is None else today
+        leads = today.get('leads', 0)
+        return today.get('conversions', 0) / leads * 100 if leads else 0.0
     
     def _get_daily_trends(self, days: int) -> List[Dict]:
-        """الاتجاهات اليومية"""
-        # Generate mock data for now
-        trends = []
-        for i in range(days):
-            date = (datetime.now() - timedelta(days=i)).date()
-            trends.append({
-                'date': date.isoformat(),
-                'leads': 10 + i * 2,
-                'conversions': i,
-                'response_rate': 15.0 + i
-            })
-        
-        return trends
+        """الاتجاهات اليومية (الأحدث أولاً) من فترات lead_trends المحسوبة مسبقاً"""
+        return self.db.get_lead_trends(days, 'day')
     
-    def _generate_alerts(self) -> List[Dict]:
+    def _stats_snapshot(self, campaigns: List[Campaign]) -> Dict[str, Dict]:
+        """إحصائيات كل الحملات المطلوبة دفعة واحدة، تُشارك بين أقسام الطلب نفسه"""
+        return self.db.get_campaigns_stats([campaign.id for campaign in campaigns])
+    
+    def _generate_alerts(self, campaigns: Optional[List[Campaign]] = None,
+                         snapshot: Optional[Dict[str, Dict]] = None) -> List[Dict]:
         """توليد تنبيهات"""
         alerts = []
         
         # Check for campaigns with no leads
-        campaigns = self.db.get_active_campaigns()
+        if campaigns is None:
+            campaigns = self.db.get_active_campaigns()
+        if snapshot is None:
+            snapshot = self._stats_snapshot(campaigns)
         for campaign in campaigns:
-            stats = self.db.get_campaign_stats(campaign.id)
+            stats = snapshot.get(campaign.id, {})
             if stats.get('total_leads', 0) == 0:
                 alerts.append({
                     'type': 'warning',
@@ -315,6 +347,8 @@ class ReportGenerator:
     
     def _export_to_html(self, report: Dict) -> str:
         """تصدير التقرير إلى HTML"""
+        # مكتبة plotly.js مرة واحدة في رأس الصفحة؛ أجزاء الرسوم لا تضمّنها
+        plotly_js = plotly_script_tag() if report.get('charts') else ''
         html_template = f"""
 <!DOCTYPE html>
 <html>
@@ -330,6 +364,7 @@ class ReportGenerator:
         .table th, .table td {{ border: 1px solid #ddd; padding: 8px; text-align: left; }}
         .grade {{ font-size: 24px; font-weight: bold; color: green; }}
     </style>
+    {plotly_js}
 </head>
 <body>
     <div class="header">
@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+from core.json_stream import IncrementalJSONObject
+
+VERDICT = '{"is_confirmed": true, "score": 87.5, "ratio": -1.25e-3, "analysis": "needs a CRM", "message": "Hi {name}"}'
+
+
+def _chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", range(1, 8))
+def test_every_split_yields_the_full_verdict(size):
+    parser = IncrementalJSONObject()
+    for chunk in _chunks(VERDICT, size):
+        parser.feed(chunk)
+    assert parser.complete
+    assert parser.fields == json.loads(VERDICT)
+
+
+def test_number_split_at_decimal_point():
+    parser = IncrementalJSONObject()
+    parser.feed('{"is_confirmed": true, "score": 87')
+    parser.feed('.')
+    assert "score" not in parser.fields
+    parser.feed('5, "analysis": "x"}')
+    assert parser.fields["score"] == 87.5